@@ -63,9 +63,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    # Temporarily disabled custom middleware to fix homepage
-    # 'core.middleware.TenantMiddleware',
-    # 'core.middleware.BrandingMiddleware',
+    # Resolves the tenant from the host; API requests from unknown hosts get a 404
+    'core.middleware.TenantMiddleware',
+    'core.middleware.BrandingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,8 +73,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Quotas are enforced in the create views (see core.quotas.enforce_quota)
     # 'core.middleware.SubscriptionMiddleware',
-    # 'core.middleware.UsageTrackingMiddleware',
+    'core.middleware.UsageTrackingMiddleware',
 ]
 
 ROOT_URLCONF = 'RevolutionMVP_Django.urls'
@@ -230,7 +231,7 @@ REST_FRAMEWORK = {
 # ============================================================================
 
 # Allow all origins in development, restrict in production
-CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_ALL_ORIGINS = DEBUG
 
 # Specific origins for production
 CORS_ALLOWED_ORIGINS = [
@@ -267,6 +268,13 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ============================================================================
+# LEAD CAPTURE
+# ============================================================================
+
+# Queue website lead captures for the worker process instead of writing them inline
+LEAD_CAPTURE_QUEUE = os.environ.get('LEAD_CAPTURE_QUEUE', 'False') == 'True'
+
 # ============================================================================
 # EMAIL CONFIGURATION
 # ============================================================================
@@ -1,23 +1,42 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db.models import Max, Sum
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
 import json
 
+from .idx_sync import FeedSync, feed_summaries, run_stats
+from .property_import import PropertyImporter, SUPPORTED_FORMATS, detect_format
+from .saas_models import FeedSyncRun, TenantIntegration
+from .tenant_context import get_current_tenant_id
+
 @staff_member_required
 def idx_feed_dashboard(request):
     """IDX Feed Management Dashboard"""
+    feeds = feed_summaries()
+    totals = FeedSyncRun.objects.filter(status='success').aggregate(
+        created=Sum('created'), updated=Sum('updated')
+    )
+    last_sync = TenantIntegration.objects.filter(
+        integration__integration_type='mls'
+    ).aggregate(last_sync=Max('last_sync'))['last_sync']
+    
     context = {
         'title': 'IDX Feed Management',
-        'feeds': [],  # Will be populated with actual feed data
+        'feeds': feeds,
+        'recent_runs': FeedSyncRun.objects.select_related(
+            'tenant_integration__tenant', 'tenant_integration__integration'
+        )[:20],
         'stats': {
-            'total_feeds': 0,
-            'active_feeds': 0,
-            'properties_imported': 0,
-            'last_sync': None
+            'total_feeds': len(feeds),
+            'active_feeds': sum(1 for feed in feeds if feed['is_active']),
+            'properties_imported': totals['created'] or 0,
+            'properties_updated': totals['updated'] or 0,
+            'last_sync': last_sync
         }
     }
     return render(request, 'admin/idx_feeds/dashboard.html', context)
@@ -68,27 +87,41 @@ def user_role_management(request):
     }
     return render(request, 'admin/users/management.html', context)
 
-@method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(staff_member_required, name='dispatch')
 class IDXFeedAPIView(View):
     """API for IDX Feed operations"""
     
     def get(self, request):
         """Get IDX feed information"""
         return JsonResponse({
-            'feeds': [],
+            'feeds': feed_summaries(),
             'status': 'success'
         })
     
     def post(self, request):
-        """Create or update IDX feed"""
+        """Run an incremental sync of an IDX feed"""
         try:
             data = json.loads(request.body)
-            # Process IDX feed data
+            tenant_integration = get_object_or_404(
+                TenantIntegration, pk=data.get('feed_id'), integration__integration_type='mls'
+            )
+            run = FeedSync(tenant_integration).run()
+            if run is None:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'A sync is already running for this feed'
+                }, status=409)
             return JsonResponse({
                 'status': 'success',
-                'message': 'IDX feed updated successfully'
+                'message': 'IDX feed synced' if run.status == 'success' else 'IDX feed sync failed',
+                'run': run_stats(run)
             })
-        except Exception as e:
+        except ValidationError as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': ' '.join(e.messages)
+            }, status=400)
+        except (ValueError, TypeError) as e:
             return JsonResponse({
                 'status': 'error',
                 'message': str(e)
@@ -156,15 +189,34 @@ def bulk_property_import(request):
         # Handle file upload and processing
         uploaded_file = request.FILES.get('property_file')
         if uploaded_file:
-            # Process the uploaded file
-            messages.success(request, 'Properties imported successfully!')
+            file_format = request.POST.get('format') or detect_format(uploaded_file.name)
+            if file_format not in SUPPORTED_FORMATS:
+                messages.error(request, 'Unsupported file type. Upload a CSV, JSON Lines or XML feed.')
+                return redirect('admin:bulk_property_import')
+            
+            if not get_current_tenant_id():
+                messages.error(request, "Open the import from the brokerage's own site to import its listings.")
+                return redirect('admin:bulk_property_import')
+            
+            # Stream the upload row by row; large files stay on disk
+            report = PropertyImporter().run(uploaded_file.file, file_format)
+            summary = (
+                f"Imported {report['imported']} of {report['rows']} rows "
+                f"in {report['seconds']}s ({report['rows_per_second']} rows/s)."
+            )
+            if report['error_count']:
+                messages.warning(request, f"{summary} {report['error_count']} rows had errors.")
+                for error in report['errors'][:20]:
+                    messages.error(request, f"Row {error['row']}: {error['error']}")
+            else:
+                messages.success(request, summary)
             return redirect('admin:bulk_property_import')
         else:
             messages.error(request, 'Please select a file to upload.')
     
     context = {
         'title': 'Bulk Property Import',
-        'supported_formats': ['CSV', 'Excel', 'XML', 'JSON']
+        'supported_formats': list(SUPPORTED_FORMATS.values())
     }
     return render(request, 'admin/properties/bulk_import.html', context)
 
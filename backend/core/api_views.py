@@ -1,379 +1,710 @@
 # Comprehensive API views for Revolution CRM frontend
 
 from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
-from django.utils.decorators import method_decorator
-from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum, Q, Avg
+from django.db.models import Count, Q, Window
 from django.utils import timezone
+from django.utils.timesince import timesince
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import wraps
 import json
+import re
+import uuid
 
-# Sample data for the CRM (this would normally come from the database)
-def get_sample_leads():
-    return [
-        {
-            "id": 1,
-            "name": "Sarah Johnson",
-            "email": "sarah.johnson@email.com",
-            "phone": "(555) 123-4567",
-            "status": "hot",
-            "score": 85,
-            "source": "Website",
-            "budget": "$450,000 - $550,000",
-            "preferences": "3-4 BR, Modern, Downtown",
-            "lastContact": "2 hours ago",
-            "avatar": "/api/placeholder/32/32"
-        },
-        {
-            "id": 2,
-            "name": "Michael Chen",
-            "email": "m.chen@email.com",
-            "phone": "(555) 234-5678",
-            "status": "qualified",
-            "score": 72,
-            "source": "Facebook Ads",
-            "budget": "$300,000 - $400,000",
-            "preferences": "2-3 BR, Family-friendly",
-            "lastContact": "1 day ago",
-            "avatar": "/api/placeholder/32/32"
-        },
-        {
-            "id": 3,
-            "name": "Emily Rodriguez",
-            "email": "emily.r@email.com",
-            "phone": "(555) 345-6789",
-            "status": "nurturing",
-            "score": 58,
-            "source": "Zillow",
-            "budget": "$200,000 - $300,000",
-            "preferences": "Starter home, Good schools",
-            "lastContact": "3 days ago",
-            "avatar": "/api/placeholder/32/32"
-        }
-    ]
+from .lead_dedup import find_duplicate, touch_lead
+from .lead_identity import hash_email, hash_phone
+from .lead_matching import MATCH_FIELDS, refresh_leads
+from .lead_routing import lead_load_changed
+from .models import Activity, Lead, LeadSource, Property, PropertyImage, Task, TaskBoard, TaskList, Transaction
+from .quotas import QuotaExceeded, enforce_quota
+from .serializers import PropertyListSerializer
+from .stats import QUALIFIED_LEAD_STATUSES, get_dashboard_stats, get_monthly_performance
+from .tenant_context import get_current_tenant_id
 
-def get_sample_properties():
-    return [
-        {
-            "id": 1,
-            "address": "123 Oak Street, Downtown",
-            "price": "$485,000",
-            "beds": 3,
-            "baths": 2,
-            "sqft": "1,850",
-            "status": "Active",
-            "daysOnMarket": 12,
-            "views": 247,
-            "leads": 8,
-            "favorites": 15,
-            "agent": "John Smith",
-            "image": "/api/placeholder/300/200"
-        },
-        {
-            "id": 2,
-            "address": "456 Pine Avenue, Suburbs",
-            "price": "$325,000",
-            "beds": 2,
-            "baths": 2,
-            "sqft": "1,200",
-            "status": "Pending",
-            "daysOnMarket": 45,
-            "views": 189,
-            "leads": 12,
-            "favorites": 23,
-            "agent": "Lisa Davis",
-            "image": "/api/placeholder/300/200"
-        },
-        {
-            "id": 3,
-            "address": "789 Maple Drive, Uptown",
-            "price": "$675,000",
-            "beds": 4,
-            "baths": 3,
-            "sqft": "2,400",
-            "status": "Sold",
-            "daysOnMarket": 8,
-            "views": 312,
-            "leads": 18,
-            "favorites": 31,
-            "agent": "Mike Johnson",
-            "image": "/api/placeholder/300/200"
-        }
-    ]
+# Page size for CRM lists, overridable per request up to the maximum
+CRM_PAGE_SIZE = 25
+CRM_MAX_PAGE_SIZE = 100
 
-def get_sample_transactions():
-    return [
-        {
-            "id": 1,
-            "property": "123 Oak Street",
-            "client": "Sarah Johnson",
-            "agent": "John Smith",
-            "price": "$485,000",
-            "commission": "$14,550",
-            "status": "Under Contract",
-            "closeDate": "2024-08-15",
-            "daysToClose": 23
-        },
-        {
-            "id": 2,
-            "property": "456 Pine Avenue",
-            "client": "Michael Chen",
-            "agent": "Lisa Davis",
-            "price": "$325,000",
-            "commission": "$9,750",
-            "status": "Pending",
-            "closeDate": "2024-08-22",
-            "daysToClose": 30
-        },
-        {
-            "id": 3,
-            "property": "789 Maple Drive",
-            "client": "Emily Rodriguez",
-            "agent": "Mike Johnson",
-            "price": "$275,000",
-            "commission": "$8,250",
-            "status": "Closed",
-            "closeDate": "2024-07-18",
-            "daysToClose": 0
-        }
-    ]
+# Deeper pages are clamped, keeping the OFFSET inside the database's integer range
+CRM_MAX_PAGE = 100000
 
-def get_sample_tasks():
-    return [
-        {
-            "id": 1,
-            "title": "Follow up with Sarah Johnson",
-            "description": "Schedule property viewing for downtown listings",
-            "priority": "High",
-            "status": "To Do",
-            "dueDate": "2024-07-26",
-            "assignee": "John Smith",
-            "leadId": 1
-        },
-        {
-            "id": 2,
-            "title": "Prepare market analysis",
-            "description": "Create CMA for Pine Avenue property",
-            "priority": "Medium",
-            "status": "In Progress",
-            "dueDate": "2024-07-28",
-            "assignee": "Lisa Davis",
-            "leadId": 2
-        },
-        {
-            "id": 3,
-            "title": "Contract review",
-            "description": "Review purchase agreement terms",
-            "priority": "High",
-            "status": "Done",
-            "dueDate": "2024-07-24",
-            "assignee": "Mike Johnson",
-            "leadId": 3
-        }
-    ]
+PLACEHOLDER_AVATAR = "/api/placeholder/32/32"
+PLACEHOLDER_IMAGE = "/api/placeholder/300/200"
+
+# Lead distribution chart: top sources get their own slice, the rest are "Other"
+LEAD_DISTRIBUTION_SLICES = 4
+LEAD_DISTRIBUTION_COLORS = ["#3b82f6", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6"]
+
+ACTIVITY_CHART_TYPES = [
+    ('call', 'Phone Calls'),
+    ('email', 'Emails'),
+    ('meeting', 'Meetings'),
+    ('showing', 'Showings'),
+]
+
+RECENT_ACTIVITY_LIMIT = 10
+
+# ============================================================================
+# FORMATTING
+# ============================================================================
+
+def format_money(value):
+    """$485,000"""
+    if value is None:
+        return ""
+    return f"${value:,.0f}"
+
+def format_budget(min_price, max_price):
+    """$450,000 - $550,000, $450,000+ or Up to $550,000"""
+    if min_price and max_price:
+        return f"{format_money(min_price)} - {format_money(max_price)}"
+    if min_price:
+        return f"{format_money(min_price)}+"
+    if max_price:
+        return f"Up to {format_money(max_price)}"
+    return ""
+
+def time_ago(value, now):
+    """2 hours ago"""
+    if value is None:
+        return "Never"
+    if (now - value).total_seconds() < 60:
+        return "Just now"
+    return timesince(value, now, depth=1).replace('\xa0', ' ') + " ago"
+
+def full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+def as_number(value):
+    """Decimal counts (bathrooms) as ints when whole, for the frontend"""
+    if value is None:
+        return 0
+    return int(value) if value == int(value) else float(value)
+
+def parse_money(value):
+    """'$450,000' or 450000 -> Decimal('450000'), None when blank"""
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(re.sub(r'[^\d.]', '', str(value)))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+
+def parse_budget(value):
+    """'$450,000 - $550,000' -> (min, max)"""
+    if not value:
+        return None, None
+    amounts = [parse_money(part) for part in re.findall(r'[\d,.]+', str(value)) if re.search(r'\d', part)]
+    if not amounts:
+        return None, None
+    if str(value).lower().startswith('up to'):
+        return None, amounts[0]
+    return amounts[0], (amounts[1] if len(amounts) > 1 else None)
+
+# ============================================================================
+# PAGINATION & FILTERING
+# ============================================================================
+
+def query_param(params, key, parse):
+    """?key= converted with parse, None when blank; ValueError names the parameter"""
+    value = params.get(key)
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError(f"Invalid {key}: {value}")
+
+def page_params(request):
+    """(page, page_size) from ?page=&page_size=, clamped to sane bounds"""
+    page = query_param(request.GET, 'page', int) or 1
+    page_size = query_param(request.GET, 'page_size', int) or CRM_PAGE_SIZE
+    return min(max(page, 1), CRM_MAX_PAGE), min(max(page_size, 1), CRM_MAX_PAGE_SIZE)
+
+def paginate(queryset, request):
+    """
+    One page of a .values() queryset plus pagination metadata.
+    The total rides along on every row as a window count, so a page
+    and its count come back in the same query.
+    """
+    page, page_size = page_params(request)
+    start = (page - 1) * page_size
+    rows = list(queryset.annotate(total_count=Window(Count('pk')))[start:start + page_size])
+
+    if rows:
+        total = rows[0]['total_count']
+    else:
+        total = queryset.count() if start else 0
+
+    return rows, {
+        "page": page,
+        "pageSize": page_size,
+        "total": total,
+        "totalPages": (total + page_size - 1) // page_size,
+    }
+
+def search_filter(query, *fields):
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f"{field}__icontains": query})
+    return condition
+
+# ============================================================================
+# PROJECTIONS
+# ============================================================================
+
+# Each projection reads only the columns its CRM screen shows, via .values(),
+# and shapes the rows in Python without instantiating models
+
+LEAD_FIELDS = (
+    'id', 'first_name', 'last_name', 'email', 'phone', 'status', 'lead_score',
+    'source__name', 'min_price', 'max_price', 'preferred_bedrooms',
+    'preferred_locations', 'last_contact',
+)
+
+def lead_row(row, now):
+    preferences = []
+    if row['preferred_bedrooms']:
+        preferences.append(f"{row['preferred_bedrooms']}+ BR")
+    if row['preferred_locations']:
+        preferences.append(row['preferred_locations'])
 
-def get_dashboard_stats():
     return {
-        "totalLeads": 1247,
-        "leadsGrowth": 12.5,
-        "activeProperties": 892,
-        "propertiesGrowth": 8.2,
-        "monthlyRevenue": 67000,
-        "revenueGrowth": 15.3,
-        "conversionRate": 24.8,
-        "conversionGrowth": 2.1
+        "id": str(row['id']),
+        "name": full_name(row['first_name'], row['last_name']),
+        "email": row['email'],
+        "phone": row['phone'],
+        "status": row['status'],
+        "score": row['lead_score'],
+        "source": row['source__name'] or "",
+        "budget": format_budget(row['min_price'], row['max_price']),
+        "preferences": ", ".join(preferences),
+        "lastContact": time_ago(row['last_contact'], now),
+        "avatar": PLACEHOLDER_AVATAR,
     }
 
-def get_revenue_data():
-    return [
-        {"month": "Jan", "revenue": 45000, "leads": 120},
-        {"month": "Feb", "revenue": 52000, "leads": 135},
-        {"month": "Mar", "revenue": 48000, "leads": 128},
-        {"month": "Apr", "revenue": 61000, "leads": 142},
-        {"month": "May", "revenue": 55000, "leads": 138},
-        {"month": "Jun", "revenue": 67000, "leads": 156}
-    ]
+def lead_queryset(params):
+    queryset = Lead.objects.values(*LEAD_FIELDS).order_by('-created_at')
 
-def get_lead_distribution():
-    return [
-        {"name": "Website", "value": 35, "color": "#3b82f6"},
-        {"name": "Facebook Ads", "value": 25, "color": "#10b981"},
-        {"name": "Zillow", "value": 20, "color": "#f59e0b"},
-        {"name": "Referrals", "value": 15, "color": "#ef4444"},
-        {"name": "Other", "value": 5, "color": "#8b5cf6"}
-    ]
+    if params.get('status'):
+        queryset = queryset.filter(status=params['status'])
+    if params.get('source'):
+        queryset = queryset.filter(source__name=params['source'])
+    if params.get('agent'):
+        queryset = queryset.filter(assigned_agent_id=query_param(params, 'agent', int))
+    if params.get('q'):
+        queryset = queryset.filter(search_filter(params['q'], 'first_name', 'last_name', 'email', 'phone'))
 
-def get_activity_data():
-    return [
-        {"type": "Phone Calls", "count": 47},
-        {"type": "Emails", "count": 128},
-        {"type": "Meetings", "count": 23},
-        {"type": "Showings", "count": 15}
-    ]
+    return queryset
+
+PROPERTY_FIELDS = (
+    'id', 'address', 'city', 'list_price', 'bedrooms', 'bathrooms', 'square_feet',
+    'status', 'list_date', 'view_count', 'lead_count', 'favorite_count',
+    'listing_agent__first_name', 'listing_agent__last_name', 'primary_image_name',
+)
+
+PROPERTY_STATUS_LABELS = dict(Property.PROPERTY_STATUS_CHOICES)
+
+def property_row(row, today):
+    image = PLACEHOLDER_IMAGE
+    if row['primary_image_name']:
+        image = PropertyImage._meta.get_field('image').storage.url(row['primary_image_name'])
+
+    return {
+        "id": str(row['id']),
+        "address": ", ".join(part for part in (row['address'], row['city']) if part),
+        "price": format_money(row['list_price']),
+        "beds": row['bedrooms'],
+        "baths": as_number(row['bathrooms']),
+        "sqft": f"{row['square_feet']:,}" if row['square_feet'] else "",
+        "status": PROPERTY_STATUS_LABELS.get(row['status'], row['status']),
+        "daysOnMarket": max((today - row['list_date']).days, 0),
+        "views": row['view_count'],
+        "leads": row['lead_count'],
+        "favorites": row['favorite_count'],
+        "agent": full_name(row['listing_agent__first_name'], row['listing_agent__last_name']),
+        "image": image,
+    }
+
+def property_queryset(params):
+    # Primary image path comes from the same subquery the public lists use
+    queryset = PropertyListSerializer.setup_eager_loading(Property.objects.all())
+    queryset = queryset.values(*PROPERTY_FIELDS).order_by('-created_at')
+
+    if params.get('status'):
+        queryset = queryset.filter(status=params['status'])
+    if params.get('property_type'):
+        queryset = queryset.filter(property_type=params['property_type'])
+    if params.get('city'):
+        queryset = queryset.filter(city__icontains=params['city'])
+    if params.get('min_price'):
+        queryset = queryset.filter(list_price__gte=query_param(params, 'min_price', parse_money))
+    if params.get('max_price'):
+        queryset = queryset.filter(list_price__lte=query_param(params, 'max_price', parse_money))
+    if params.get('beds'):
+        queryset = queryset.filter(bedrooms__gte=query_param(params, 'beds', int))
+    if params.get('q'):
+        queryset = queryset.filter(search_filter(params['q'], 'address', 'city', 'zip_code', 'mls_number'))
+
+    return queryset
+
+TRANSACTION_FIELDS = (
+    'id', 'property__address', 'lead__first_name', 'lead__last_name',
+    'listing_agent__first_name', 'listing_agent__last_name', 'sale_price',
+    'estimated_commission', 'actual_commission', 'status',
+    'expected_close_date', 'actual_close_date',
+)
+
+TRANSACTION_STATUS_LABELS = dict(Transaction.TRANSACTION_STATUS_CHOICES)
+
+def transaction_row(row, today):
+    close_date = row['actual_close_date'] or row['expected_close_date']
+    days_to_close = 0
+    if row['status'] not in ('closed', 'cancelled') and row['expected_close_date']:
+        days_to_close = max((row['expected_close_date'] - today).days, 0)
+
+    return {
+        "id": str(row['id']),
+        "property": row['property__address'] or "",
+        "client": full_name(row['lead__first_name'], row['lead__last_name']),
+        "agent": full_name(row['listing_agent__first_name'], row['listing_agent__last_name']),
+        "price": format_money(row['sale_price']),
+        "commission": format_money(row['actual_commission'] or row['estimated_commission']),
+        "status": TRANSACTION_STATUS_LABELS.get(row['status'], row['status']),
+        "closeDate": close_date.isoformat() if close_date else "",
+        "daysToClose": days_to_close,
+    }
+
+def transaction_queryset(params):
+    queryset = Transaction.objects.values(*TRANSACTION_FIELDS).order_by('-created_at')
+
+    if params.get('status'):
+        queryset = queryset.filter(status=params['status'])
+    if params.get('agent'):
+        agent_id = query_param(params, 'agent', int)
+        queryset = queryset.filter(Q(listing_agent_id=agent_id) | Q(buyer_agent_id=agent_id))
+
+    return queryset
+
+TASK_FIELDS = (
+    'id', 'title', 'description', 'priority', 'is_completed', 'task_list__name',
+    'due_date', 'assigned_to__first_name', 'assigned_to__last_name', 'lead_id',
+)
+
+TASK_PRIORITY_LABELS = dict(Task.PRIORITY_CHOICES)
+
+def task_row(row):
+    return {
+        "id": str(row['id']),
+        "title": row['title'],
+        "description": row['description'],
+        "priority": TASK_PRIORITY_LABELS.get(row['priority'], row['priority']),
+        # Open tasks show the board column they sit in
+        "status": "Done" if row['is_completed'] else row['task_list__name'],
+        "dueDate": timezone.localdate(row['due_date']).isoformat() if row['due_date'] else "",
+        "assignee": full_name(row['assigned_to__first_name'], row['assigned_to__last_name']),
+        "leadId": str(row['lead_id']) if row['lead_id'] else None,
+    }
+
+def task_queryset(params):
+    queryset = Task.objects.values(*TASK_FIELDS).order_by('position', '-created_at')
+
+    if params.get('status') == 'done':
+        queryset = queryset.filter(is_completed=True)
+    elif params.get('status') == 'open':
+        queryset = queryset.filter(is_completed=False)
+    if params.get('priority'):
+        queryset = queryset.filter(priority=params['priority'])
+    if params.get('assignee'):
+        queryset = queryset.filter(assigned_to_id=query_param(params, 'assignee', int))
+    if params.get('lead'):
+        queryset = queryset.filter(lead_id=query_param(params, 'lead', uuid.UUID))
+
+    return queryset
+
+# ============================================================================
+# DASHBOARD
+# ============================================================================
+
+def growth(current, previous):
+    """Percent change, rounded for display"""
+    if not previous:
+        return 0
+    return round((float(current) - float(previous)) / float(previous) * 100, 1)
+
+def month_over_month():
+    """This month's and last month's new listings and lead conversion, one query per table"""
+    this_month = timezone.localdate().replace(day=1)
+    last_month = (this_month - timedelta(days=1)).replace(day=1)
+    in_this_month = Q(created_at__date__gte=this_month)
+    in_last_month = Q(created_at__date__gte=last_month, created_at__date__lt=this_month)
+    qualified = Q(status__in=QUALIFIED_LEAD_STATUSES)
+
+    listings = Property.objects.aggregate(
+        this_month=Count('id', filter=Q(list_date__gte=this_month)),
+        last_month=Count('id', filter=Q(list_date__gte=last_month, list_date__lt=this_month)),
+    )
+    leads = Lead.objects.aggregate(
+        this_month=Count('id', filter=in_this_month),
+        last_month=Count('id', filter=in_last_month),
+        qualified_this_month=Count('id', filter=in_this_month & qualified),
+        qualified_last_month=Count('id', filter=in_last_month & qualified),
+    )
+
+    def conversion(qualified_count, total):
+        return qualified_count / total * 100 if total else 0
+
+    return {
+        'listings': (listings['this_month'], listings['last_month']),
+        'conversion': (
+            conversion(leads['qualified_this_month'], leads['this_month']),
+            conversion(leads['qualified_last_month'], leads['last_month']),
+        ),
+    }
+
+def lead_distribution():
+    """Share of leads per source for the pie chart"""
+    sources = list(
+        Lead.objects.values('source__name').annotate(value=Count('id')).order_by('-value', 'source__name')
+    )
+    total = sum(source['value'] for source in sources)
+    if not total:
+        return []
+
+    # Leads without a source are folded into "Other"
+    named = [source for source in sources if source['source__name']]
+    slices = [(source['source__name'], source['value']) for source in named[:LEAD_DISTRIBUTION_SLICES]]
+    other = total - sum(value for name, value in slices)
+    if other:
+        slices.append(("Other", other))
 
-def get_recent_activities():
     return [
-        {
-            "id": 1,
-            "type": "Phone Call",
-            "description": "Called Sarah Johnson about property viewing",
-            "agent": "John Smith",
-            "time": "2 hours ago",
-            "duration": "15 min"
-        },
-        {
-            "id": 2,
-            "type": "Email",
-            "description": "Sent market analysis to Michael Chen",
-            "agent": "Lisa Davis",
-            "time": "4 hours ago",
-            "duration": None
-        },
-        {
-            "id": 3,
-            "type": "Meeting",
-            "description": "Client consultation with Emily Rodriguez",
-            "agent": "Mike Johnson",
-            "time": "1 day ago",
-            "duration": "45 min"
-        }
+        {"name": name, "value": round(value / total * 100), "color": LEAD_DISTRIBUTION_COLORS[index % len(LEAD_DISTRIBUTION_COLORS)]}
+        for index, (name, value) in enumerate(slices)
     ]
 
+# ============================================================================
+# REQUEST HELPERS
+# ============================================================================
+
+def crm_login_required(view):
+    """JSON 401 for anonymous requests; these endpoints expose CRM data"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"success": False, "error": "Authentication required"}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+def crm_list(view):
+    """JSON 400 for malformed filter or paging parameters"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ValueError as e:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+    return wrapper
+
+def quota_exceeded(resource):
+    return JsonResponse({
+        "success": False,
+        "error": QuotaExceeded.default_detail,
+        "code": QuotaExceeded.default_code,
+        "resource": resource,
+    }, status=QuotaExceeded.status_code)
+
+def split_name(name):
+    first_name, _, last_name = (name or "").strip().partition(" ")
+    return first_name, last_name.strip()
+
+def default_task_list(user):
+    """First column of the first board, created on first use"""
+    task_list = TaskList.objects.order_by('board_id', 'position', 'created_at').first()
+    if task_list is None:
+        board = TaskBoard.objects.create(name="Tasks", created_by=user)
+        task_list = TaskList.objects.create(board=board, name="To Do")
+    return task_list
+
 # API Endpoints
-@csrf_exempt
+# Reads set the CSRF cookie; creates, updates and deletes must send it back as X-CSRFToken
+@ensure_csrf_cookie
 @require_http_methods(["GET"])
+@crm_login_required
+@crm_list
 def api_leads(request):
-    """Get all leads"""
-    return JsonResponse({"leads": get_sample_leads()})
+    """Get leads (filters: status, source, agent, q)"""
+    rows, pagination = paginate(lead_queryset(request.GET), request)
+    now = timezone.now()
+    return JsonResponse({"leads": [lead_row(row, now) for row in rows], "pagination": pagination})
 
-@csrf_exempt
+@ensure_csrf_cookie
 @require_http_methods(["GET"])
+@crm_login_required
+@crm_list
 def api_properties(request):
-    """Get all properties"""
-    return JsonResponse({"properties": get_sample_properties()})
+    """Get properties (filters: status, property_type, city, min_price, max_price, beds, q)"""
+    rows, pagination = paginate(property_queryset(request.GET), request)
+    today = timezone.localdate()
+    return JsonResponse({"properties": [property_row(row, today) for row in rows], "pagination": pagination})
 
-@csrf_exempt
+@ensure_csrf_cookie
 @require_http_methods(["GET"])
+@crm_login_required
+@crm_list
 def api_transactions(request):
-    """Get all transactions"""
-    return JsonResponse({"transactions": get_sample_transactions()})
+    """Get transactions (filters: status, agent)"""
+    rows, pagination = paginate(transaction_queryset(request.GET), request)
+    today = timezone.localdate()
+    return JsonResponse({"transactions": [transaction_row(row, today) for row in rows], "pagination": pagination})
 
-@csrf_exempt
+@ensure_csrf_cookie
 @require_http_methods(["GET"])
+@crm_login_required
+@crm_list
 def api_tasks(request):
-    """Get all tasks"""
-    return JsonResponse({"tasks": get_sample_tasks()})
+    """Get tasks (filters: status=open|done, priority, assignee, lead)"""
+    rows, pagination = paginate(task_queryset(request.GET), request)
+    return JsonResponse({"tasks": [task_row(row) for row in rows], "pagination": pagination})
 
-@csrf_exempt
+@ensure_csrf_cookie
 @require_http_methods(["GET"])
+@crm_login_required
 def api_dashboard_stats(request):
     """Get dashboard statistics"""
+    stats = get_dashboard_stats()
+    monthly = get_monthly_performance(months=6)
+    current, previous = (monthly[-1], monthly[-2]) if len(monthly) > 1 else ({}, {})
+    trends = month_over_month()
+
     return JsonResponse({
-        "stats": get_dashboard_stats(),
-        "revenueData": get_revenue_data(),
-        "leadDistribution": get_lead_distribution()
+        "stats": {
+            "totalLeads": stats['total_leads'],
+            "leadsGrowth": growth(current.get('leads', 0), previous.get('leads', 0)),
+            "activeProperties": stats['active_listings'],
+            "propertiesGrowth": growth(*trends['listings']),
+            "monthlyRevenue": float(current.get('commission', 0)),
+            "revenueGrowth": growth(current.get('commission', 0), previous.get('commission', 0)),
+            "conversionRate": stats['conversion_rate'],
+            "conversionGrowth": round(trends['conversion'][0] - trends['conversion'][1], 1),
+        },
+        "revenueData": [
+            {
+                "month": datetime.strptime(row['month'], '%Y-%m').strftime('%b'),
+                "revenue": float(row['commission']),
+                "leads": row['leads'],
+            }
+            for row in monthly
+        ],
+        "leadDistribution": lead_distribution(),
     })
 
-@csrf_exempt
+@ensure_csrf_cookie
 @require_http_methods(["GET"])
+@crm_login_required
 def api_activities(request):
     """Get activity data"""
+    counts = Activity.objects.aggregate(**{
+        activity_type: Count('id', filter=Q(activity_type=activity_type))
+        for activity_type, label in ACTIVITY_CHART_TYPES
+    })
+    recent = Activity.objects.values(
+        'id', 'activity_type', 'subject', 'description',
+        'created_by__first_name', 'created_by__last_name',
+        'created_at', 'scheduled_at', 'completed_at',
+    ).order_by('-created_at')[:RECENT_ACTIVITY_LIMIT]
+
+    type_labels = dict(Activity.ACTIVITY_TYPE_CHOICES)
+    now = timezone.now()
+    recent_activities = []
+    for row in recent:
+        duration = None
+        if row['scheduled_at'] and row['completed_at'] and row['completed_at'] > row['scheduled_at']:
+            duration = f"{int((row['completed_at'] - row['scheduled_at']).total_seconds() // 60)} min"
+        recent_activities.append({
+            "id": str(row['id']),
+            "type": type_labels.get(row['activity_type'], row['activity_type']),
+            "description": row['description'] or row['subject'],
+            "agent": full_name(row['created_by__first_name'], row['created_by__last_name']),
+            "time": time_ago(row['created_at'], now),
+            "duration": duration,
+        })
+
     return JsonResponse({
-        "activityData": get_activity_data(),
-        "recentActivities": get_recent_activities()
+        "activityData": [
+            {"type": label, "count": counts[activity_type]}
+            for activity_type, label in ACTIVITY_CHART_TYPES
+        ],
+        "recentActivities": recent_activities,
     })
 
-@csrf_exempt
 @require_http_methods(["POST"])
+@crm_login_required
 def api_create_lead(request):
     """Create a new lead"""
     try:
         data = json.loads(request.body)
-        # In a real application, you would save this to the database
-        new_lead = {
-            "id": len(get_sample_leads()) + 1,
-            "name": data.get("name", ""),
-            "email": data.get("email", ""),
-            "phone": data.get("phone", ""),
-            "status": "new",
-            "score": 50,
-            "source": data.get("source", "Manual"),
-            "budget": data.get("budget", ""),
-            "preferences": data.get("preferences", ""),
-            "lastContact": "Just now",
-            "avatar": "/api/placeholder/32/32"
-        }
-        return JsonResponse({"success": True, "lead": new_lead})
+        first_name, last_name = split_name(data.get("name"))
+        if not first_name or not data.get("email"):
+            raise ValueError("Name and email are required")
+
+        # Someone already on file is returned instead of being entered twice
+        lead_id = find_duplicate(get_current_tenant_id(), data["email"], data.get("phone", ""))
+        if lead_id:
+            touch_lead(lead_id)
+            Activity.objects.create(
+                activity_type="note",
+                subject="Duplicate lead entry",
+                description=f"Entered again as {first_name} {last_name} <{data['email']}>",
+                lead_id=lead_id,
+                created_by=request.user,
+            )
+            row = lead_queryset({}).get(pk=lead_id)
+            return JsonResponse({"success": True, "duplicate": True, "lead": lead_row(row, timezone.now())})
+
+        # SubscriptionMiddleware is optional, so the plan limit is checked here
+        enforce_quota(getattr(request, 'tenant_id', None), 'leads')
+        min_price, max_price = parse_budget(data.get("budget"))
+        source = None
+        if data.get("source"):
+            source = LeadSource.objects.filter(name=data["source"]).first()
+
+        lead = Lead.objects.create(
+            first_name=first_name,
+            last_name=last_name,
+            email=data["email"],
+            phone=data.get("phone", ""),
+            source=source,
+            min_price=min_price,
+            max_price=max_price,
+            preferred_locations=data.get("preferences", ""),
+            assigned_agent=request.user,
+        )
+        row = lead_queryset({}).get(pk=lead.pk)
+        return JsonResponse({"success": True, "lead": lead_row(row, timezone.now())})
+    except QuotaExceeded:
+        return quota_exceeded('leads')
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=400)
 
-@csrf_exempt
 @require_http_methods(["POST"])
+@crm_login_required
 def api_create_property(request):
     """Create a new property"""
     try:
         data = json.loads(request.body)
-        # In a real application, you would save this to the database
-        new_property = {
-            "id": len(get_sample_properties()) + 1,
-            "address": data.get("address", ""),
-            "price": data.get("price", ""),
-            "beds": data.get("beds", 0),
-            "baths": data.get("baths", 0),
-            "sqft": data.get("sqft", ""),
-            "status": "Active",
-            "daysOnMarket": 0,
-            "views": 0,
-            "leads": 0,
-            "favorites": 0,
-            "agent": data.get("agent", ""),
-            "image": "/api/placeholder/300/200"
-        }
-        return JsonResponse({"success": True, "property": new_property})
+        if not data.get("address") or not data.get("price"):
+            raise ValueError("Address and price are required")
+        enforce_quota(getattr(request, 'tenant_id', None), 'properties')
+
+        prop = Property.objects.create(
+            address=data["address"],
+            city=data.get("city", ""),
+            state=data.get("state", ""),
+            zip_code=data.get("zip_code", ""),
+            property_type=data.get("property_type", "single_family"),
+            list_price=parse_money(data["price"]),
+            bedrooms=int(data.get("beds") or 0),
+            bathrooms=Decimal(str(data.get("baths") or 0)),
+            square_feet=int(parse_money(data.get("sqft")) or 0) or None,
+            list_date=timezone.localdate(),
+            listing_agent=request.user,
+        )
+        row = property_queryset({}).get(pk=prop.pk)
+        return JsonResponse({"success": True, "property": property_row(row, timezone.localdate())})
+    except QuotaExceeded:
+        return quota_exceeded('properties')
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=400)
 
-@csrf_exempt
 @require_http_methods(["POST"])
+@crm_login_required
 def api_create_task(request):
     """Create a new task"""
     try:
         data = json.loads(request.body)
-        # In a real application, you would save this to the database
-        new_task = {
-            "id": len(get_sample_tasks()) + 1,
-            "title": data.get("title", ""),
-            "description": data.get("description", ""),
-            "priority": data.get("priority", "Medium"),
-            "status": "To Do",
-            "dueDate": data.get("dueDate", ""),
-            "assignee": data.get("assignee", ""),
-            "leadId": data.get("leadId", None)
-        }
-        return JsonResponse({"success": True, "task": new_task})
+        if not data.get("title"):
+            raise ValueError("Title is required")
+
+        priority = str(data.get("priority", "medium")).lower()
+        if priority not in TASK_PRIORITY_LABELS:
+            raise ValueError(f"Invalid priority: {data.get('priority')}")
+
+        due_date = None
+        if data.get("dueDate"):
+            due_date = timezone.make_aware(datetime.fromisoformat(data["dueDate"]))
+
+        task = Task.objects.create(
+            task_list=default_task_list(request.user),
+            title=data["title"],
+            description=data.get("description", ""),
+            priority=priority,
+            due_date=due_date,
+            assigned_to=request.user,
+            created_by=request.user,
+            lead=Lead.objects.filter(pk=data["leadId"]).first() if data.get("leadId") else None,
+        )
+        row = task_queryset({}).get(pk=task.pk)
+        return JsonResponse({"success": True, "task": task_row(row)})
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=400)
 
-@csrf_exempt
+# Lead fields the CRM can edit, by request key
+LEAD_UPDATE_FIELDS = {
+    "email": "email",
+    "phone": "phone",
+    "status": "status",
+    "score": "lead_score",
+    "notes": "notes",
+    "preferences": "preferred_locations",
+}
+
 @require_http_methods(["PUT"])
+@crm_login_required
 def api_update_lead(request, lead_id):
     """Update a lead"""
     try:
         data = json.loads(request.body)
-        # In a real application, you would update the database
+        updates = {field: data[key] for key, field in LEAD_UPDATE_FIELDS.items() if key in data}
+        if "name" in data:
+            updates["first_name"], updates["last_name"] = split_name(data["name"])
+        if "budget" in data:
+            updates["min_price"], updates["max_price"] = parse_budget(data["budget"])
+        if "status" in updates and updates["status"] not in dict(Lead.LEAD_STATUS_CHOICES):
+            raise ValueError(f"Invalid status: {updates['status']}")
+        # update() skips Lead.save(), so changed contact details are rehashed here
+        if "email" in updates:
+            updates["email_hash"] = hash_email(updates["email"])
+        if "phone" in updates:
+            updates["phone_hash"] = hash_phone(updates["phone"])
+
+        # Single UPDATE of the changed columns; the row is only read first when
+        # a status change has to move the agent's open-lead counter
+        updates["updated_at"] = timezone.now()
+        stored = None
+        if "status" in updates:
+            stored = Lead.objects.filter(pk=lead_id).values_list("tenant_id", "assigned_agent_id", "status").first()
+        if not Lead.objects.filter(pk=lead_id).update(**updates):
+            return JsonResponse({"success": False, "error": "Lead not found"}, status=404)
+        if stored:
+            tenant_id, agent_id, previous_status = stored
+            lead_load_changed(tenant_id, (agent_id, previous_status), (agent_id, updates["status"]))
+        if any(field in updates for field in MATCH_FIELDS):
+            refresh_leads([lead_id])
         return JsonResponse({"success": True, "message": f"Lead {lead_id} updated successfully"})
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=400)
 
-@csrf_exempt
 @require_http_methods(["DELETE"])
+@crm_login_required
 def api_delete_lead(request, lead_id):
     """Delete a lead"""
     try:
-        # In a real application, you would delete from the database
+        deleted, _ = Lead.objects.filter(pk=lead_id).delete()
+        if not deleted:
+            return JsonResponse({"success": False, "error": "Lead not found"}, status=404)
         return JsonResponse({"success": True, "message": f"Lead {lead_id} deleted successfully"})
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=400)
-
@@ -9,8 +9,12 @@ class CoreConfig(AppConfig):
     def ready(self):
         """
         This method is called when Django starts up.
-        It ensures the admin user exists every time the application runs.
+        It registers signal handlers and ensures the admin user exists
+        every time the application runs.
         """
+        # Register model signal handlers
+        from . import signals  # noqa: F401
+
         # Only run this in production or when explicitly enabled
         if os.environ.get('DJANGO_SETTINGS_MODULE') and 'test' not in os.environ.get('DJANGO_SETTINGS_MODULE', ''):
             self.ensure_admin_user()
@@ -0,0 +1,137 @@
+# Revolution Realty - Tenant Branding Cache
+# Versioned branding snapshots and compiled CSS variables per tenant
+
+import re
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .saas_models import Tenant, TenantBranding
+
+# Snapshots are immutable per version, so they can live long; version pointers
+# share the TTL so entries for deleted tenants age out
+BRANDING_CACHE_TTL = 60 * 60 * 24
+
+# Version used for tenants that have not customized their branding
+DEFAULT_VERSION = 'default'
+
+BRANDING_FIELDS = [
+    'primary_color', 'secondary_color', 'accent_color', 'background_color', 'text_color',
+    'font_family', 'heading_font', 'site_title', 'tagline', 'hero_title', 'hero_subtitle',
+    'about_text', 'phone', 'email', 'address', 'facebook_url', 'instagram_url',
+    'linkedin_url', 'twitter_url', 'youtube_url', 'meta_description', 'meta_keywords',
+    'google_analytics_id', 'facebook_pixel_id', 'custom_css', 'custom_js',
+]
+IMAGE_FIELDS = ['logo', 'logo_dark', 'favicon', 'hero_image']
+
+# CSS custom property -> branding field
+CSS_COLOR_VARIABLES = [
+    ('--color-primary', 'primary_color'),
+    ('--color-secondary', 'secondary_color'),
+    ('--color-accent', 'accent_color'),
+    ('--color-background', 'background_color'),
+    ('--color-text', 'text_color'),
+]
+
+HEX_COLOR = re.compile(r'^#[0-9A-Fa-f]{3}([0-9A-Fa-f]{3})?$')
+UNSAFE_FONT_CHARS = re.compile(r'[;{}<>\\]')
+
+# ============================================================================
+# CACHE KEYS
+# ============================================================================
+
+def version_key(tenant_id):
+    return f"branding_version:{tenant_id}"
+
+def snapshot_key(tenant_id, version):
+    return f"branding:{tenant_id}:{version}"
+
+def branding_version(branding):
+    """Version of a branding row; changes whenever it is saved"""
+    if branding.pk is None or branding.updated_at is None:
+        return DEFAULT_VERSION
+    return str(int(branding.updated_at.timestamp() * 1000000))
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+def compile_css(branding):
+    """CSS variables for a tenant's colors and fonts, followed by its custom CSS"""
+    defaults = {field.name: field.default for field in TenantBranding._meta.fields}
+    lines = [':root {']
+    for variable, field in CSS_COLOR_VARIABLES:
+        value = getattr(branding, field)
+        if not HEX_COLOR.match(value or ''):
+            value = defaults[field]
+        lines.append(f'  {variable}: {value};')
+
+    font_family = UNSAFE_FONT_CHARS.sub('', branding.font_family).strip() or defaults['font_family']
+    heading_font = UNSAFE_FONT_CHARS.sub('', branding.heading_font).strip() or font_family
+    lines.append(f'  --font-family: {font_family};')
+    lines.append(f'  --font-heading: {heading_font};')
+    lines.append('}')
+
+    if branding.custom_css:
+        lines.extend(['', branding.custom_css])
+    return '\n'.join(lines) + '\n'
+
+def build_snapshot(tenant_id, branding):
+    """Plain-dict copy of a tenant's branding, safe to cache"""
+    version = branding_version(branding)
+    snapshot = {field: getattr(branding, field) for field in BRANDING_FIELDS}
+    for field in IMAGE_FIELDS:
+        image = getattr(branding, field)
+        snapshot[f'{field}_url'] = image.url if image else None
+    snapshot['version'] = version
+    snapshot['etag'] = f'"{tenant_id}-{version}"'
+    snapshot['css'] = compile_css(branding)
+    return snapshot
+
+def warm_branding(tenant_id, branding=None):
+    """
+    Cache a tenant's current branding snapshot and point its version at it;
+    returns None, caching nothing, for unknown tenants
+    """
+    if branding is None:
+        branding = TenantBranding.objects.filter(tenant_id=tenant_id).first()
+    if branding is None:
+        if not Tenant.objects.filter(pk=tenant_id).exists():
+            return None
+        # Defaults only; nothing is written to the database
+        branding = TenantBranding(tenant_id=tenant_id)
+
+    snapshot = build_snapshot(tenant_id, branding)
+    cache.set(snapshot_key(tenant_id, snapshot['version']), snapshot, BRANDING_CACHE_TTL)
+    cache.set(version_key(tenant_id), snapshot['version'], BRANDING_CACHE_TTL)
+    return snapshot
+
+def get_branding(tenant_id):
+    """Cached branding snapshot for a tenant, None if it does not exist"""
+    version = cache.get(version_key(tenant_id))
+    if version is not None:
+        snapshot = cache.get(snapshot_key(tenant_id, version))
+        if snapshot is not None:
+            return snapshot
+    return warm_branding(tenant_id)
+
+async def aget_branding(tenant_id):
+    """Async get_branding"""
+    version = await cache.aget(version_key(tenant_id))
+    if version is not None:
+        snapshot = await cache.aget(snapshot_key(tenant_id, version))
+        if snapshot is not None:
+            return snapshot
+    return await sync_to_async(warm_branding)(tenant_id)
+
+def invalidate_branding(tenant_id):
+    cache.delete(version_key(tenant_id))
+
+def prewarm_branding_cache():
+    """Cache branding for every tenant; returns the number warmed"""
+    brandings = {branding.tenant_id: branding for branding in TenantBranding.objects.all()}
+    count = 0
+    for tenant_id in Tenant.objects.values_list('id', flat=True).iterator():
+        warm_branding(tenant_id, brandings.get(tenant_id) or TenantBranding(tenant_id=tenant_id))
+        count += 1
+    return count
@@ -0,0 +1,238 @@
+# Revolution Realty - Bulk Lead Operations
+# Set-based status, assignment, tagging and delete actions with batched audit rows
+
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from .lead_matching import refresh_leads
+from .lead_routing import ROUTING_ROLES, is_open, recount_agent_load
+from .models import Activity, Lead, LeadTag
+from .quotas import adjust_usage, current_period
+from .saas_models import TenantUser
+from .stats import month_start, record_leads
+
+# Rows per UPDATE/DELETE/INSERT statement, keeping IN lists within backend limits
+BULK_CHUNK_SIZE = 500
+
+# Filter keys accepted in place of explicit IDs -> Lead lookups
+LEAD_FILTERS = {
+    'status': 'status',
+    'lead_type': 'lead_type',
+    'assigned_agent': 'assigned_agent_id',
+    'source': 'source_id',
+    'tag': 'tags__name',
+    'created_after': 'created_at__date__gte',
+    'created_before': 'created_at__date__lte',
+}
+
+class BulkActionError(ValueError):
+    pass
+
+# ============================================================================
+# SELECTION
+# ============================================================================
+
+def select_leads(ids=None, filters=None):
+    """The current tenant's leads by explicit IDs or by filter; one is required"""
+    queryset = Lead.objects.all()
+    if ids:
+        return queryset.filter(pk__in=ids)
+    if filters:
+        unknown = set(filters) - set(LEAD_FILTERS)
+        if unknown:
+            raise BulkActionError(f"Unknown filter: {', '.join(sorted(unknown))}")
+        return queryset.filter(**{LEAD_FILTERS[key]: value for key, value in filters.items()})
+    raise BulkActionError('Provide lead ids or a filter')
+
+def lead_keys(queryset, field):
+    """
+    (id, tenant_id, current value of field) for every selected lead, read in
+    one query; filters that join tags can repeat a lead, so rows are deduplicated
+    """
+    rows = queryset.order_by().values_list('pk', 'tenant_id', field)
+    return list({row[0]: row for row in rows}.values())
+
+def chunks(items, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def update_leads(leads, **values):
+    """
+    One UPDATE per chunk of leads; update() skips auto_now, so updated_at is set
+    here, and skips the lead signals, so callers recount agent load afterwards
+    """
+    values['updated_at'] = timezone.now()
+    for chunk in chunks(leads):
+        Lead.all_objects.filter(pk__in=[lead[0] for lead in chunk]).update(**values)
+
+def audit(leads, subject, user):
+    """Activity rows recording a bulk change, inserted in batches"""
+    # bulk_create skips the pre_save tenant assignment, so each row copies its lead's tenant
+    activities = Activity.objects.bulk_create([
+        Activity(activity_type='note', subject=subject, lead_id=lead[0], tenant_id=lead[1], created_by=user)
+        for lead in leads
+    ], batch_size=BULK_CHUNK_SIZE)
+    return len(activities)
+
+def delete_leads(lead_ids):
+    """
+    Delete leads set-wise; returns the number deleted.
+
+    Leads go through Django's Collector a chunk at a time, so each related
+    table is handled by its own on_delete in one statement per chunk. The
+    quota, rollup and routing receivers would otherwise cost several queries
+    per lead; they skip leads marked _bulk_deleted, and their updates are
+    applied once per tenant (and month) afterwards.
+    """
+    lead_ids = list(lead_ids)
+    leads = []
+    using = router.db_for_write(Lead)
+    with transaction.atomic(using=using):
+        for chunk in chunks(lead_ids):
+            batch = list(Lead.all_objects.filter(pk__in=chunk).only('pk', 'tenant_id', 'created_at'))
+            for lead in batch:
+                lead._bulk_deleted = True
+            collector = Collector(using=using)
+            collector.collect(batch)
+            collector.delete()
+            leads.extend((lead.tenant_id, lead.created_at) for lead in batch)
+
+        tenant_ids = {tenant_id for tenant_id, created_at in leads if tenant_id}
+        recount_agent_load(tenant_ids)
+        # Deleting a lead only frees quota in the month it was created
+        period = current_period()
+        this_period = Counter(
+            tenant_id for tenant_id, created_at in leads
+            if tenant_id and timezone.localdate(created_at).replace(day=1) == period
+        )
+        for tenant_id, count in this_period.items():
+            adjust_usage(tenant_id, 'leads', -count)
+        by_month = Counter((tenant_id, month_start(created_at)) for tenant_id, created_at in leads)
+        for (tenant_id, month), count in by_month.items():
+            record_leads(tenant_id, month, -count)
+
+    return len(leads)
+
+def clean_tags(tags):
+    if isinstance(tags, str):
+        tags = [tags]
+    tags = sorted({str(tag).strip()[:LeadTag._meta.get_field('name').max_length] for tag in tags or []} - {''})
+    if not tags:
+        raise BulkActionError('Provide at least one tag')
+    return tags
+
+# ============================================================================
+# ACTIONS
+# ============================================================================
+
+def bulk_update_status(queryset, user, status=None, **params):
+    """Move leads to a status; leads already in it are left alone"""
+    if status not in dict(Lead.LEAD_STATUS_CHOICES):
+        raise BulkActionError('Invalid status')
+
+    with transaction.atomic():
+        leads = lead_keys(queryset, 'status')
+        changed = [lead for lead in leads if lead[2] != status]
+        update_leads(changed, status=status)
+        subject = f'Status updated to {dict(Lead.LEAD_STATUS_CHOICES)[status]}'
+        activities = audit(changed, subject, user)
+        recount_agent_load({lead[1] for lead in changed if lead[1]})
+        # Only closing or reopening a lead changes its listing match postings
+        refresh_leads([lead[0] for lead in changed if is_open(lead[2]) != is_open(status)])
+
+    return {'matched': len(leads), 'updated': len(changed), 'activities': activities}
+
+def bulk_assign_agent(queryset, user, agent_id=None, **params):
+    """
+    Reassign leads to an agent; raises User.DoesNotExist unless the agent is
+    an active member, in a routing role, of every tenant the leads belong to
+    """
+    agent = User.objects.get(id=agent_id, is_active=True)
+
+    with transaction.atomic():
+        leads = lead_keys(queryset, 'assigned_agent_id')
+        tenant_ids = {lead[1] for lead in leads}
+        memberships = TenantUser.objects.filter(
+            user=agent, tenant_id__in=tenant_ids - {None}, role__in=ROUTING_ROLES, is_active=True
+        )
+        if memberships.count() != len(tenant_ids):
+            raise User.DoesNotExist('Agent is not an active agent of these leads\' tenant')
+        changed = [lead for lead in leads if lead[2] != agent.pk]
+        update_leads(changed, assigned_agent=agent)
+        activities = audit(changed, f'Lead assigned to {agent.get_full_name()}', user)
+        recount_agent_load({lead[1] for lead in changed if lead[1]})
+
+    return {'matched': len(leads), 'updated': len(changed), 'activities': activities}
+
+def bulk_add_tags(queryset, user, tags=None, **params):
+    """Tag leads; tags a lead already has are skipped"""
+    tags = clean_tags(tags)
+
+    with transaction.atomic():
+        leads = lead_keys(queryset, 'tenant_id')
+        new_tags = []
+        tagged = []
+        for chunk in chunks(leads):
+            existing = set(LeadTag.objects.filter(
+                lead_id__in=[lead[0] for lead in chunk], name__in=tags
+            ).values_list('lead_id', 'name'))
+            for lead in chunk:
+                missing = [LeadTag(lead_id=lead[0], name=tag) for tag in tags if (lead[0], tag) not in existing]
+                if missing:
+                    new_tags.extend(missing)
+                    tagged.append(lead)
+
+        # ignore_conflicts covers a concurrent request tagging the same lead
+        LeadTag.objects.bulk_create(new_tags, batch_size=BULK_CHUNK_SIZE, ignore_conflicts=True)
+        update_leads(tagged)
+        activities = audit(tagged, f"Tagged {', '.join(tags)}", user)
+
+    return {'matched': len(leads), 'updated': len(tagged), 'tags_added': len(new_tags), 'activities': activities}
+
+def bulk_remove_tags(queryset, user, tags=None, **params):
+    """Remove tags from leads"""
+    tags = clean_tags(tags)
+
+    with transaction.atomic():
+        leads = lead_keys(queryset, 'tenant_id')
+        untagged = []
+        removed = 0
+        for chunk in chunks(leads):
+            chunk_tags = LeadTag.objects.filter(lead_id__in=[lead[0] for lead in chunk], name__in=tags)
+            affected = set(chunk_tags.values_list('lead_id', flat=True))
+            removed += chunk_tags.delete()[0]
+            untagged.extend(lead for lead in chunk if lead[0] in affected)
+
+        update_leads(untagged)
+        activities = audit(untagged, f"Removed tags {', '.join(tags)}", user)
+
+    return {'matched': len(leads), 'updated': len(untagged), 'tags_removed': removed, 'activities': activities}
+
+def bulk_delete(queryset, user, **params):
+    """Delete leads (their activities go with them, so no audit rows are written)"""
+    with transaction.atomic():
+        leads = lead_keys(queryset, 'tenant_id')
+        deleted = delete_leads([lead[0] for lead in leads])
+
+    return {'matched': len(leads), 'deleted': deleted}
+
+BULK_ACTIONS = {
+    'update_status': bulk_update_status,
+    'assign_agent': bulk_assign_agent,
+    'add_tags': bulk_add_tags,
+    'remove_tags': bulk_remove_tags,
+    'delete': bulk_delete,
+}
+
+def run_bulk_action(action, queryset, user, params):
+    """Run a named bulk action over selected leads; returns its counts"""
+    if action not in BULK_ACTIONS:
+        raise BulkActionError(f"Unknown action. Choose from: {', '.join(BULK_ACTIONS)}")
+    params = {key: value for key, value in params.items() if key in ('status', 'agent_id', 'tags')}
+    result = BULK_ACTIONS[action](queryset, user, **params)
+    result['action'] = action
+    return result
@@ -0,0 +1,72 @@
+# Revolution Realty - Property Counters
+# Buffered view/favorite/lead/showing counters flushed with batched F() updates
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Property, PropertyFavorite
+from .write_behind import WriteBehindBuffer
+
+# Buffered increments are written at least this often (seconds) ...
+COUNTER_FLUSH_INTERVAL = 5
+
+# ... or as soon as this many property counters have pending increments
+COUNTER_MAX_PENDING = 1000
+
+# Counter name -> Property column
+COUNTER_FIELDS = {
+    'views': 'view_count',
+    'favorites': 'favorite_count',
+    'leads': 'lead_count',
+    'showings': 'showing_count',
+}
+
+# ============================================================================
+# WRITE-BEHIND BUFFER
+# ============================================================================
+
+def write_counters(items):
+    """
+    Add one increment to a batch of (property_id, column) counters.
+
+    UPDATE ... SET view_count = view_count + n never reads the row, leaves
+    updated_at alone and only holds the row lock for the update. Properties
+    with the same pending increment share the statement, so a burst of
+    single views across a listing page is a handful of UPDATEs.
+    """
+    (_, field), value = items[0]
+    property_ids = [property_id for (property_id, _), _ in items]
+    Property.all_objects.filter(pk__in=property_ids).update(**{field: F(field) + value})
+
+counter_buffer = WriteBehindBuffer(
+    'property counters', write_counters, COUNTER_FLUSH_INTERVAL, COUNTER_MAX_PENDING,
+    batch_key=lambda key, value: (key[1], value),
+)
+
+def record(property_id, counter, value=1):
+    """Count a view, favorite, lead or showing; written to Property shortly after"""
+    counter_buffer.add((str(property_id), COUNTER_FIELDS[counter]), value)
+
+def pending_count(property_id, counter):
+    """Increments for a property still buffered in this process"""
+    return counter_buffer.pending_delta((str(property_id), COUNTER_FIELDS[counter]))
+
+# ============================================================================
+# FAVORITES
+# ============================================================================
+
+def toggle_favorite(property_id, user):
+    """Save or unsave a property for a user; returns whether it is now saved"""
+    deleted, _ = PropertyFavorite.objects.filter(property_id=property_id, user=user).delete()
+    if deleted:
+        record(property_id, 'favorites', -1)
+        return False
+
+    try:
+        with transaction.atomic():
+            PropertyFavorite.objects.create(property_id=property_id, user=user)
+    except IntegrityError:
+        # A concurrent request saved it first
+        return True
+    record(property_id, 'favorites', 1)
+    return True
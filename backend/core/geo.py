@@ -0,0 +1,197 @@
+# Revolution Realty - Geospatial Search
+# Geohash grid index for map viewport and radius searches without PostGIS
+
+import math
+import re
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~5m cells, stored on Property
+
+# Viewports are covered by at most this many grid cells
+MAX_COVERING_CELLS = 16
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+# Radius searches wider than this should use a viewport instead
+MAX_RADIUS_MILES = 500
+
+ZIP_CODE = re.compile(r'\b\d{5}\b')
+LOCATION_SEPARATORS = re.compile(r'[,;/\n]+')
+
+# ============================================================================
+# GEOHASH
+# ============================================================================
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits = bits << 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(geohash)
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+def prefix_upper_bound(prefix):
+    """Smallest string sorting after every geohash that starts with prefix"""
+    prefix = prefix.rstrip(GEOHASH_ALPHABET[-1])
+    if not prefix:
+        return None
+    next_char = GEOHASH_ALPHABET[GEOHASH_ALPHABET.index(prefix[-1]) + 1]
+    return prefix[:-1] + next_char
+
+def covering_cells(south, west, north, east):
+    """Geohash prefixes covering a bounding box, as few and as fine as allowed"""
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        height, width = cell_size(precision)
+        rows = math.ceil((north - south) / height) + 1
+        columns = math.ceil((east - west) / width) + 1
+        if rows * columns <= MAX_COVERING_CELLS:
+            break
+        precision -= 1
+
+    height, width = cell_size(precision)
+    cells = set()
+    latitude = south
+    while True:
+        longitude = west
+        while True:
+            cells.add(encode_geohash(min(latitude, north), min(longitude, east), precision))
+            if longitude >= east:
+                break
+            longitude += width
+        if latitude >= north:
+            break
+        latitude += height
+    return sorted(cells)
+
+def covering_ranges(south, west, north, east):
+    """Covering cells as [lower, upper) geohash ranges, adjacent cells merged"""
+    ranges = []
+    for prefix in covering_cells(south, west, north, east):
+        upper = prefix_upper_bound(prefix)
+        if ranges and ranges[-1][1] == prefix:
+            ranges[-1][1] = upper
+        else:
+            ranges.append([prefix, upper])
+    return [tuple(bounds) for bounds in ranges]
+
+# ============================================================================
+# PARAMETER PARSING
+# ============================================================================
+
+def parse_coordinate(value, limit):
+    """A finite degree value within [-limit, limit]; raises ValueError otherwise"""
+    number = float(value)
+    if not math.isfinite(number) or abs(number) > limit:
+        raise ValueError(f'Coordinate out of range: {value}')
+    return number
+
+def parse_bbox(value):
+    """'west,south,east,north' -> (south, west, north, east); raises ValueError if malformed"""
+    parts = str(value).split(',')
+    if len(parts) != 4:
+        raise ValueError(f'Invalid bounding box: {value}')
+    west, east = (parse_coordinate(part, 180.0) for part in (parts[0], parts[2]))
+    south, north = (parse_coordinate(part, 90.0) for part in (parts[1], parts[3]))
+    if south > north or west > east:
+        raise ValueError(f'Inverted bounding box: {value}')
+    return south, west, north, east
+
+def parse_radius(latitude, longitude, radius):
+    """(latitude, longitude, radius in miles) from request values; raises ValueError if malformed"""
+    radius_miles = float(radius)
+    if not math.isfinite(radius_miles) or not 0 < radius_miles <= MAX_RADIUS_MILES:
+        raise ValueError(f'Radius must be between 0 and {MAX_RADIUS_MILES} miles')
+    return parse_coordinate(latitude, 90.0), parse_coordinate(longitude, 180.0), radius_miles
+
+# ============================================================================
+# QUERY HELPERS
+# ============================================================================
+
+def bounding_box_filter(south, west, north, east):
+    """
+    Q restricting properties to a bounding box: index range scans over the
+    covering geohash cells, then the exact coordinate bounds
+    """
+    cells = Q()
+    for lower, upper in covering_ranges(south, west, north, east):
+        cell = Q(geohash__gte=lower)
+        if upper:
+            cell &= Q(geohash__lt=upper)
+        cells |= cell
+    return cells & Q(
+        latitude__gte=south, latitude__lte=north,
+        longitude__gte=west, longitude__lte=east,
+    )
+
+def radius_bounding_box(latitude, longitude, radius_miles):
+    """(south, west, north, east) enclosing a radius around a point"""
+    lat_delta = radius_miles / MILES_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    lng_delta = radius_miles / (MILES_PER_DEGREE_LAT * cos_lat)
+    return (
+        max(latitude - lat_delta, -90.0), max(longitude - lng_delta, -180.0),
+        min(latitude + lat_delta, 90.0), min(longitude + lng_delta, 180.0),
+    )
+
+def distance_expression(latitude, longitude):
+    """Haversine great-circle distance in miles from a point to each property"""
+    lat1 = math.radians(latitude)
+    lat2 = Radians(F('latitude'), output_field=FloatField())
+    dlat = lat2 - lat1
+    dlng = Radians(F('longitude'), output_field=FloatField()) - math.radians(longitude)
+    a = Power(Sin(dlat / 2), 2) + math.cos(lat1) * Cos(lat2) * Power(Sin(dlng / 2), 2)
+    return 2 * EARTH_RADIUS_MILES * ASin(Sqrt(a), output_field=FloatField())
+
+def within_radius(queryset, latitude, longitude, radius_miles):
+    """Properties within a radius, annotated with distance in miles"""
+    south, west, north, east = radius_bounding_box(latitude, longitude, radius_miles)
+    return queryset.filter(
+        bounding_box_filter(south, west, north, east)
+    ).annotate(
+        distance=distance_expression(latitude, longitude)
+    ).filter(distance__lte=radius_miles)
+
+# ============================================================================
+# LOCATION KEYS
+# ============================================================================
+
+def location_keys(text):
+    """Lowercased cities/areas and zip codes named in free text"""
+    text = (text or '').lower()
+    keys = {part.strip() for part in LOCATION_SEPARATORS.split(text)} - {''}
+    return keys | set(ZIP_CODE.findall(text))
+
+def property_location_keys(city, zip_code):
+    """The keys a listing is found under: its city and 5-digit zip"""
+    keys = {city.strip().lower()} if city and city.strip() else set()
+    return keys | set(ZIP_CODE.findall(zip_code or ''))
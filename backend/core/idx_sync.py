@@ -0,0 +1,293 @@
+# Revolution Realty - IDX Feed Sync
+# Incremental MLS/IDX listing sync with content-hash diffing and batched upserts
+
+import logging
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .lead_matching import match_properties
+from .models import Property
+from .property_import import (
+    IMPORT_BATCH_SIZE, MAX_REPORTED_ERRORS, PARSERS, RowError,
+    build_property, detect_format, normalize_keys, upsert_batch,
+)
+from .saas_models import FeedSyncRun, TenantIntegration
+
+logger = logging.getLogger(__name__)
+
+# Minutes between scheduled syncs of one feed
+IDX_SYNC_INTERVAL_MINUTES = getattr(settings, 'IDX_SYNC_INTERVAL_MINUTES', 30)
+
+# A feed marked running for longer than this is assumed crashed and may be restarted
+SYNC_LOCK_TIMEOUT = timedelta(hours=2)
+
+# Feed columns (lowercased) carrying a listing's last modification time
+MODIFIED_ALIASES = ['modificationtimestamp', 'modified', 'last_modified', 'updated_at']
+
+# ============================================================================
+# FEED ADAPTERS
+# ============================================================================
+
+def row_modified_at(row):
+    """Modification timestamp of a normalized feed row, or None"""
+    for alias in MODIFIED_ALIASES:
+        value = row.get(alias)
+        if value:
+            modified = parse_datetime(str(value).strip())
+            if modified is None:
+                return None
+            if timezone.is_naive(modified):
+                modified = timezone.make_aware(modified, dt_timezone.utc)
+            return modified
+    return None
+
+class FeedAdapter:
+    """
+    Source of listing rows for a feed.
+
+    Subclasses yield raw listing dicts (RESO or flat field names) modified
+    at or after `since`, or every listing when `since` is None.
+    """
+
+    def __init__(self, configuration):
+        self.configuration = configuration
+
+    def fetch_modified(self, since):
+        raise NotImplementedError
+
+class LocalFileFeedAdapter(FeedAdapter):
+    """Feed read from a CSV / JSON-lines / XML export on disk"""
+
+    def fetch_modified(self, since):
+        path = self.configuration['path']
+        file_format = self.configuration.get('format') or detect_format(path)
+        if file_format not in PARSERS:
+            raise ValueError(f'Unsupported feed format for {path}')
+
+        with open(path, 'rb') as stream:
+            for raw in PARSERS[file_format](stream):
+                if since is not None and isinstance(raw, dict):
+                    modified = row_modified_at(normalize_keys(raw))
+                    if modified is not None and modified < since:
+                        continue
+                yield raw
+
+# Adapters by TenantIntegration.configuration['adapter']
+FEED_ADAPTERS = {
+    'local_file': LocalFileFeedAdapter,
+}
+
+def get_feed_adapter(tenant_integration):
+    configuration = tenant_integration.configuration or {}
+    adapter_class = FEED_ADAPTERS.get(configuration.get('adapter'))
+    if adapter_class is None:
+        raise ValueError(f"Unknown feed adapter: {configuration.get('adapter')!r}")
+    return adapter_class(configuration)
+
+# ============================================================================
+# SYNC ENGINE
+# ============================================================================
+
+class FeedSync:
+    """
+    Incremental sync of one IDX/MLS feed.
+
+    Pulls listings modified since the feed's last_sync, skips rows whose
+    content hash matches the stored listing, and upserts the rest in
+    batches. Each run is recorded as a FeedSyncRun.
+    """
+
+    def __init__(self, tenant_integration, adapter=None, batch_size=IMPORT_BATCH_SIZE):
+        self.tenant_integration = tenant_integration
+        self.adapter = adapter or get_feed_adapter(tenant_integration)
+        self.batch_size = batch_size
+
+    def acquire(self, now):
+        """Mark the feed running unless another sync already holds it"""
+        stale = now - SYNC_LOCK_TIMEOUT
+        return TenantIntegration.objects.filter(
+            pk=self.tenant_integration.pk
+        ).filter(
+            ~Q(sync_status='running') | Q(updated_at__lt=stale)
+        ).update(sync_status='running', updated_at=now) == 1
+
+    def flush(self, run, batch):
+        if not batch:
+            return
+        # Listings are unique per (tenant, mls_number); other brokerages can reuse the number
+        tenant_id = self.tenant_integration.tenant_id
+        listings = {(tenant_id, listing.mls_number): listing for listing in batch}
+        stored = {
+            (tenant_id, mls_number): content_hash
+            for mls_number, content_hash in Property.all_objects.filter(
+                tenant_id=tenant_id, mls_number__in=[mls_number for _, mls_number in listings]
+            ).values_list('mls_number', 'content_hash')
+        }
+
+        changed = []
+        for key, listing in listings.items():
+            if stored.get(key) == listing.content_hash:
+                run.unchanged += 1
+            else:
+                changed.append(listing)
+
+        failed = upsert_batch(changed) if changed else []
+        for listing, error in failed:
+            self.record_error(run, listing._row_number, f'Could not be saved: {error}')
+        failed_numbers = {listing.mls_number for listing, _ in failed}
+        for listing in changed:
+            if listing.mls_number in failed_numbers:
+                continue
+            if (tenant_id, listing.mls_number) in stored:
+                run.updated += 1
+            else:
+                run.created += 1
+        batch.clear()
+
+    def record_error(self, run, row_number, message):
+        run.error_count += 1
+        if len(run.errors) < MAX_REPORTED_ERRORS:
+            run.errors.append({'row': row_number, 'error': message})
+
+    def run(self):
+        """Run one sync; returns the FeedSyncRun, or None if the feed is already syncing"""
+        started = time.monotonic()
+        now = timezone.now()
+        if not self.acquire(now):
+            return None
+
+        since = self.tenant_integration.last_sync
+        run = FeedSyncRun.objects.create(tenant_integration=self.tenant_integration, modified_since=since)
+        watermark = None
+        batch = []
+
+        try:
+            for row_number, raw in enumerate(self.adapter.fetch_modified(since), start=1):
+                run.fetched = row_number
+                try:
+                    if isinstance(raw, RowError):
+                        raise raw
+                    if not isinstance(raw, dict):
+                        raise RowError('Row is not an object')
+                    listing = build_property(raw, now.date())
+                except RowError as e:
+                    self.record_error(run, row_number, str(e))
+                    continue
+                listing.tenant_id = self.tenant_integration.tenant_id
+                listing._row_number = row_number
+                batch.append(listing)
+
+                modified = row_modified_at(normalize_keys(raw))
+                if modified is not None and (watermark is None or modified > watermark):
+                    watermark = modified
+                if len(batch) >= self.batch_size:
+                    self.flush(run, batch)
+            self.flush(run, batch)
+            run.status = 'success'
+        except Exception as e:
+            run.status = 'failed'
+            self.record_error(run, run.fetched + 1, f'Sync aborted: {e}')
+
+        # Only a completed run advances last_sync. The feed's own timestamps
+        # are preferred so clock skew between us and the MLS cannot drop rows;
+        # rows at the watermark are re-fetched next time and skipped by hash.
+        integration_updates = {'sync_status': run.status, 'updated_at': timezone.now()}
+        if run.status == 'success':
+            integration_updates['last_sync'] = watermark or since or now
+        TenantIntegration.objects.filter(pk=self.tenant_integration.pk).update(**integration_updates)
+        for field, value in integration_updates.items():
+            setattr(self.tenant_integration, field, value)
+
+        run.finished_at = timezone.now()
+        run.duration_seconds = round(time.monotonic() - started, 3)
+        run.save()
+        if run.status == 'success':
+            self.match_listings(now)
+        return run
+
+    def match_listings(self, since):
+        """
+        Match the listings this run inserted or changed to saved lead preferences
+        in one batch; the upsert skips model signals. A failure here leaves the
+        sync itself successful, and `match_listings --since` can replay it.
+        """
+        try:
+            match_properties(Property.all_objects.filter(
+                tenant_id=self.tenant_integration.tenant_id, updated_at__gte=since
+            ))
+        except Exception:
+            logger.exception('Listing matching failed after sync of %s', self.tenant_integration.pk)
+
+# ============================================================================
+# SCHEDULING
+# ============================================================================
+
+def feeds_due(now=None):
+    """Active MLS feeds with no sync started within the sync interval"""
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=IDX_SYNC_INTERVAL_MINUTES)
+    recent_runs = FeedSyncRun.objects.filter(tenant_integration=OuterRef('pk'), started_at__gte=cutoff)
+    return TenantIntegration.objects.filter(
+        is_active=True, integration__integration_type='mls'
+    ).exclude(
+        Exists(recent_runs)
+    ).select_related('tenant', 'integration')
+
+def sync_due_feeds(now=None):
+    """Sync every feed that is due; returns the runs that executed"""
+    runs = []
+    for tenant_integration in feeds_due(now):
+        run = FeedSync(tenant_integration).run()
+        if run is not None:
+            runs.append(run)
+    return runs
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def run_stats(run):
+    if run is None:
+        return None
+    return {
+        'id': run.id,
+        'status': run.status,
+        'started_at': run.started_at.isoformat(),
+        'finished_at': run.finished_at.isoformat() if run.finished_at else None,
+        'duration_seconds': run.duration_seconds,
+        'fetched': run.fetched,
+        'created': run.created,
+        'updated': run.updated,
+        'unchanged': run.unchanged,
+        'error_count': run.error_count,
+        'errors': run.errors[:20],
+    }
+
+def feed_summaries():
+    """Every MLS feed with its latest sync run, in two queries"""
+    latest_run = FeedSyncRun.objects.filter(
+        tenant_integration=OuterRef('pk')
+    ).order_by('-started_at').values('id')[:1]
+    feeds = list(
+        TenantIntegration.objects.filter(
+            integration__integration_type='mls'
+        ).select_related('tenant', 'integration').annotate(
+            latest_run_id=Subquery(latest_run)
+        ).order_by('tenant__name')
+    )
+    runs = FeedSyncRun.objects.in_bulk([feed.latest_run_id for feed in feeds if feed.latest_run_id])
+
+    return [{
+        'id': feed.id,
+        'tenant': feed.tenant.name,
+        'integration': feed.integration.name,
+        'is_active': feed.is_active,
+        'sync_status': feed.sync_status,
+        'last_sync': feed.last_sync.isoformat() if feed.last_sync else None,
+        'last_run': run_stats(runs.get(feed.latest_run_id)),
+    } for feed in feeds]
@@ -0,0 +1,194 @@
+# Revolution Realty - Lead Deduplication
+# Indexed duplicate checks on ingest and blocked clustering/merging of existing duplicates
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .bulk_leads import delete_leads
+from .lead_identity import hash_email, hash_phone
+from .models import Activity, Lead, LeadTag, Task, Transaction
+
+# Hash columns used as blocking keys: only leads sharing one are ever compared
+BLOCKING_KEYS = ('email_hash', 'phone_hash')
+
+# Hashes per IN list when loading blocks
+DEDUP_CHUNK_SIZE = 500
+
+# Filled on the surviving lead when it has no value of its own
+MERGE_FILL_FIELDS = (
+    'phone', 'source_id', 'assigned_agent_id', 'min_price', 'max_price',
+    'preferred_bedrooms', 'preferred_bathrooms', 'preferred_locations',
+)
+
+# Summed across merged leads
+MERGE_SUM_FIELDS = ('website_visits', 'email_opens', 'email_clicks')
+
+# Highest value across merged leads wins
+MERGE_MAX_FIELDS = ('lead_score', 'engagement_score', 'last_contact')
+
+# ============================================================================
+# INGEST CHECK
+# ============================================================================
+
+def duplicate_filter(email_hash, phone_hash):
+    match = Q()
+    if email_hash:
+        match |= Q(email_hash=email_hash)
+    if phone_hash:
+        match |= Q(phone_hash=phone_hash)
+    return match
+
+def find_duplicate(tenant_id, email, phone=''):
+    """
+    ID of the tenant's existing lead with the same normalized email or phone,
+    oldest first; one lookup on the (tenant, hash) indexes
+    """
+    match = duplicate_filter(hash_email(email), hash_phone(phone))
+    if not match:
+        return None
+    return (
+        Lead.all_objects.filter(match, tenant_id=tenant_id)
+        .order_by('created_at').values_list('pk', flat=True).first()
+    )
+
+def touch_lead(lead_id):
+    """Bump updated_at so a repeat inquiry surfaces the lead again"""
+    Lead.all_objects.filter(pk=lead_id).update(updated_at=timezone.now())
+
+# ============================================================================
+# CLUSTERING
+# ============================================================================
+
+def find(parents, key):
+    root = key
+    while parents[root] != root:
+        root = parents[root]
+    # Path compression keeps later lookups flat
+    while parents[key] != root:
+        parents[key], key = root, parents[key]
+    return root
+
+def union(parents, a, b):
+    parents.setdefault(a, a)
+    parents.setdefault(b, b)
+    root_a, root_b = find(parents, a), find(parents, b)
+    if root_a != root_b:
+        parents[root_b] = root_a
+
+def duplicate_blocks(queryset, key):
+    """(tenant_id, hash) pairs shared by more than one lead, found by a GROUP BY"""
+    return list(
+        queryset.exclude(**{key: ''}).order_by().values('tenant_id', key)
+        .annotate(leads=Count('pk')).filter(leads__gt=1).values_list('tenant_id', key)
+    )
+
+def duplicate_clusters(queryset):
+    """
+    Groups of lead IDs that are the same person, oldest lead first.
+
+    Only leads in a shared email or phone block are loaded; blocks that share
+    a lead are joined (union-find), so a lead matching one record by email and
+    another by phone puts all three in one cluster.
+    """
+    parents = {}
+    created = {}
+    for key in BLOCKING_KEYS:
+        blocks = duplicate_blocks(queryset, key)
+        for start in range(0, len(blocks), DEDUP_CHUNK_SIZE):
+            chunk = blocks[start:start + DEDUP_CHUNK_SIZE]
+            wanted = set(chunk)
+            rows = queryset.filter(**{f'{key}__in': {value for _, value in chunk}}).order_by().values_list(
+                'pk', 'tenant_id', key, 'created_at'
+            )
+            for pk, tenant_id, value, created_at in rows:
+                if (tenant_id, value) not in wanted:
+                    continue
+                created[pk] = created_at
+                union(parents, (tenant_id, key, value), pk)
+
+    clusters = {}
+    for pk in created:
+        clusters.setdefault(find(parents, pk), []).append(pk)
+    return [
+        sorted(members, key=lambda pk: created[pk])
+        for members in clusters.values() if len(members) > 1
+    ]
+
+# ============================================================================
+# MERGING
+# ============================================================================
+
+def merge_values(primary, duplicates):
+    """Copy missing details and engagement totals from duplicates onto the primary"""
+    for lead in duplicates:
+        for field in MERGE_FILL_FIELDS:
+            if getattr(primary, field) in (None, '') and getattr(lead, field) not in (None, ''):
+                setattr(primary, field, getattr(lead, field))
+        for field in MERGE_SUM_FIELDS:
+            setattr(primary, field, getattr(primary, field) + getattr(lead, field))
+        for field in MERGE_MAX_FIELDS:
+            values = [value for value in (getattr(primary, field), getattr(lead, field)) if value is not None]
+            setattr(primary, field, max(values) if values else None)
+        if lead.notes and lead.notes not in primary.notes:
+            primary.notes = '\n\n'.join(note for note in (primary.notes, lead.notes) if note)
+
+    # A primary nobody has worked yet takes the status of the most recently worked duplicate
+    if primary.status == 'new':
+        worked = [lead for lead in duplicates if lead.status != 'new']
+        if worked:
+            primary.status = max(worked, key=lambda lead: lead.updated_at).status
+
+def merge_leads(primary_id, duplicate_ids, user_id):
+    """
+    Fold duplicate leads into the primary: their activities, tasks,
+    transactions and tags move over, then the duplicates are deleted
+    """
+    duplicate_ids = [pk for pk in duplicate_ids if pk != primary_id]
+    if not duplicate_ids:
+        return 0
+
+    with transaction.atomic():
+        leads = Lead.all_objects.select_for_update().filter(pk__in=[primary_id, *duplicate_ids])
+        leads = {lead.pk: lead for lead in leads}
+        primary = leads.get(primary_id)
+        duplicates = [leads[pk] for pk in duplicate_ids if pk in leads]
+        if primary is None or not duplicates:
+            return 0
+        duplicate_ids = [lead.pk for lead in duplicates]
+
+        for model in (Activity, Task, Transaction):
+            model.all_objects.filter(lead_id__in=duplicate_ids).update(lead_id=primary_id)
+
+        # Tags are unique per lead, so only names the primary lacks are added
+        tag_names = set(LeadTag.objects.filter(lead_id__in=duplicate_ids).values_list('name', flat=True))
+        tag_names -= set(LeadTag.objects.filter(lead_id=primary_id).values_list('name', flat=True))
+        LeadTag.objects.bulk_create([LeadTag(lead_id=primary_id, name=name) for name in sorted(tag_names)])
+
+        merge_values(primary, duplicates)
+        primary.save()
+
+        # Quota, rollup and agent load are adjusted once for the whole cluster
+        delete_leads(duplicate_ids)
+
+        Activity.objects.create(
+            activity_type='note',
+            subject=f"Merged {len(duplicates)} duplicate lead{'s' if len(duplicates) != 1 else ''}",
+            description='\n'.join(f'{lead.first_name} {lead.last_name} <{lead.email}>' for lead in duplicates),
+            lead_id=primary_id,
+            tenant_id=primary.tenant_id,
+            created_by_id=user_id,
+        )
+
+    return len(duplicates)
+
+def dedupe_leads(queryset, user_id, dry_run=False):
+    """Cluster and merge duplicates among queryset; returns (clusters, leads merged)"""
+    clusters = duplicate_clusters(queryset)
+    if dry_run:
+        return len(clusters), sum(len(cluster) - 1 for cluster in clusters)
+
+    merged = 0
+    for cluster in clusters:
+        merged += merge_leads(cluster[0], cluster[1:], user_id)
+    return len(clusters), merged
@@ -0,0 +1,48 @@
+# Revolution Realty - Lead Identity Keys
+# Normalized email/phone hashes used to spot the same person across lead forms
+
+import hashlib
+import re
+
+# Providers that ignore dots in the mailbox name
+DOTLESS_EMAIL_DOMAINS = {'gmail.com': 'gmail.com', 'googlemail.com': 'gmail.com'}
+
+# Shorter numbers are extensions or typos, not a usable identity
+MIN_PHONE_DIGITS = 7
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+def normalize_email(email):
+    """Lowercased address without +tags (and without dots on Gmail)"""
+    email = (email or '').strip().lower()
+    local, at, domain = email.rpartition('@')
+    if not at or not local or not domain:
+        return ''
+    local = local.split('+', 1)[0]
+    if domain in DOTLESS_EMAIL_DOMAINS:
+        local = local.replace('.', '')
+        domain = DOTLESS_EMAIL_DOMAINS[domain]
+    return f'{local}@{domain}' if local else ''
+
+def normalize_phone(phone):
+    """Digits only, without the US country code"""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ''
+
+# ============================================================================
+# HASHES
+# ============================================================================
+
+def identity_hash(value):
+    """SHA-256 of a normalized value, or '' when there is nothing to match on"""
+    return hashlib.sha256(value.encode()).hexdigest() if value else ''
+
+def hash_email(email):
+    return identity_hash(normalize_email(email))
+
+def hash_phone(phone):
+    return identity_hash(normalize_phone(phone))
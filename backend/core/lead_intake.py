@@ -0,0 +1,228 @@
+# Revolution Realty - Lead Intake Queue
+# Durable outbox for website lead captures, drained in batches by a worker
+
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import record as record_counter
+from .lead_dedup import BLOCKING_KEYS
+from .lead_matching import refresh_leads
+from .lead_routing import assign_agents
+from .models import Activity, Lead, LeadSource, LeadSubmission, Property
+from .quotas import adjust_usage
+from .stats import record_leads
+
+logger = logging.getLogger(__name__)
+
+# Submissions written per worker transaction
+LEAD_INTAKE_BATCH_SIZE = 500
+
+# Rows that keep failing are parked as 'failed' for inspection
+LEAD_INTAKE_MAX_ATTEMPTS = 5
+
+WEBSITE_SOURCE_NAME = 'Website'
+WEBSITE_SOURCE_CACHE_KEY = 'lead_source_id:website'
+
+# Owner of the activities written for captured leads
+SYSTEM_USER_ID = 1
+
+def queue_enabled():
+    """Whether capture_lead enqueues submissions instead of writing leads inline"""
+    return getattr(settings, 'LEAD_CAPTURE_QUEUE', False)
+
+# ============================================================================
+# WEBSITE SOURCE
+# ============================================================================
+
+def website_source_id():
+    """ID of the 'Website' lead source, created on first use and cached"""
+    source_id = cache.get(WEBSITE_SOURCE_CACHE_KEY)
+    if source_id is None:
+        source, created = LeadSource.objects.get_or_create(
+            name=WEBSITE_SOURCE_NAME,
+            defaults={'description': 'Leads from website forms'}
+        )
+        source_id = source.pk
+        cache.set(WEBSITE_SOURCE_CACHE_KEY, source_id, None)
+    return source_id
+
+def invalidate_website_source():
+    cache.delete(WEBSITE_SOURCE_CACHE_KEY)
+
+# ============================================================================
+# ENQUEUE
+# ============================================================================
+
+def enqueue_lead(serializer, tenant_id, property_id=None):
+    """
+    Queue a validated LeadCreateSerializer as one outbox insert.
+    Returns the ID the lead will be created with.
+    """
+    # serializer.data is the JSON-safe form of the validated fields (source as its ID)
+    submission = LeadSubmission.objects.create(
+        tenant_id=tenant_id,
+        property_id=property_id,
+        payload=serializer.data,
+    )
+    return submission.lead_id
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def build_lead(submission, default_source_id):
+    fields = dict(submission.payload)
+    source_id = fields.pop('source', None) or default_source_id
+    lead = Lead(id=submission.lead_id, tenant_id=submission.tenant_id, source_id=source_id, **fields)
+    # bulk_create skips Lead.save(), which normally sets these
+    lead.set_identity_hashes()
+    return lead
+
+def build_activity(submission, lead_id, property_id, repeat=False):
+    return Activity(
+        activity_type='note',
+        subject='Repeat inquiry from website' if repeat else 'New lead captured from website',
+        description='Lead submitted through website form',
+        lead_id=lead_id,
+        tenant_id=submission.tenant_id,
+        property_id=property_id,
+        created_by_id=SYSTEM_USER_ID,
+    )
+
+def existing_leads(leads):
+    """(tenant_id, hash column, hash) -> oldest matching lead ID, in one indexed query"""
+    hashes = defaultdict(lambda: defaultdict(set))
+    for lead in leads:
+        for column in BLOCKING_KEYS:
+            if getattr(lead, column):
+                hashes[lead.tenant_id][column].add(getattr(lead, column))
+
+    # One branch per tenant and column, so each probes a (tenant, hash) index
+    condition = Q()
+    for tenant_id, columns in hashes.items():
+        for column, values in columns.items():
+            condition |= Q(tenant_id=tenant_id, **{f'{column}__in': values})
+    if not condition:
+        return {}
+    matches = Lead.all_objects.filter(condition).order_by('-created_at').values_list(
+        'pk', 'tenant_id', 'email_hash', 'phone_hash'
+    )
+    # Newest first, so older leads overwrite and win
+    known = {}
+    for pk, tenant_id, email_hash, phone_hash in matches:
+        if email_hash:
+            known[(tenant_id, 'email_hash', email_hash)] = pk
+        if phone_hash:
+            known[(tenant_id, 'phone_hash', phone_hash)] = pk
+    return known
+
+def write_leads(submissions, default_source_id):
+    """
+    Insert the leads and their activities in two bulk statements.
+    Submissions from a person already on file (same normalized email or phone,
+    including earlier rows of this batch) only add an activity to that lead.
+    bulk_create bypasses model signals, so the quota counters, monthly rollup,
+    property lead counters and listing match index those signals maintain are
+    updated here in bulk.
+    """
+    # Listing inquiries only link properties belonging to the submission's tenant
+    requested = {submission.property_id for submission in submissions if submission.property_id}
+    property_tenants = dict(Property.all_objects.filter(pk__in=requested).values_list('pk', 'tenant_id')) if requested else {}
+    property_ids = {
+        submission.pk: submission.property_id for submission in submissions
+        if submission.property_id in property_tenants
+        and property_tenants[submission.property_id] == submission.tenant_id
+    }
+
+    candidates = [(submission, build_lead(submission, default_source_id)) for submission in submissions]
+    known = existing_leads([lead for submission, lead in candidates])
+    new_leads = []
+    repeat_lead_ids = set()
+    activities = []
+    for submission, lead in candidates:
+        keys = [(lead.tenant_id, column, getattr(lead, column)) for column in BLOCKING_KEYS if getattr(lead, column)]
+        lead_id = next((known[key] for key in keys if key in known), None)
+        if lead_id is None:
+            new_leads.append(lead)
+            lead_id = lead.pk
+            known.update((key, lead_id) for key in keys)
+        else:
+            repeat_lead_ids.add(lead_id)
+        activities.append(build_activity(
+            submission, lead_id, property_ids.get(submission.pk), repeat=lead_id != lead.pk
+        ))
+
+    # New leads are routed to agents before the insert, so they are written assigned
+    assign_agents(new_leads)
+    Lead.all_objects.bulk_create(new_leads)
+    Activity.all_objects.bulk_create(activities)
+    refresh_leads([lead.pk for lead in new_leads])
+    if repeat_lead_ids:
+        Lead.all_objects.filter(pk__in=repeat_lead_ids).update(updated_at=timezone.now())
+
+    for tenant_id, count in Counter(lead.tenant_id for lead in new_leads).items():
+        if tenant_id:
+            adjust_usage(tenant_id, 'leads', count)
+        record_leads(tenant_id, timezone.now(), count)
+    # Counters are buffered in memory, so they are only recorded once the batch commits
+    lead_properties = list(property_ids.values())
+    transaction.on_commit(lambda: [record_counter(property_id, 'leads') for property_id in lead_properties])
+
+def mark_failed(submission, error):
+    submission.attempts += 1
+    submission.error = str(error)
+    if submission.attempts >= LEAD_INTAKE_MAX_ATTEMPTS:
+        submission.status = 'failed'
+    submission.save(update_fields=['attempts', 'error', 'status'])
+
+def drain_batch(batch_size=LEAD_INTAKE_BATCH_SIZE):
+    """Write one batch of pending submissions; returns (created, failed)"""
+    default_source_id = website_source_id()
+
+    with transaction.atomic():
+        # skip_locked lets several workers drain side by side (ignored where unsupported)
+        submissions = list(
+            LeadSubmission.objects.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('id')[:batch_size]
+        )
+        if not submissions:
+            return 0, 0
+
+        try:
+            with transaction.atomic():
+                write_leads(submissions, default_source_id)
+            written = submissions
+        except Exception:
+            # One bad row fails the whole insert; retry row by row to isolate it
+            logger.exception('Lead intake batch failed, retrying %d rows individually', len(submissions))
+            written = []
+            for submission in submissions:
+                try:
+                    with transaction.atomic():
+                        write_leads([submission], default_source_id)
+                    written.append(submission)
+                except Exception as e:
+                    mark_failed(submission, e)
+
+        LeadSubmission.objects.filter(pk__in=[submission.pk for submission in written]).delete()
+
+    return len(written), len(submissions) - len(written)
+
+def drain(batch_size=LEAD_INTAKE_BATCH_SIZE):
+    """Drain every pending submission; returns (created, failed attempts)"""
+    created = failed = 0
+    while True:
+        batch_created, batch_failed = drain_batch(batch_size)
+        if not batch_created and not batch_failed:
+            return created, failed
+        created += batch_created
+        failed += batch_failed
+        if not batch_created and batch_failed:
+            # Everything left is failing; stop until the next run
+            return created, failed
@@ -0,0 +1,274 @@
+# Revolution Realty - Listing Match Engine
+# Inverted index of lead preferences probed by new and repriced listings
+
+import logging
+import math
+from collections import defaultdict
+
+from django.db import NotSupportedError, connections, router, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from .geo import location_keys, property_location_keys
+from .lead_routing import CLOSED_LEAD_STATUSES, is_open
+from .models import Lead, LeadMatchKey, Property, PropertyMatch
+
+logger = logging.getLogger(__name__)
+
+# Lead fields a listing is matched against; a change to any of them reindexes the lead
+MATCH_FIELDS = ('status', 'min_price', 'max_price', 'preferred_bedrooms', 'preferred_bathrooms', 'preferred_locations')
+
+# Price bands are log-scale: each band spans prices 25% apart
+PRICE_BAND_RATIO = 1.25
+
+# Posted for leads without a bounded price range, or one wider than MAX_PRICE_BANDS;
+# every listing probes it alongside its own band
+ANY_PRICE_BAND = -1
+MAX_PRICE_BANDS = 12
+
+# Location keys indexed per lead; free-text preferences beyond this are ignored
+MAX_LOCATION_KEYS = 20
+
+# Listings matched per round; each round loads the postings for its locations once
+MATCH_BATCH_SIZE = 2000
+
+# Leads (re)indexed per round
+INDEX_BATCH_SIZE = 5000
+
+# Values per IN list
+MATCH_CHUNK_SIZE = 500
+
+# Rows per executemany INSERT
+INSERT_CHUNK_SIZE = 2000
+
+# Column types the database driver binds as-is; other values go through the field's get_db_prep_save()
+NATIVE_COLUMN_TYPES = {'AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField', 'CharField', 'TextField'}
+
+# Index row columns, in lead_postings() order
+POSTING_FIELDS = (
+    'tenant_id', 'lead_id', 'location_key', 'price_band', 'min_bedrooms', 'min_price', 'max_price', 'min_bathrooms',
+)
+
+# Match record columns, in match_batch() order
+MATCH_RECORD_FIELDS = ('tenant_id', 'property_id', 'lead_id', 'agent_id', 'list_price', 'status', 'created_at')
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+def chunks(items, size=MATCH_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def insert_rows(model, fields, rows, ignore_conflicts=False):
+    """
+    INSERT plain value tuples with executemany. Batch runs write millions of
+    index and match rows, and bulk_create spends most of that time building
+    and preparing a model instance per row.
+    """
+    connection = connections[router.db_for_write(model)]
+    model_fields = [model._meta.get_field(field) for field in fields]
+
+    # Each backend spells "skip duplicate rows" differently: INSERT IGNORE on
+    # MySQL, INSERT OR IGNORE on SQLite, ON CONFLICT DO NOTHING on Postgres
+    on_conflict = None
+    if ignore_conflicts:
+        if not connection.features.supports_ignore_conflicts:
+            raise NotSupportedError('This database backend does not support ignoring conflicts.')
+        on_conflict = OnConflict.IGNORE
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in model_fields)
+    sql = (
+        f'{connection.ops.insert_statement(on_conflict=on_conflict)} '
+        f'{connection.ops.quote_name(model._meta.db_table)} ({columns}) '
+        f"VALUES ({', '.join(['%s'] * len(fields))}) "
+        f'{connection.ops.on_conflict_suffix_sql(model_fields, on_conflict, None, None)}'
+    ).rstrip()
+
+    # UUID keys, decimals and the like are converted column by column, once per distinct value
+    prepared = []
+    for index, field in enumerate(model_fields):
+        target = field.target_field if field.is_relation else field
+        if target.get_internal_type() not in NATIVE_COLUMN_TYPES:
+            prepared.append((index, target, {}))
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for chunk in chunks(rows, INSERT_CHUNK_SIZE):
+            if prepared:
+                chunk = [list(row) for row in chunk]
+                for row in chunk:
+                    for index, target, converted in prepared:
+                        value = row[index]
+                        if value is not None:
+                            if value not in converted:
+                                converted[value] = target.get_db_prep_save(value, connection)
+                            row[index] = converted[value]
+            cursor.executemany(sql, chunk)
+
+def price_band(price):
+    """Log-scale band of a price"""
+    if not price or price <= 0:
+        return 0
+    return math.floor(math.log(float(price)) / math.log(PRICE_BAND_RATIO))
+
+def lead_price_bands(min_price, max_price):
+    """Bands a lead's price range covers; [ANY_PRICE_BAND] for open or very wide ranges"""
+    if not min_price or not max_price:
+        return [ANY_PRICE_BAND]
+    if max_price < min_price:
+        return []
+    low, high = price_band(min_price), price_band(max_price)
+    if high - low >= MAX_PRICE_BANDS:
+        return [ANY_PRICE_BAND]
+    return list(range(low, high + 1))
+
+def lead_match_keys(lead):
+    """(location_key, price_band) pairs a lead is posted under; closed leads get none"""
+    if not is_open(lead.status):
+        return []
+    keys = sorted({key[:100] for key in location_keys(lead.preferred_locations)})[:MAX_LOCATION_KEYS]
+    return [(key, band) for key in keys for band in lead_price_bands(lead.min_price, lead.max_price)]
+
+def lead_postings(lead):
+    """Index rows (POSTING_FIELDS) for one lead: one per location key and price band"""
+    return [
+        (
+            lead.tenant_id, lead.pk, key, band, lead.preferred_bedrooms or 0,
+            lead.min_price, lead.max_price, lead.preferred_bathrooms,
+        )
+        for key, band in lead_match_keys(lead)
+    ]
+
+def index_leads(leads):
+    """Replace the index rows of saved leads; returns the rows written"""
+    leads = list(leads)
+    postings = [posting for lead in leads for posting in lead_postings(lead)]
+    with transaction.atomic():
+        for chunk in chunks([lead.pk for lead in leads]):
+            LeadMatchKey.objects.filter(lead_id__in=chunk).delete()
+        insert_rows(LeadMatchKey, POSTING_FIELDS, postings)
+    return len(postings)
+
+def refresh_leads(lead_ids):
+    """
+    Reindex leads by ID from their stored rows, for callers holding unsaved
+    or raw values (bulk inserts, update() calls); returns the rows written
+    """
+    written = 0
+    for chunk in chunks(lead_ids, INDEX_BATCH_SIZE):
+        written += index_leads(Lead.all_objects.filter(pk__in=chunk).only('pk', 'tenant_id', *MATCH_FIELDS))
+    return written
+
+def reindex_leads(queryset, batch_size=INDEX_BATCH_SIZE):
+    """Index every lead in queryset in keyset-paginated batches; returns (leads, rows written)"""
+    leads = queryset.order_by('pk').only('pk', 'tenant_id', *MATCH_FIELDS)
+    indexed = written = 0
+    last_pk = None
+    while True:
+        batch = list((leads.filter(pk__gt=last_pk) if last_pk else leads)[:batch_size])
+        if not batch:
+            return indexed, written
+        written += index_leads(batch)
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+
+# ============================================================================
+# MATCHING
+# ============================================================================
+
+def load_postings(tenant_id, keys, bands, max_bedrooms):
+    """{(location_key, price_band): [(lead_id, min_bedrooms, min_price, max_price, min_bathrooms)]}"""
+    postings = defaultdict(list)
+    bands = list(bands | {ANY_PRICE_BAND})
+    for chunk in chunks(keys):
+        rows = LeadMatchKey.objects.filter(
+            tenant_id=tenant_id, location_key__in=chunk, price_band__in=bands, min_bedrooms__lte=max_bedrooms
+        ).values_list('location_key', 'price_band', 'lead_id', 'min_bedrooms', 'min_price', 'max_price', 'min_bathrooms')
+        for key, band, *posting in rows:
+            postings[(key, band)].append(posting)
+    return postings
+
+def accepts(posting, price, bedrooms, bathrooms):
+    """Whether a lead's stored preferences take a listing; the index only narrows by band"""
+    _, min_bedrooms, min_price, max_price, min_bathrooms = posting
+    return (
+        bedrooms >= min_bedrooms
+        and (min_price is None or price >= min_price)
+        and (max_price is None or price <= max_price)
+        and (min_bathrooms is None or bathrooms >= min_bathrooms)
+    )
+
+def match_batch(listings):
+    """
+    Match listing rows (id, tenant_id, city, zip_code, price, bedrooms, bathrooms)
+    and insert the new PropertyMatch rows; returns the number created
+    """
+    by_tenant = defaultdict(list)
+    for listing in listings:
+        by_tenant[listing[1]].append((listing, property_location_keys(listing[2], listing[3])))
+
+    candidates = []
+    for tenant_id, tenant_listings in by_tenant.items():
+        keys = set().union(*(keys for _, keys in tenant_listings))
+        if not keys:
+            continue
+        bands = {price_band(listing[4]) for listing, _ in tenant_listings}
+        max_bedrooms = max(listing[5] for listing, _ in tenant_listings)
+        postings = load_postings(tenant_id, keys, bands, max_bedrooms)
+
+        for (property_id, _, _, _, price, bedrooms, bathrooms), keys in tenant_listings:
+            probes = [(key, band) for key in keys for band in (price_band(price), ANY_PRICE_BAND)]
+            lead_ids = {
+                posting[0] for probe in probes for posting in postings.get(probe, ())
+                if accepts(posting, price, bedrooms, bathrooms)
+            }
+            candidates.extend((tenant_id, property_id, lead_id, price) for lead_id in lead_ids)
+
+    if not candidates:
+        return 0
+
+    # Postings can trail a bulk status change, so closed leads are dropped here
+    agents = {}
+    for chunk in chunks({candidate[2] for candidate in candidates}):
+        agents.update(
+            Lead.all_objects.filter(pk__in=chunk).exclude(status__in=CLOSED_LEAD_STATUSES)
+            .values_list('pk', 'assigned_agent_id')
+        )
+    existing = set()
+    for chunk in chunks({candidate[1] for candidate in candidates}):
+        existing.update(PropertyMatch.all_objects.filter(property_id__in=chunk).values_list('property_id', 'lead_id'))
+
+    created_at = timezone.now()
+    matches = [
+        (tenant_id, property_id, lead_id, agents[lead_id], price, 'new', created_at)
+        for tenant_id, property_id, lead_id, price in candidates
+        if lead_id in agents and (property_id, lead_id) not in existing
+    ]
+    # Conflicts are skipped in case a concurrent run inserted the same pair
+    insert_rows(PropertyMatch, MATCH_RECORD_FIELDS, matches, ignore_conflicts=True)
+    return len(matches)
+
+def match_properties(queryset, batch_size=MATCH_BATCH_SIZE):
+    """
+    Match the active listings in queryset to leads' saved preferences;
+    returns (listings matched, match records created).
+
+    Listings are taken in (tenant, city, zip) order, so each batch shares a
+    few locations and loads only their postings, never the full lead table.
+    """
+    listing_ids = list(
+        queryset.filter(status='active').order_by('tenant_id', 'city', 'zip_code', 'pk').values_list('pk', flat=True)
+    )
+    created = 0
+    for start in range(0, len(listing_ids), batch_size):
+        batch_ids = listing_ids[start:start + batch_size]
+        rows = {}
+        for chunk in chunks(batch_ids):
+            rows.update(
+                (row[0], row) for row in Property.all_objects.filter(pk__in=chunk).values_list(
+                    'pk', 'tenant_id', 'city', 'zip_code', 'list_price', 'bedrooms', 'bathrooms'
+                )
+            )
+        created += match_batch([rows[pk] for pk in batch_ids if pk in rows])
+    logger.info('Matched %d listings, %d new lead matches', len(listing_ids), created)
+    return len(listing_ids), created
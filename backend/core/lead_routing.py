@@ -0,0 +1,159 @@
+# Revolution Realty - Lead Routing
+# Automatic agent assignment by round-robin, territory or open-lead load
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .geo import location_keys
+from .models import Lead
+from .saas_models import AgentRoutingState, LeadRoutingConfig, TenantUser
+
+# Leads in these statuses no longer count toward an agent's load
+CLOSED_LEAD_STATUSES = ('converted', 'lost')
+
+# Tenant members who take new leads
+ROUTING_ROLES = ('agent',)
+
+def is_open(status):
+    return status not in CLOSED_LEAD_STATUSES
+
+# ============================================================================
+# ASSIGNMENT
+# ============================================================================
+
+def routing_strategy(tenant_id):
+    """The tenant's strategy, round-robin without a config, or None when routing is off"""
+    config = LeadRoutingConfig.objects.filter(tenant_id=tenant_id).values_list('strategy', 'is_enabled').first()
+    if config is None:
+        return 'round_robin'
+    strategy, is_enabled = config
+    return strategy if is_enabled else None
+
+def next_turn(state):
+    return state.last_turn
+
+def least_loaded(state):
+    return state.open_leads, state.last_turn
+
+def choose_agent(states, strategy, lead):
+    """Pick from the tenant's in-memory agent states; no per-agent lead counts are run"""
+    if strategy == 'territory':
+        keys = location_keys(lead.preferred_locations)
+        matches = [state for state in states if keys & state.territory_keys]
+        return min(matches or states, key=least_loaded)
+    if strategy == 'load':
+        return min(states, key=least_loaded)
+    return min(states, key=next_turn)
+
+def assign_agents(leads):
+    """
+    Set assigned_agent_id on unassigned leads and count them on their agents.
+
+    Each tenant's available agent rows are locked for the assignment, so
+    concurrent workers take turns and never pick from stale counters; the
+    counters are moved in the same transaction as the caller's lead writes.
+    Returns the number of leads assigned.
+    """
+    by_tenant = defaultdict(list)
+    for lead in leads:
+        if lead.tenant_id and not lead.assigned_agent_id:
+            by_tenant[lead.tenant_id].append(lead)
+
+    assigned = 0
+    now = timezone.now()
+    for tenant_id, tenant_leads in by_tenant.items():
+        strategy = routing_strategy(tenant_id)
+        if strategy is None:
+            continue
+
+        with transaction.atomic():
+            states = list(
+                AgentRoutingState.objects.select_for_update()
+                .filter(tenant_id=tenant_id, is_available=True).order_by('pk')
+            )
+            if not states:
+                continue
+            for state in states:
+                state.territory_keys = location_keys(state.territories)
+            turn = max(state.last_turn for state in states)
+
+            picked = defaultdict(int)
+            for lead in tenant_leads:
+                state = choose_agent(states, strategy, lead)
+                turn += 1
+                state.last_turn = turn
+                state.open_leads += is_open(lead.status)
+                picked[state] += is_open(lead.status)
+                lead.assigned_agent_id = state.agent_id
+                assigned += 1
+
+            for state, opened in picked.items():
+                AgentRoutingState.objects.filter(pk=state.pk).update(
+                    open_leads=F('open_leads') + opened, last_turn=state.last_turn, last_assigned_at=now
+                )
+    return assigned
+
+def route_lead(lead):
+    """Assign a saved lead to an agent; returns the agent ID, if one was picked"""
+    if assign_agents([lead]):
+        # update() rather than save(), so the lead signals do not count it a second time
+        Lead.all_objects.filter(pk=lead.pk).update(assigned_agent_id=lead.assigned_agent_id)
+        return lead.assigned_agent_id
+    return None
+
+# ============================================================================
+# LOAD COUNTERS
+# ============================================================================
+
+def adjust_agent_load(tenant_id, agent_id, delta):
+    if tenant_id and agent_id and delta:
+        AgentRoutingState.objects.filter(tenant_id=tenant_id, agent_id=agent_id).update(
+            open_leads=Greatest(F('open_leads') + delta, 0)
+        )
+
+def lead_load_changed(tenant_id, before, after):
+    """Move load between agents for a lead going from (agent, status) before to after"""
+    before_agent, before_status = before
+    after_agent, after_status = after
+    was_open = bool(before_agent) and is_open(before_status)
+    now_open = bool(after_agent) and is_open(after_status)
+    if before_agent == after_agent:
+        adjust_agent_load(tenant_id, after_agent, now_open - was_open)
+        return
+    if was_open:
+        adjust_agent_load(tenant_id, before_agent, -1)
+    if now_open:
+        adjust_agent_load(tenant_id, after_agent, 1)
+
+def sync_agent_states(tenant_ids):
+    """Create routing rows for active agents who do not have one yet"""
+    members = TenantUser.objects.filter(
+        tenant_id__in=tenant_ids, role__in=ROUTING_ROLES, is_active=True
+    ).values_list('tenant_id', 'user_id')
+    AgentRoutingState.objects.bulk_create(
+        [AgentRoutingState(tenant_id=tenant_id, agent_id=user_id) for tenant_id, user_id in members],
+        ignore_conflicts=True
+    )
+
+def recount_agent_load(tenant_ids):
+    """Reset the open-lead counters from one grouped count per tenant"""
+    tenant_ids = list(tenant_ids)
+    if not tenant_ids:
+        return
+    sync_agent_states(tenant_ids)
+    counts = dict(
+        ((tenant_id, agent_id), leads) for tenant_id, agent_id, leads in
+        Lead.all_objects.filter(tenant_id__in=tenant_ids, assigned_agent__isnull=False)
+        .exclude(status__in=CLOSED_LEAD_STATUSES).order_by()
+        .values('tenant_id', 'assigned_agent_id').annotate(leads=Count('pk'))
+        .values_list('tenant_id', 'assigned_agent_id', 'leads')
+    )
+    with transaction.atomic():
+        for state in AgentRoutingState.objects.select_for_update().filter(tenant_id__in=tenant_ids):
+            open_leads = counts.get((state.tenant_id, state.agent_id), 0)
+            if state.open_leads != open_leads:
+                AgentRoutingState.objects.filter(pk=state.pk).update(open_leads=open_leads)
@@ -0,0 +1,234 @@
+# Revolution Realty - Lead Scoring Engine
+# Batched engagement/lead scores from lead counters and recency-decayed activity counts
+
+import logging
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Activity, Lead
+from .saas_models import LeadScoringProfile, Tenant
+
+try:
+    import numpy as np
+except ImportError:  # Scores are computed row by row without NumPy
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Leads scored per read/compute/write round
+SCORING_BATCH_SIZE = 5000
+
+# Lead IDs per UPDATE ... WHERE id IN (...)
+SCORING_UPDATE_CHUNK = 500
+
+# Points per activity type, overridable per tenant through LeadScoringProfile.activity_weights
+DEFAULT_ACTIVITY_WEIGHTS = {
+    'call': 3.0,
+    'email': 1.0,
+    'text': 1.5,
+    'meeting': 6.0,
+    'showing': 8.0,
+    'note': 0.5,
+}
+
+# Activity types a tenant may weight
+ACTIVITY_TYPES = {activity_type for activity_type, _ in Activity.ACTIVITY_TYPE_CHOICES}
+
+# Activity age bands in days; each band's count is decayed at its midpoint.
+# Activities older than the last band no longer count.
+ACTIVITY_AGE_BANDS = ((0, 7), (7, 30), (30, 90), (90, 365))
+
+# ============================================================================
+# WEIGHTS
+# ============================================================================
+
+class ScoringWeights:
+    """A tenant's scoring profile resolved into column weights"""
+
+    def __init__(self, profile):
+        self.counter_weights = [profile.website_visit_weight, profile.email_open_weight, profile.email_click_weight]
+        self.score_scale = profile.score_scale or 1.0
+
+        activity_weights = dict(DEFAULT_ACTIVITY_WEIGHTS)
+        overrides = profile.activity_weights if isinstance(profile.activity_weights, dict) else {}
+        for activity_type, weight in overrides.items():
+            # Profiles saved without clean() may hold unknown types or non-numeric weights; those are skipped
+            if activity_type in ACTIVITY_TYPES and is_weight(weight):
+                activity_weights[activity_type] = weight
+        half_life = max(profile.half_life_days, 1)
+        # One column per (activity type, age band) with the decay folded into its weight;
+        # columns are aliased by position so tenant JSON never reaches the SQL
+        self.activity_columns = []
+        self.activity_weights = []
+        for activity_type, weight in sorted(activity_weights.items()):
+            if not weight:
+                continue
+            for start, end in ACTIVITY_AGE_BANDS:
+                self.activity_columns.append((f'activity_{len(self.activity_columns)}', activity_type, start, end))
+                self.activity_weights.append(float(weight) * 0.5 ** ((start + end) / 2 / half_life))
+
+def is_weight(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def profiles_by_tenant(tenant_ids):
+    profiles = {profile.tenant_id: profile for profile in LeadScoringProfile.objects.filter(tenant_id__in=tenant_ids)}
+    # Tenants without a saved profile get one with the model defaults
+    for tenant_id in tenant_ids:
+        if tenant_id not in profiles:
+            profiles[tenant_id], _ = LeadScoringProfile.objects.get_or_create(tenant_id=tenant_id)
+    return profiles
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def activity_counts(lead_ids, weights, now):
+    """{lead_id: [count per activity column]} in one grouped query"""
+    if not weights.activity_columns:
+        return {}
+    oldest = now - timedelta(days=ACTIVITY_AGE_BANDS[-1][1])
+    annotations = {
+        name: Count('pk', filter=Q(
+            activity_type=activity_type,
+            created_at__gt=now - timedelta(days=end),
+            created_at__lte=now - timedelta(days=start),
+        ))
+        for name, activity_type, start, end in weights.activity_columns
+    }
+    rows = (
+        Activity.all_objects.filter(lead_id__in=lead_ids, created_at__gt=oldest)
+        .order_by().values('lead_id').annotate(**annotations)
+        .values_list('lead_id', *annotations)
+    )
+    return {row[0]: row[1:] for row in rows}
+
+# ============================================================================
+# COMPUTE
+# ============================================================================
+
+def compute_scores_numpy(leads, counts, weights):
+    """(engagement_score, lead_score) arrays for a batch of lead rows"""
+    counters = np.array([lead[1:4] for lead in leads], dtype=np.float64).reshape(-1, 3)
+    engagement = np.log1p(np.maximum(counters, 0)) @ np.array(weights.counter_weights, dtype=np.float64)
+
+    if weights.activity_columns:
+        empty = (0,) * len(weights.activity_columns)
+        activity = np.array([counts.get(lead[0], empty) for lead in leads], dtype=np.float64)
+        engagement += activity.reshape(len(leads), -1) @ np.array(weights.activity_weights, dtype=np.float64)
+
+    engagement = np.maximum(engagement, 0)
+    lead_scores = np.clip(np.rint(100 * (1 - np.exp(-engagement / weights.score_scale))), 0, 100)
+    return np.rint(engagement).astype(np.int64).tolist(), lead_scores.astype(np.int64).tolist()
+
+def compute_scores_python(leads, counts, weights):
+    """compute_scores_numpy for installs without NumPy"""
+    engagement_scores = []
+    lead_scores = []
+    empty = (0,) * len(weights.activity_columns)
+    for lead in leads:
+        engagement = sum(
+            weight * math.log1p(max(value, 0)) for weight, value in zip(weights.counter_weights, lead[1:4])
+        )
+        engagement += sum(
+            weight * value for weight, value in zip(weights.activity_weights, counts.get(lead[0], empty))
+        )
+        engagement = max(engagement, 0)
+        engagement_scores.append(round(engagement))
+        lead_scores.append(min(max(round(100 * (1 - math.exp(-engagement / weights.score_scale))), 0), 100))
+    return engagement_scores, lead_scores
+
+def compute_scores(leads, counts, weights):
+    if np is not None:
+        return compute_scores_numpy(leads, counts, weights)
+    return compute_scores_python(leads, counts, weights)
+
+# ============================================================================
+# BATCH RUN
+# ============================================================================
+
+def write_scores(changed):
+    """
+    One UPDATE per distinct (engagement, score) pair. Scores fall in a narrow
+    range, so a batch collapses to a few dozen statements, where bulk_update
+    would build a CASE expression per row.
+    """
+    by_value = defaultdict(list)
+    for lead_id, engagement, score in changed:
+        by_value[(engagement, score)].append(lead_id)
+    # Only the two score columns are written, so updated_at (the incremental marker) is untouched
+    for (engagement, score), lead_ids in by_value.items():
+        for start in range(0, len(lead_ids), SCORING_UPDATE_CHUNK):
+            Lead.all_objects.filter(pk__in=lead_ids[start:start + SCORING_UPDATE_CHUNK]).update(
+                engagement_score=engagement, lead_score=score
+            )
+
+def score_batch(leads, weights, now):
+    """Score lead rows (id, visits, opens, clicks, engagement, score); returns rows changed"""
+    counts = activity_counts([lead[0] for lead in leads], weights, now)
+    engagement_scores, lead_scores = compute_scores(leads, counts, weights)
+
+    changed = [
+        (lead[0], engagement, score)
+        for lead, engagement, score in zip(leads, engagement_scores, lead_scores)
+        if (engagement, score) != (lead[4], lead[5])
+    ]
+    write_scores(changed)
+    return len(changed)
+
+def touched_leads(queryset, since):
+    """Leads edited, or given new activity, since a previous run"""
+    recent_activity = Activity.all_objects.filter(created_at__gte=since, lead__isnull=False).values('lead_id')
+    return queryset.filter(Q(updated_at__gte=since) | Q(pk__in=recent_activity))
+
+def score_leads(queryset, weights, now=None, batch_size=SCORING_BATCH_SIZE):
+    """Score every lead in queryset in keyset-paginated batches; returns (scored, changed)"""
+    now = now or timezone.now()
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'website_visits', 'email_opens', 'email_clicks', 'engagement_score', 'lead_score'
+    )
+    scored = changed = 0
+    last_pk = None
+    while True:
+        batch = list((rows.filter(pk__gt=last_pk) if last_pk else rows)[:batch_size])
+        if not batch:
+            return scored, changed
+        changed += score_batch(batch, weights, now)
+        scored += len(batch)
+        last_pk = batch[-1][0]
+
+def score_tenant(profile, incremental=False, batch_size=SCORING_BATCH_SIZE):
+    """Rescore one tenant's leads and record the run on its profile"""
+    started = timezone.now()
+    leads = Lead.all_objects.filter(tenant_id=profile.tenant_id)
+    # Weights edited since the last run invalidate every score, so those runs are full
+    if incremental and profile.last_scored_at and profile.updated_at <= profile.last_scored_at:
+        leads = touched_leads(leads, profile.last_scored_at)
+
+    scored, changed = score_leads(leads, ScoringWeights(profile), started, batch_size)
+    LeadScoringProfile.objects.filter(pk=profile.pk).update(last_scored_at=started)
+    return scored, changed
+
+def run_scoring(tenants=None, incremental=False, batch_size=SCORING_BATCH_SIZE):
+    """
+    Rescore leads for the given tenants (all by default); returns (scored, changed).
+    Leads without a tenant are scored with the default weights on full runs.
+    """
+    tenant_ids = list((tenants if tenants is not None else Tenant.objects.all()).values_list('pk', flat=True))
+    scored = changed = 0
+    for tenant_id, profile in profiles_by_tenant(tenant_ids).items():
+        tenant_scored, tenant_changed = score_tenant(profile, incremental, batch_size)
+        logger.info('Scored %d leads for tenant %s (%d changed)', tenant_scored, tenant_id, tenant_changed)
+        scored += tenant_scored
+        changed += tenant_changed
+
+    if tenants is None and not incremental:
+        orphan_scored, orphan_changed = score_leads(
+            Lead.all_objects.filter(tenant__isnull=True), ScoringWeights(LeadScoringProfile()), batch_size=batch_size
+        )
+        scored += orphan_scored
+        changed += orphan_changed
+    return scored, changed
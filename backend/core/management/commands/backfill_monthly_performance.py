@@ -0,0 +1,27 @@
+# Revolution Realty - Monthly Performance Backfill Command
+# Rebuild the monthly rollup table from historical leads and transactions
+
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from core.stats import backfill_monthly_performance
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly performance rollup from historical data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild months from this date onward (YYYY-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be formatted as YYYY-MM-DD')
+        
+        self.stdout.write('Rebuilding monthly performance rollup...')
+        months = backfill_monthly_performance(since=since)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {months} monthly rollup rows'))
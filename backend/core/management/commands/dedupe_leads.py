@@ -0,0 +1,37 @@
+# Revolution Realty - Lead Dedupe Command
+# Merge existing duplicate leads (same normalized email or phone) into the oldest record
+
+from django.core.management.base import BaseCommand, CommandError
+from core.lead_dedup import dedupe_leads
+from core.lead_intake import SYSTEM_USER_ID
+from core.models import Lead
+from core.saas_models import Tenant
+
+class Command(BaseCommand):
+    help = 'Find leads sharing a normalized email or phone and merge each group into its oldest lead'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            help='Only dedupe this tenant (slug)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report duplicate groups without merging them'
+        )
+
+    def handle(self, *args, **options):
+        leads = Lead.all_objects.all()
+        if options['tenant']:
+            try:
+                tenant = Tenant.objects.get(slug=options['tenant'])
+            except Tenant.DoesNotExist:
+                raise CommandError(f"Tenant {options['tenant']} does not exist")
+            leads = leads.filter(tenant=tenant)
+
+        clusters, merged = dedupe_leads(leads, SYSTEM_USER_ID, dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'{clusters} duplicate groups found, {merged} leads would be merged')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{clusters} duplicate groups found, {merged} leads merged'))
@@ -0,0 +1,51 @@
+# Revolution Realty - Property Import Command
+# Stream a listing feed file (CSV, JSON lines or RETS/RESO XML) into Property rows
+
+from django.core.management.base import BaseCommand, CommandError
+from core.property_import import IMPORT_BATCH_SIZE, PropertyImporter, SUPPORTED_FORMATS, detect_format
+from core.saas_models import Tenant
+
+class Command(BaseCommand):
+    help = 'Import or update properties from a CSV, JSON lines or RETS/RESO XML feed file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file to import')
+        parser.add_argument(
+            '--tenant',
+            required=True,
+            help='Tenant (slug) the listings belong to'
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(SUPPORTED_FORMATS),
+            help='Feed format (detected from the file extension by default)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Rows per bulk upsert'
+        )
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        if not file_format:
+            raise CommandError('Cannot detect the feed format; pass --format')
+        try:
+            tenant = Tenant.objects.get(slug=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant']} does not exist")
+        
+        with open(options['path'], 'rb') as stream:
+            importer = PropertyImporter(batch_size=options['batch_size'], tenant_id=tenant.id)
+            report = importer.run(stream, file_format)
+        
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f"... {report['error_count'] - len(report['errors'])} more errors")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['imported']} of {report['rows']} rows in {report['seconds']}s "
+            f"({report['rows_per_second']} rows/s, {report['error_count']} errors)"
+        ))
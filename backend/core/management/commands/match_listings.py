@@ -0,0 +1,60 @@
+# Revolution Realty - Listing Match Command
+# Batch-match active listings to leads' saved preferences (after imports, or to replay a feed sync)
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.lead_matching import MATCH_BATCH_SIZE, match_properties, reindex_leads
+from core.models import Lead, Property
+from core.saas_models import Tenant
+
+class Command(BaseCommand):
+    help = 'Match active listings to leads whose saved price, bedroom, bathroom and location preferences they meet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=int,
+            metavar='HOURS',
+            help='Only match listings added or changed in the last HOURS hours'
+        )
+        parser.add_argument(
+            '--tenant',
+            help='Only match this tenant (slug)'
+        )
+        parser.add_argument(
+            '--rebuild-index',
+            action='store_true',
+            help="Rebuild the leads' preference index before matching (needed once after upgrading)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=MATCH_BATCH_SIZE,
+            help='Listings matched per batch'
+        )
+
+    def handle(self, *args, **options):
+        listings = Property.all_objects.all()
+        leads = Lead.all_objects.all()
+        if options['tenant']:
+            try:
+                tenant = Tenant.objects.get(slug=options['tenant'])
+            except Tenant.DoesNotExist:
+                raise CommandError(f"Tenant {options['tenant']} does not exist")
+            listings = listings.filter(tenant=tenant)
+            leads = leads.filter(tenant=tenant)
+        if options['since'] is not None:
+            listings = listings.filter(updated_at__gte=timezone.now() - timedelta(hours=options['since']))
+
+        started = time.monotonic()
+        if options['rebuild_index']:
+            indexed, written = reindex_leads(leads)
+            self.stdout.write(f'Indexed {indexed} leads ({written} index rows)')
+
+        matched, created = match_properties(listings, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Matched {matched} listings, {created} new lead matches in {time.monotonic() - started:.1f}s'
+        ))
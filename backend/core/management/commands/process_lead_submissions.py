@@ -0,0 +1,43 @@
+# Revolution Realty - Lead Intake Worker Command
+# Write queued website lead captures in batches (run once from cron, or with --loop as a worker)
+
+import time
+
+from django.core.management.base import BaseCommand
+from core.lead_intake import LEAD_INTAKE_BATCH_SIZE, drain
+
+class Command(BaseCommand):
+    help = 'Write pending website lead submissions to the CRM'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=LEAD_INTAKE_BATCH_SIZE,
+            help='Submissions written per transaction'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new submissions instead of exiting'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the queue is empty (with --loop)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            created, failed = drain(options['batch_size'])
+            if created or failed or not options['loop']:
+                summary = f'{created} submissions written, {failed} failed'
+                if failed:
+                    self.stdout.write(self.style.WARNING(summary))
+                else:
+                    self.stdout.write(self.style.SUCCESS(summary))
+            if not options['loop']:
+                return
+            if not created:
+                time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+# Revolution Realty - Agent Load Rebuild Command
+# Recount agents' open leads for lead routing (run nightly from cron, or after data fixes)
+
+from django.core.management.base import BaseCommand, CommandError
+from core.lead_routing import recount_agent_load
+from core.saas_models import AgentRoutingState, Tenant
+
+class Command(BaseCommand):
+    help = 'Create missing agent routing rows and reset their open-lead counters from the lead table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            help='Only rebuild this tenant (slug)'
+        )
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.all()
+        if options['tenant']:
+            tenants = tenants.filter(slug=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant']} does not exist")
+        
+        tenant_ids = list(tenants.values_list('pk', flat=True))
+        recount_agent_load(tenant_ids)
+        agents = AgentRoutingState.objects.filter(tenant_id__in=tenant_ids).count()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt open-lead counters for {agents} agents'))
@@ -0,0 +1,18 @@
+# Revolution Realty - Search Index Rebuild Command
+# Re-index every listing in the property full-text search index
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.search import rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the property full-text search index'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write('Search index is maintained by the database on this backend; nothing to rebuild.')
+            return
+        
+        self.stdout.write('Rebuilding property search index...')
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Property search index rebuilt'))
@@ -0,0 +1,44 @@
+# Revolution Realty - Lead Scoring Command
+# Recompute lead/engagement scores (full run nightly from cron, --incremental in between)
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.lead_scoring import SCORING_BATCH_SIZE, np, run_scoring
+from core.saas_models import Tenant
+
+class Command(BaseCommand):
+    help = 'Recompute lead and engagement scores from engagement counters and recent activity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only rescore leads edited or given new activity since the last run'
+        )
+        parser.add_argument(
+            '--tenant',
+            help='Only score this tenant (slug)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SCORING_BATCH_SIZE,
+            help='Leads read, scored and written per batch'
+        )
+
+    def handle(self, *args, **options):
+        tenants = None
+        if options['tenant']:
+            tenants = Tenant.objects.filter(slug=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant']} does not exist")
+        
+        if np is None:
+            self.stdout.write(self.style.WARNING('NumPy is not installed; scoring row by row'))
+        
+        started = time.monotonic()
+        scored, changed = run_scoring(tenants, options['incremental'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored} leads ({changed} changed) in {time.monotonic() - started:.1f}s'
+        ))
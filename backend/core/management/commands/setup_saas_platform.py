@@ -6,6 +6,7 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 from core.saas_models import *
+from core.branding import prewarm_branding_cache
 
 class Command(BaseCommand):
     help = 'Set up the SaaS platform with subscription plans, features, and sample data'
@@ -39,6 +40,9 @@ class Command(BaseCommand):
         if options['create_sample_tenant']:
             self.create_sample_tenant()
         
+        # Warm the branding cache so first page loads skip the database
+        self.prewarm_branding()
+        
         self.stdout.write(self.style.SUCCESS('SaaS Platform setup completed successfully!'))
 
     def create_subscription_plans(self):
@@ -255,6 +259,12 @@ class Command(BaseCommand):
             if created:
                 self.stdout.write(f'  ✓ Created onboarding step: {step.name}')
 
+    def prewarm_branding(self):
+        """Cache branding snapshots for every tenant"""
+        self.stdout.write('Prewarming branding cache...')
+        count = prewarm_branding_cache()
+        self.stdout.write(f'  ✓ Cached branding for {count} tenants')
+
     def create_sample_tenant(self):
         """Create a sample tenant with demo data"""
         self.stdout.write('Creating sample tenant...')
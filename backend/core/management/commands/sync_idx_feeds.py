@@ -0,0 +1,47 @@
+# Revolution Realty - IDX Feed Sync Command
+# Incrementally sync MLS/IDX feeds that are due (run from cron every few minutes)
+
+from django.core.management.base import BaseCommand, CommandError
+from core.idx_sync import FeedSync, IDX_SYNC_INTERVAL_MINUTES, feeds_due
+from core.saas_models import TenantIntegration
+
+class Command(BaseCommand):
+    help = f'Sync IDX/MLS feeds not synced in the last {IDX_SYNC_INTERVAL_MINUTES} minutes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--feed',
+            type=int,
+            help='Sync this TenantIntegration now, regardless of the interval'
+        )
+
+    def handle(self, *args, **options):
+        if options['feed']:
+            try:
+                feeds = [TenantIntegration.objects.get(pk=options['feed'])]
+            except TenantIntegration.DoesNotExist:
+                raise CommandError(f"Feed {options['feed']} does not exist")
+        else:
+            feeds = list(feeds_due())
+        
+        if not feeds:
+            self.stdout.write('No feeds due for sync')
+            return
+        
+        for tenant_integration in feeds:
+            run = FeedSync(tenant_integration).run()
+            if run is None:
+                self.stdout.write(f'{tenant_integration}: sync already running, skipped')
+                continue
+            
+            summary = (
+                f'{tenant_integration}: {run.fetched} fetched, {run.created} created, '
+                f'{run.updated} updated, {run.unchanged} unchanged, {run.error_count} errors '
+                f'in {run.duration_seconds:.1f}s'
+            )
+            if run.status == 'success':
+                self.stdout.write(self.style.SUCCESS(summary))
+            else:
+                self.stdout.write(self.style.ERROR(summary))
+                for error in run.errors[-1:]:
+                    self.stdout.write(self.style.ERROR(f"  {error['error']}"))
@@ -1,15 +1,30 @@
 # Revolution Realty - Multi-Tenant Middleware
 # Handle tenant resolution and context for SaaS platform
 
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils.deprecation import MiddlewareMixin
-from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from .branding import aget_branding, get_branding
+from .quotas import QuotaExceeded, aget_snapshot as aget_quota_snapshot, get_snapshot as get_quota_snapshot
 from .saas_models import Tenant
-import threading
+from .tenant_cache import aget_tenant_id, get_tenant_id
+from .tenant_context import get_current_tenant_id, set_current_tenant, clear_current_tenant
+from .usage import arecord_usage, record_usage
 
-# Thread-local storage for tenant context
-_thread_locals = threading.local()
+# Each middleware also defines __acall__, so under ASGI the request stays on
+# the event loop instead of hopping to a thread for every process_request
+
+def request_host(request):
+    """Request host without the port"""
+    host = request.get_host().lower()
+    
+    # Remove port if present
+    if ':' in host:
+        host = host.split(':')[0]
+    
+    return host
 
 class TenantMiddleware(MiddlewareMixin):
     """
@@ -18,93 +33,55 @@ class TenantMiddleware(MiddlewareMixin):
     """
     
     def process_request(self, request):
-        # Get the host from the request
-        host = request.get_host().lower()
-        
-        # Remove port if present
-        if ':' in host:
-            host = host.split(':')[0]
-        
-        # Try to get tenant from cache first
-        cache_key = f"tenant:{host}"
-        tenant = cache.get(cache_key)
-        
-        if not tenant:
-            tenant = self.resolve_tenant(host)
-            if tenant:
-                # Cache for 5 minutes
-                cache.set(cache_key, tenant, 300)
-        
-        if not tenant:
-            # If no tenant found and not accessing admin or API docs
-            if not (host.startswith('admin.') or '/admin/' in request.path or '/api/docs/' in request.path):
-                raise Http404("Tenant not found")
-        
-        # Set tenant in thread-local storage
-        set_current_tenant(tenant)
-        
-        # Add tenant to request object
-        request.tenant = tenant
-        
-        return None
-    
-    def resolve_tenant(self, host):
-        """
-        Resolve tenant based on host
-        Priority:
-        1. Custom domain (e.g., johnsmithrealty.com)
-        2. Subdomain (e.g., johnsmith.revolutionrealty.com)
-        """
-        try:
-            # First try custom domain
-            tenant = Tenant.objects.get(domain=host, status='active')
-            return tenant
-        except Tenant.DoesNotExist:
-            pass
-        
-        # Try subdomain
-        if '.revolutionrealty.com' in host:
-            subdomain = host.replace('.revolutionrealty.com', '')
-            try:
-                tenant = Tenant.objects.get(subdomain=subdomain, status='active')
-                return tenant
-            except Tenant.DoesNotExist:
-                pass
-        
-        # For development/localhost
-        if host in ['localhost', '127.0.0.1', 'revolutionmvpmigrated-production.up.railway.app']:
-            # Return first active tenant for development
-            return Tenant.objects.filter(status='active').first()
-        
+        # Host -> tenant ID, from the in-process LRU or the shared cache
+        host = request_host(request)
+        self.set_tenant(request, host, get_tenant_id(host))
         return None
     
     def process_response(self, request, response):
         # Clear tenant context
         clear_current_tenant()
         return response
+    
+    async def __acall__(self, request):
+        host = request_host(request)
+        self.set_tenant(request, host, await aget_tenant_id(host))
+        try:
+            response = await self.get_response(request)
+        finally:
+            clear_current_tenant()
+        return response
+    
+    def set_tenant(self, request, host, tenant_id):
+        if not tenant_id:
+            # Only the API serves tenant data; the React shell, admin and API docs load without a tenant
+            if request.path.startswith('/api/') and not (host.startswith('admin.') or '/api/docs/' in request.path):
+                raise Http404("Tenant not found")
+            tenant = None
+        else:
+            # The tenant row is only loaded if the request uses it
+            tenant = SimpleLazyObject(lambda: load_tenant(tenant_id))
+        
+        # Set tenant in the request context
+        set_current_tenant(tenant, tenant_id)
+        
+        # Add tenant to request object
+        request.tenant = tenant
+        request.tenant_id = tenant_id
 
-def get_current_tenant():
-    """Get the current tenant from thread-local storage"""
-    return getattr(_thread_locals, 'tenant', None)
-
-def set_current_tenant(tenant):
-    """Set the current tenant in thread-local storage"""
-    _thread_locals.tenant = tenant
-
-def clear_current_tenant():
-    """Clear the current tenant from thread-local storage"""
-    if hasattr(_thread_locals, 'tenant'):
-        delattr(_thread_locals, 'tenant')
+def load_tenant(tenant_id):
+    """Fetch a resolved tenant with its plan"""
+    return Tenant.objects.select_related('subscription_plan').get(pk=tenant_id)
 
 class TenantQuerySetMixin:
     """Mixin to automatically filter querysets by current tenant"""
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        tenant = get_current_tenant()
+        tenant_id = get_current_tenant_id()
         
-        if tenant and hasattr(self.model, 'tenant'):
-            queryset = queryset.filter(tenant=tenant)
+        if tenant_id and hasattr(queryset.model, 'tenant'):
+            queryset = queryset.filter(tenant_id=tenant_id)
         
         return queryset
 
@@ -113,27 +90,63 @@ class SubscriptionMiddleware(MiddlewareMixin):
     Middleware to check subscription status and limits
     """
     
+    # POST endpoints that create quota-limited records
+    QUOTA_ENDPOINTS = [
+        ('/api/leads/', 'leads'),
+        ('/api/crm/leads/create/', 'leads'),
+        ('/api/public/capture-lead/', 'leads'),
+        ('/api/properties/', 'properties'),
+        ('/api/crm/properties/create/', 'properties'),
+    ]
+    
     def process_request(self, request):
-        tenant = getattr(request, 'tenant', None)
-        
-        if not tenant:
+        if not self.should_check(request):
             return None
         
+        # Status, trial and limits all come from one cached snapshot
+        return self.check_snapshot(request, get_quota_snapshot(request.tenant_id))
+    
+    async def __acall__(self, request):
+        if self.should_check(request):
+            response = self.check_snapshot(request, await aget_quota_snapshot(request.tenant_id))
+            if response is not None:
+                return response
+        return await self.get_response(request)
+    
+    def should_check(self, request):
+        if not getattr(request, 'tenant_id', None):
+            return False
+        
         # Skip checks for admin and API documentation
-        if '/admin/' in request.path or '/api/docs/' in request.path:
+        return not ('/admin/' in request.path or '/api/docs/' in request.path)
+    
+    def check_snapshot(self, request, snapshot):
+        if snapshot is None:
             return None
         
         # Check if trial has expired
-        if tenant.status == 'trial' and tenant.is_trial_expired():
+        if snapshot['status'] == 'trial' and snapshot['trial_ends_at'] and timezone.now() > snapshot['trial_ends_at']:
             # Redirect to upgrade page or show trial expired message
             # For now, we'll allow access but could restrict later
             pass
         
         # Check if subscription is suspended
-        if tenant.status == 'suspended':
+        if snapshot['status'] == 'suspended':
             # Could redirect to billing page or show suspended message
             pass
         
+        # Block creates that would exceed the plan's limits
+        if request.method == 'POST':
+            for path, resource in self.QUOTA_ENDPOINTS:
+                if request.path == path:
+                    if snapshot['usage'][resource] >= snapshot['limits'][resource]:
+                        return JsonResponse({
+                            'detail': QuotaExceeded.default_detail,
+                            'code': QuotaExceeded.default_code,
+                            'resource': resource,
+                        }, status=QuotaExceeded.status_code)
+                    break
+        
         return None
 
 class UsageTrackingMiddleware(MiddlewareMixin):
@@ -142,41 +155,28 @@ class UsageTrackingMiddleware(MiddlewareMixin):
     """
     
     def process_request(self, request):
-        tenant = getattr(request, 'tenant', None)
+        tenant_id = getattr(request, 'tenant_id', None)
         
-        if not tenant:
+        if not tenant_id:
             return None
         
         # Track API calls
         if request.path.startswith('/api/'):
-            self.increment_usage(tenant, 'api_calls', 1)
+            self.increment_usage(tenant_id, 'api_calls', 1)
         
         return None
     
-    def increment_usage(self, tenant, metric_type, value):
-        """Increment usage metric for tenant"""
-        from django.utils import timezone
-        from .saas_models import UsageMetric
-        from datetime import datetime
-        
-        # Get current month period
-        now = timezone.now()
-        period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Get or create usage metric for current month
-        metric, created = UsageMetric.objects.get_or_create(
-            tenant=tenant,
-            metric_type=metric_type,
-            period_start=period_start,
-            defaults={
-                'period_end': period_start.replace(month=period_start.month + 1) if period_start.month < 12 else period_start.replace(year=period_start.year + 1, month=1),
-                'value': 0
-            }
-        )
-        
-        # Increment the value
-        metric.value += value
-        metric.save()
+    async def __acall__(self, request):
+        tenant_id = getattr(request, 'tenant_id', None)
+        
+        if tenant_id and request.path.startswith('/api/'):
+            await arecord_usage(tenant_id, 'api_calls', 1)
+        
+        return await self.get_response(request)
+    
+    def increment_usage(self, tenant_id, metric_type, value):
+        """Increment usage metric for tenant (buffered, written behind)"""
+        record_usage(tenant_id, metric_type, value)
 
 class BrandingMiddleware(MiddlewareMixin):
     """
@@ -184,18 +184,19 @@ class BrandingMiddleware(MiddlewareMixin):
     """
     
     def process_request(self, request):
-        tenant = getattr(request, 'tenant', None)
-        
-        if tenant:
-            # Get branding configuration
-            try:
-                branding = tenant.branding
-                request.branding = branding
-            except:
-                # Create default branding if doesn't exist
-                from .saas_models import TenantBranding
-                branding = TenantBranding.objects.create(tenant=tenant)
-                request.branding = branding
+        tenant_id = getattr(request, 'tenant_id', None)
+        
+        if tenant_id:
+            # Cached snapshot for the tenant's current branding version;
+            # tenants without a branding row get the defaults
+            request.branding = get_branding(tenant_id)
         
         return None
-
+    
+    async def __acall__(self, request):
+        tenant_id = getattr(request, 'tenant_id', None)
+        
+        if tenant_id:
+            request.branding = await aget_branding(tenant_id)
+        
+        return await self.get_response(request)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_activity_feature_integration_invoice_lead_leadsource_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('leads', models.IntegerField(default=0)),
+                ('transactions', models.IntegerField(default=0)),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+    ]
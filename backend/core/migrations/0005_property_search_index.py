@@ -0,0 +1,90 @@
+# Revolution Realty - Property full-text search index
+# Postgres: generated tsvector column with a GIN index
+# SQLite: external-content FTS5 table kept in sync by triggers
+
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE core_property ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(address, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(city, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(zip_code, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX property_search_vector_idx ON core_property USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS property_search_vector_idx",
+    "ALTER TABLE core_property DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE core_property_fts USING fts5(
+        address, city, zip_code, description,
+        content='core_property', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER core_property_fts_insert AFTER INSERT ON core_property BEGIN
+        INSERT INTO core_property_fts(rowid, address, city, zip_code, description)
+        VALUES (new.rowid, new.address, new.city, new.zip_code, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_property_fts_delete AFTER DELETE ON core_property BEGIN
+        INSERT INTO core_property_fts(core_property_fts, rowid, address, city, zip_code, description)
+        VALUES ('delete', old.rowid, old.address, old.city, old.zip_code, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_property_fts_update AFTER UPDATE OF address, city, zip_code, description
+    ON core_property BEGIN
+        INSERT INTO core_property_fts(core_property_fts, rowid, address, city, zip_code, description)
+        VALUES ('delete', old.rowid, old.address, old.city, old.zip_code, old.description);
+        INSERT INTO core_property_fts(rowid, address, city, zip_code, description)
+        VALUES (new.rowid, new.address, new.city, new.zip_code, new.description);
+    END
+    """,
+    "INSERT INTO core_property_fts(core_property_fts) VALUES('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS core_property_fts_update",
+    "DROP TRIGGER IF EXISTS core_property_fts_delete",
+    "DROP TRIGGER IF EXISTS core_property_fts_insert",
+    "DROP TABLE IF EXISTS core_property_fts",
+]
+
+def run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_FORWARD)
+    elif vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_FORWARD)
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRES_REVERSE)
+    elif vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_list_endpoint_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
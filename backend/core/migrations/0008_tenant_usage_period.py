@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_feed_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='usage_period',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
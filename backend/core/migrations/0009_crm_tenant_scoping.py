@@ -0,0 +1,83 @@
+# Generated by Django 5.2.4 on 2026-10-17 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tenant_usage_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='tenant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leads', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='tenant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='properties', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='tenant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='tenant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='tenant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='core.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['tenant', '-created_at'], name='lead_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['tenant', 'status', '-created_at'], name='lead_tenant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['tenant', 'assigned_agent', '-created_at'], name='lead_tenant_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['tenant', 'status', '-created_at'], name='property_tenant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['tenant', 'status', 'list_price'], name='property_tenant_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['tenant', 'status', '-created_at'], name='transaction_tenant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['tenant', '-created_at'], name='transaction_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['tenant', 'position', '-created_at'], name='task_tenant_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['tenant', 'assigned_to', 'is_completed', 'position'], name='task_tenant_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['tenant', '-created_at'], name='activity_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['tenant', 'activity_type', '-created_at'], name='activity_tenant_type_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_property_favorites'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='core.lead')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'lead'], name='lead_tag_name_idx')],
+                'constraints': [models.UniqueConstraint(fields=('lead', 'name'), name='lead_tag_unique')],
+            },
+        ),
+    ]
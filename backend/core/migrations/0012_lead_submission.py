@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_lead_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lead_id', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('property_id', models.UUIDField(blank=True, null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lead_submissions', to='core.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='lead_submission_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:05
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Frozen copy of core.lead_identity as of this migration, so later changes
+# to the normalization rules don't alter what this backfill writes
+
+DOTLESS_EMAIL_DOMAINS = {'gmail.com': 'gmail.com', 'googlemail.com': 'gmail.com'}
+
+MIN_PHONE_DIGITS = 7
+
+
+def normalize_email(email):
+    email = (email or '').strip().lower()
+    local, at, domain = email.rpartition('@')
+    if not at or not local or not domain:
+        return ''
+    local = local.split('+', 1)[0]
+    if domain in DOTLESS_EMAIL_DOMAINS:
+        local = local.replace('.', '')
+        domain = DOTLESS_EMAIL_DOMAINS[domain]
+    return f'{local}@{domain}' if local else ''
+
+
+def normalize_phone(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ''
+
+
+def identity_hash(value):
+    return hashlib.sha256(value.encode()).hexdigest() if value else ''
+
+
+def hash_email(email):
+    return identity_hash(normalize_email(email))
+
+
+def hash_phone(phone):
+    return identity_hash(normalize_phone(phone))
+
+
+def backfill_identity_hashes(apps, schema_editor):
+    Lead = apps.get_model('core', 'Lead')
+    batch = []
+    for lead in Lead.objects.only('pk', 'email', 'phone').iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        lead.email_hash = hash_email(lead.email)
+        lead.phone_hash = hash_phone(lead.phone)
+        batch.append(lead)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            Lead.objects.bulk_update(batch, ['email_hash', 'phone_hash'])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ['email_hash', 'phone_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_lead_submission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='email_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['tenant', 'email_hash'], name='lead_tenant_email_hash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['tenant', 'phone_hash'], name='lead_tenant_phone_hash_idx'),
+        ),
+        migrations.RunPython(backfill_identity_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-17 22:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_lead_identity_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadScoringProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('website_visit_weight', models.FloatField(default=1.0)),
+                ('email_open_weight', models.FloatField(default=0.5)),
+                ('email_click_weight', models.FloatField(default=2.0)),
+                ('activity_weights', models.JSONField(blank=True, default=dict)),
+                ('half_life_days', models.PositiveIntegerField(default=30)),
+                ('score_scale', models.FloatField(default=25.0)),
+                ('last_scored_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lead_scoring', to='core.tenant')),
+            ],
+        ),
+    ]
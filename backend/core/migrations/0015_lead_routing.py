@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_lead_scoring_profile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadRoutingConfig',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('strategy', models.CharField(choices=[('round_robin', 'Round Robin'), ('territory', 'Territory'), ('load', 'Fewest Open Leads')], default='round_robin', max_length=20)),
+                ('is_enabled', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lead_routing', to='core.tenant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AgentRoutingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_available', models.BooleanField(default=True)),
+                ('territories', models.TextField(blank=True)),
+                ('open_leads', models.IntegerField(default=0)),
+                ('last_turn', models.BigIntegerField(default=0)),
+                ('last_assigned_at', models.DateTimeField(blank=True, null=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routing_states', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_routing', to='core.tenant')),
+            ],
+            options={
+                'unique_together': {('tenant', 'agent')},
+            },
+        ),
+    ]
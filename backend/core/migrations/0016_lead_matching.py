@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_lead_routing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadMatchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_key', models.CharField(max_length=100)),
+                ('price_band', models.IntegerField()),
+                ('min_bedrooms', models.IntegerField(default=0)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('min_bathrooms', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_keys', to='core.lead')),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lead_match_keys', to='core.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'location_key', 'price_band', 'min_bedrooms'], name='lead_match_key_probe_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PropertyMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('list_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('new', 'New'), ('sent', 'Sent'), ('dismissed', 'Dismissed')], default='new', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='property_matches', to=settings.AUTH_USER_MODEL)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='property_matches', to='core.lead')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='core.property')),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='property_matches', to='core.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['agent', 'status', '-created_at'], name='property_match_agent_idx'), models.Index(fields=['lead', '-created_at'], name='property_match_lead_idx')],
+                'constraints': [models.UniqueConstraint(fields=('property', 'lead'), name='property_match_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def clear_platform_rollup(apps, schema_editor):
+    # Existing rows are platform-wide totals; backfill_monthly_performance rebuilds them per tenant
+    apps.get_model('core', 'MonthlyPerformance').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_lead_matching'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_platform_rollup, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='monthlyperformance',
+            name='tenant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_performance', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='monthlyperformance',
+            name='month',
+            field=models.DateField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlyperformance',
+            unique_together={('tenant', 'month')},
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_monthly_performance_tenant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='property',
+            name='mls_number',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='property',
+            constraint=models.UniqueConstraint(fields=('tenant', 'mls_number'), name='property_tenant_mls_unique'),
+        ),
+    ]
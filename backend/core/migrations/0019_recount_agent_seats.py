@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:05
+
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def recount_agent_seats(apps, schema_editor):
+    # Seats used to count every membership; only active agents use one now (see signals.counts_as_agent)
+    Tenant = apps.get_model('core', 'Tenant')
+    seats = dict(
+        Tenant.objects.annotate(
+            seats=Count('tenant_users', filter=Q(tenant_users__is_active=True, tenant_users__role='agent'))
+        ).values_list('pk', 'seats')
+    )
+    for tenant_id, count in seats.items():
+        Tenant.objects.filter(pk=tenant_id).update(current_agents=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_property_tenant_mls_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_agent_seats, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,24 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 import json
 
+from .geo import encode_geohash
+from .lead_identity import hash_email, hash_phone
+from .tenant_context import get_current_tenant_id
+
+# ============================================================================
+# TENANT SCOPING
+# ============================================================================
+
+class TenantManager(models.Manager):
+    """Default manager limited to the current request's tenant, when there is one"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tenant_id = get_current_tenant_id()
+        if tenant_id:
+            queryset = queryset.filter(tenant_id=tenant_id)
+        return queryset
+
 # ============================================================================
 # LEAD MANAGEMENT (BOOMTOWN-STYLE)
 # ============================================================================
@@ -43,11 +61,16 @@ class Lead(models.Model):
     
     # Basic Information
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='leads')
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     email = models.EmailField()
     phone = models.CharField(max_length=20, blank=True)
     
+    # Normalized identity hashes for duplicate detection (see lead_identity)
+    email_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    phone_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    
     # Lead Details
     status = models.CharField(max_length=20, choices=LEAD_STATUS_CHOICES, default='new')
     lead_type = models.CharField(max_length=10, choices=LEAD_TYPE_CHOICES, default='buyer')
@@ -76,9 +99,82 @@ class Lead(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     last_contact = models.DateTimeField(null=True, blank=True)
     
+    objects = TenantManager()
+    all_objects = models.Manager()  # Unscoped, for cross-tenant jobs
+    
+    class Meta:
+        indexes = [
+            # LeadViewSet list: optional status/lead_type/agent filter, newest first
+            models.Index(fields=['-created_at'], name='lead_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='lead_status_created_idx'),
+            models.Index(fields=['lead_type', '-created_at'], name='lead_type_created_idx'),
+            models.Index(fields=['assigned_agent', '-created_at'], name='lead_agent_created_idx'),
+            # Tenant-scoped lists lead with tenant_id
+            models.Index(fields=['tenant', '-created_at'], name='lead_tenant_created_idx'),
+            models.Index(fields=['tenant', 'status', '-created_at'], name='lead_tenant_status_idx'),
+            models.Index(fields=['tenant', 'assigned_agent', '-created_at'], name='lead_tenant_agent_idx'),
+            # Duplicate checks on ingest and dedupe_leads blocking
+            models.Index(fields=['tenant', 'email_hash'], name='lead_tenant_email_hash_idx'),
+            models.Index(fields=['tenant', 'phone_hash'], name='lead_tenant_phone_hash_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Keep the identity hashes in step with the contact fields
+        self.set_identity_hashes()
+        super().save(*args, **kwargs)
+    
+    def set_identity_hashes(self):
+        self.email_hash = hash_email(self.email)
+        self.phone_hash = hash_phone(self.phone)
+    
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.get_status_display()}"
 
+class LeadTag(models.Model):
+    """Free-form label on a lead, one row per lead and tag"""
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='tags')
+    name = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lead', 'name'], name='lead_tag_unique'),
+        ]
+        indexes = [
+            # Leads carrying a tag (list filter and bulk selections)
+            models.Index(fields=['name', 'lead'], name='lead_tag_name_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+class LeadSubmission(models.Model):
+    """Website lead capture queued for the intake worker (outbox row)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    ]
+    
+    # ID the lead is created with, so the capture response can return it
+    lead_id = models.UUIDField(unique=True, default=uuid.uuid4)
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='lead_submissions')
+    property_id = models.UUIDField(null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            # Worker drains pending rows oldest first
+            models.Index(fields=['status', 'id'], name='lead_submission_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.payload.get('email', '')} - {self.get_status_display()}"
+
 # ============================================================================
 # PROPERTY MANAGEMENT (REAL GEEKS-STYLE)
 # ============================================================================
@@ -104,12 +200,21 @@ class Property(models.Model):
     
     # Basic Information
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    mls_number = models.CharField(max_length=50, unique=True, null=True, blank=True)
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='properties')
+    mls_number = models.CharField(max_length=50, null=True, blank=True)
     address = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=50)
     zip_code = models.CharField(max_length=10)
     
+    # Location (geohash is derived from the coordinates on save)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False)
+    
+    # Feed sync (hash of the imported listing fields, used to skip unchanged rows)
+    content_hash = models.CharField(max_length=40, null=True, blank=True, editable=False)
+    
     # Property Details
     property_type = models.CharField(max_length=20, choices=PROPERTY_TYPE_CHOICES)
     bedrooms = models.IntegerField()
@@ -145,6 +250,36 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantManager()
+    all_objects = models.Manager()  # Unscoped, for cross-tenant jobs
+    
+    class Meta:
+        indexes = [
+            # PropertyViewSet list and public search: status filter plus price/type/bedroom ranges
+            models.Index(fields=['-created_at'], name='property_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='property_status_created_idx'),
+            models.Index(fields=['status', 'list_price'], name='property_status_price_idx'),
+            models.Index(fields=['status', 'property_type', 'list_price'], name='property_status_type_idx'),
+            models.Index(fields=['status', 'bedrooms'], name='property_status_beds_idx'),
+            # Map viewport and radius searches scan geohash cell ranges
+            models.Index(fields=['geohash'], name='property_geohash_idx'),
+            # Tenant-scoped lists and searches lead with tenant_id
+            models.Index(fields=['tenant', 'status', '-created_at'], name='property_tenant_status_idx'),
+            models.Index(fields=['tenant', 'status', 'list_price'], name='property_tenant_price_idx'),
+        ]
+        constraints = [
+            # Each brokerage's feed numbers its own listings; feed upserts conflict on this pair
+            models.UniqueConstraint(fields=['tenant', 'mls_number'], name='property_tenant_mls_unique'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Keep the geohash grid cell in step with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = None
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.address}, {self.city} - ${self.list_price:,.0f}"
 
@@ -160,6 +295,24 @@ class PropertyImage(models.Model):
     class Meta:
         ordering = ['order', 'created_at']
 
+class PropertyFavorite(models.Model):
+    """A user's saved property; Property.favorite_count is the running total"""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='favorites')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorite_properties')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'user'], name='property_favorite_unique'),
+        ]
+        indexes = [
+            # A user's saved properties, newest first
+            models.Index(fields=['user', '-created_at'], name='favorite_user_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.property_id}"
+
 # ============================================================================
 # TRANSACTION MANAGEMENT (COMMISSIONS INC-STYLE)
 # ============================================================================
@@ -182,6 +335,7 @@ class Transaction(models.Model):
     
     # Basic Information
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='transactions')
     property = models.ForeignKey(Property, on_delete=models.CASCADE, null=True, blank=True)
     lead = models.ForeignKey(Lead, on_delete=models.SET_NULL, null=True, blank=True)
     
@@ -211,12 +365,25 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantManager()
+    all_objects = models.Manager()  # Unscoped, for cross-tenant jobs
+    
     def save(self, *args, **kwargs):
         # Calculate estimated commission
         if self.sale_price and self.commission_rate:
             self.estimated_commission = self.sale_price * self.commission_rate
         super().save(*args, **kwargs)
     
+    class Meta:
+        indexes = [
+            # TransactionViewSet list and dashboard/rollup status counts
+            models.Index(fields=['status', '-created_at'], name='transaction_status_created_idx'),
+            models.Index(fields=['-created_at'], name='transaction_created_idx'),
+            # Tenant-scoped lists lead with tenant_id
+            models.Index(fields=['tenant', 'status', '-created_at'], name='transaction_tenant_status_idx'),
+            models.Index(fields=['tenant', '-created_at'], name='transaction_tenant_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.property.address} - {self.get_status_display()}"
 
@@ -258,6 +425,7 @@ class Task(models.Model):
     
     # Basic Information
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='tasks')
     task_list = models.ForeignKey(TaskList, on_delete=models.CASCADE, related_name='tasks')
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -285,8 +453,22 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantManager()
+    all_objects = models.Manager()  # Unscoped, for cross-tenant jobs
+    
     class Meta:
         ordering = ['position', '-created_at']
+        indexes = [
+            # TaskViewSet list: optional assignee/completion/priority filter, board order
+            models.Index(fields=['position', '-created_at'], name='task_position_idx'),
+            models.Index(fields=['assigned_to', 'is_completed', 'position'], name='task_assignee_position_idx'),
+            models.Index(fields=['is_completed', 'priority', 'position'], name='task_open_priority_idx'),
+            # Open tasks by due date for overdue counts (partial index where supported)
+            models.Index(fields=['due_date'], condition=models.Q(is_completed=False), name='task_open_due_idx'),
+            # Tenant-scoped lists lead with tenant_id
+            models.Index(fields=['tenant', 'position', '-created_at'], name='task_tenant_position_idx'),
+            models.Index(fields=['tenant', 'assigned_to', 'is_completed', 'position'], name='task_tenant_assignee_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -310,6 +492,7 @@ class Activity(models.Model):
     
     # Basic Information
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='activities')
     activity_type = models.CharField(max_length=20, choices=ACTIVITY_TYPE_CHOICES)
     subject = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -331,9 +514,107 @@ class Activity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantManager()
+    all_objects = models.Manager()  # Unscoped, for cross-tenant jobs
+    
+    class Meta:
+        indexes = [
+            # ActivityViewSet list: lead/transaction timelines and type filter, newest first
+            models.Index(fields=['-created_at'], name='activity_created_idx'),
+            models.Index(fields=['lead', '-created_at'], name='activity_lead_created_idx'),
+            models.Index(fields=['transaction', '-created_at'], name='activity_txn_created_idx'),
+            models.Index(fields=['activity_type', '-created_at'], name='activity_type_created_idx'),
+            # Tenant-scoped lists lead with tenant_id
+            models.Index(fields=['tenant', '-created_at'], name='activity_tenant_created_idx'),
+            models.Index(fields=['tenant', 'activity_type', '-created_at'], name='activity_tenant_type_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.get_activity_type_display()}: {self.subject}"
 
+# ============================================================================
+# LEAD MATCHING
+# ============================================================================
+
+class LeadMatchKey(models.Model):
+    """
+    Inverted index posting for listing alerts: one row per lead, preferred
+    location and price band. Listings probe (tenant, location_key, price_band)
+    and the stored bounds confirm the exact match (see lead_matching).
+    """
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='lead_match_keys')
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='match_keys')
+    location_key = models.CharField(max_length=100)
+    price_band = models.IntegerField()  # -1 for leads without a bounded price range
+    min_bedrooms = models.IntegerField(default=0)
+    
+    # Exact preferences, checked after the index probe
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    min_bathrooms = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'location_key', 'price_band', 'min_bedrooms'], name='lead_match_key_probe_idx'),
+        ]
+
+class PropertyMatch(models.Model):
+    """A listing matching a lead's saved preferences, queued as an agent alert"""
+    MATCH_STATUS_CHOICES = [
+        ('new', 'New'),
+        ('sent', 'Sent'),
+        ('dismissed', 'Dismissed'),
+    ]
+    
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='property_matches')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='matches')
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='property_matches')
+    agent = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='property_matches')
+    list_price = models.DecimalField(max_digits=12, decimal_places=2)  # Price when matched
+    status = models.CharField(max_length=10, choices=MATCH_STATUS_CHOICES, default='new')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = TenantManager()
+    all_objects = models.Manager()  # Unscoped, for cross-tenant jobs
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'lead'], name='property_match_unique'),
+        ]
+        indexes = [
+            # Agent alert inbox: new matches first
+            models.Index(fields=['agent', 'status', '-created_at'], name='property_match_agent_idx'),
+            models.Index(fields=['lead', '-created_at'], name='property_match_lead_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property} for {self.lead}"
+
+# ============================================================================
+# ANALYTICS ROLLUPS
+# ============================================================================
+
+class MonthlyPerformance(models.Model):
+    """Precomputed per-tenant monthly rollup backing performance trends"""
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True, related_name='monthly_performance')
+    month = models.DateField()  # First day of the month
+    leads = models.IntegerField(default=0)
+    transactions = models.IntegerField(default=0)
+    commission = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Timestamps
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+    all_objects = models.Manager()  # Unscoped, for cross-tenant jobs
+
+    class Meta:
+        ordering = ['month']
+        unique_together = ('tenant', 'month')
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.leads} leads, {self.transactions} transactions"
+
 # ============================================================================
 # SITE SETTINGS & CONFIGURATION
 # ============================================================================
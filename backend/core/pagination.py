@@ -0,0 +1,177 @@
+# Revolution Realty - API Pagination
+# Keyset (cursor) pagination for large list endpoints
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Filtered counts above this are reported as estimates on non-Postgres backends
+APPROXIMATE_COUNT_CAP = 1000
+
+# ============================================================================
+# COUNTS
+# ============================================================================
+
+def approximate_count(queryset):
+    """
+    Cheap row count for a queryset, returned as (count, is_estimate).
+    Postgres reads the planner's row estimate; other backends count up to
+    APPROXIMATE_COUNT_CAP rows and report anything beyond that as an estimate.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), True
+
+    count = queryset[:APPROXIMATE_COUNT_CAP + 1].count()
+    return min(count, APPROXIMATE_COUNT_CAP), count > APPROXIMATE_COUNT_CAP
+
+# ============================================================================
+# KEYSET PAGINATION
+# ============================================================================
+
+def encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+def keyset_filter(ordering, position):
+    """
+    Rows strictly after `position` in `ordering`, expressed as
+    (a > x) OR (a = x AND b > y) ... with each comparison following
+    the direction of its ordering field.
+    """
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': position[name]})
+        for previous in ordering[:index]:
+            previous_name = previous.lstrip('-')
+            step &= Q(**{previous_name: position[previous_name]})
+        condition |= step
+    return condition
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Requests carrying a `cursor` parameter (empty for the first page) are
+    paged by seeking past the last row of the previous page on a unique
+    ordering such as (created_at, id), so deep pages cost the same as the
+    first. Keyset pages skip the total count unless `count=exact` or
+    `count=approx` is requested.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-created_at', '-id')
+
+    def __init__(self, ordering=None):
+        if ordering:
+            self.ordering = tuple(ordering)
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def decode_cursor(self, request, ordering, model):
+        """
+        Position encoded in the request's cursor, with each value converted
+        by its model field so malformed cursors are a 404 rather than a
+        database error.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor.')
+        if not isinstance(position, dict) or any(field.lstrip('-') not in position for field in ordering):
+            raise NotFound('Invalid cursor.')
+
+        decoded = {}
+        for field in ordering:
+            name = field.lstrip('-')
+            try:
+                value = model._meta.get_field(name).to_python(position[name])
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound('Invalid cursor.')
+            if value is None:
+                raise NotFound('Invalid cursor.')
+            decoded[name] = value
+        return decoded
+
+    def encode_cursor(self, row, ordering):
+        position = {}
+        for field in ordering:
+            name = field.lstrip('-')
+            position[name] = encode_value(getattr(row, name))
+        return base64.urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.ordering if view is None else self.get_ordering(view)
+
+        self.total_count, self.count_is_estimate = None, False
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.total_count = queryset.count()
+        elif count_mode == 'approx':
+            self.total_count, self.count_is_estimate = approximate_count(queryset)
+
+        queryset = queryset.order_by(*ordering)
+        position = self.decode_cursor(request, ordering, queryset.model)
+        if position:
+            queryset = queryset.filter(keyset_filter(ordering, position))
+
+        # Fetch one extra row to learn whether another page exists
+        rows = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_cursor = self.encode_cursor(rows[-1], ordering)
+        return rows
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'count': self.total_count,
+            'count_is_estimate': self.count_is_estimate,
+            'results': data,
+        })
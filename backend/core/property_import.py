@@ -0,0 +1,367 @@
+# Revolution Realty - Bulk Property Import
+# Streaming CSV / JSON-lines / RETS-RESO XML importer with batched upserts
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from xml.etree import ElementTree
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .geo import encode_geohash
+from .models import Property
+from .tenant_context import get_current_tenant_id
+
+logger = logging.getLogger(__name__)
+
+# Rows per bulk upsert
+IMPORT_BATCH_SIZE = 1000
+
+# Per-row errors kept for the report; the total is always counted
+MAX_REPORTED_ERRORS = 500
+
+# XML elements treated as one listing (RETS and RESO exports)
+XML_LISTING_TAGS = {'property', 'listing', 'propertylisting', 'residential'}
+
+# Feed column names (lowercased) mapped onto Property fields
+FIELD_ALIASES = {
+    'mls_number': ['mls_number', 'mlsnumber', 'mls', 'listingid', 'listingkey', 'listing_id'],
+    'address': ['address', 'unparsedaddress', 'streetaddress', 'full_address'],
+    'city': ['city'],
+    'state': ['state', 'stateorprovince'],
+    'zip_code': ['zip_code', 'zip', 'zipcode', 'postalcode'],
+    'property_type': ['property_type', 'propertytype', 'propertysubtype'],
+    'bedrooms': ['bedrooms', 'beds', 'bedroomstotal'],
+    'bathrooms': ['bathrooms', 'baths', 'bathroomstotaldecimal', 'bathroomstotalinteger'],
+    'square_feet': ['square_feet', 'sqft', 'livingarea'],
+    'lot_size': ['lot_size', 'lotsizeacres'],
+    'year_built': ['year_built', 'yearbuilt'],
+    'list_price': ['list_price', 'price', 'listprice'],
+    'original_price': ['original_price', 'originallistprice'],
+    'status': ['status', 'standardstatus', 'mlsstatus'],
+    'list_date': ['list_date', 'listdate', 'listingcontractdate', 'onmarketdate'],
+    'days_on_market': ['days_on_market', 'daysonmarket', 'dom'],
+    'description': ['description', 'publicremarks', 'remarks'],
+    'latitude': ['latitude', 'lat'],
+    'longitude': ['longitude', 'lng', 'lon'],
+}
+
+# Feed vocabularies mapped onto Property choices
+STATUS_ALIASES = {
+    'active': 'active', 'coming soon': 'active', 'new': 'active',
+    'pending': 'pending', 'active under contract': 'pending', 'under contract': 'pending',
+    'sold': 'sold', 'closed': 'sold',
+    'withdrawn': 'withdrawn', 'canceled': 'withdrawn', 'cancelled': 'withdrawn', 'hold': 'withdrawn',
+    'expired': 'expired',
+}
+
+PROPERTY_TYPE_ALIASES = {
+    'single_family': 'single_family', 'single family': 'single_family',
+    'single family residence': 'single_family', 'residential': 'single_family',
+    'condo': 'condo', 'condominium': 'condo',
+    'townhouse': 'townhouse', 'townhome': 'townhouse',
+    'multi_family': 'multi_family', 'multi-family': 'multi_family', 'multifamily': 'multi_family',
+    'residential income': 'multi_family',
+    'land': 'land', 'lot': 'land', 'lots and land': 'land',
+    'commercial': 'commercial', 'commercial sale': 'commercial',
+}
+
+REQUIRED_FIELDS = ['mls_number', 'address', 'city', 'state', 'zip_code', 'property_type',
+                   'bedrooms', 'bathrooms', 'list_price']
+
+# Columns rewritten when an existing listing is updated
+UPSERT_FIELDS = [
+    'address', 'city', 'state', 'zip_code', 'latitude', 'longitude', 'geohash',
+    'property_type', 'bedrooms', 'bathrooms', 'square_feet', 'lot_size', 'year_built',
+    'list_price', 'original_price', 'price_per_sqft', 'status', 'list_date',
+    'days_on_market', 'description', 'content_hash', 'updated_at',
+]
+
+# Feed-sourced columns hashed to detect unchanged listings between syncs
+HASHED_FIELDS = ['mls_number'] + [field for field in UPSERT_FIELDS if field not in ('content_hash', 'updated_at')]
+
+SUPPORTED_FORMATS = {'csv': 'CSV', 'jsonl': 'JSON Lines', 'xml': 'XML (RETS/RESO)'}
+
+class RowError(ValueError):
+    """A feed row that cannot be imported"""
+
+# ============================================================================
+# PARSERS
+# ============================================================================
+
+def detect_format(filename):
+    """Import format from a file name"""
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith('.xml'):
+        return 'xml'
+    return None
+
+def iter_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield row
+
+def iter_jsonl(stream):
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8-sig'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield RowError(f'Invalid JSON on line {line_number}: {e}')
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower()
+
+def iter_xml(stream):
+    """Yield one dict per listing element, freeing each element once read"""
+    depth = 0
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        tag = local_name(element.tag)
+        if tag not in XML_LISTING_TAGS:
+            continue
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 0:
+            row = {}
+            for child in element.iter():
+                if child is not element and len(child) == 0 and child.text:
+                    row.setdefault(local_name(child.tag), child.text.strip())
+            yield row
+            element.clear()
+
+PARSERS = {'csv': iter_csv, 'jsonl': iter_jsonl, 'xml': iter_xml}
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def normalize_keys(row):
+    return {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+
+def pick(row, field):
+    for alias in FIELD_ALIASES[field]:
+        value = row.get(alias)
+        if value not in (None, ''):
+            return value.strip() if isinstance(value, str) else value
+    return None
+
+def to_number(value, field):
+    try:
+        number = Decimal(str(value).replace(',', '').replace('$', ''))
+    except InvalidOperation:
+        raise RowError(f'{field}: invalid number {value!r}')
+    if not number.is_finite():
+        raise RowError(f'{field}: invalid number {value!r}')
+    return number
+
+def fits_decimal_field(number, field):
+    """Whether a number, once rounded to the column's decimal places, fits its max_digits"""
+    model_field = Property._meta.get_field(field)
+    limit = Decimal(10) ** (model_field.max_digits - model_field.decimal_places)
+    # Magnitude first: rounding a huge value would itself overflow the context
+    return abs(number) < limit and abs(round(number, model_field.decimal_places)) < limit
+
+def to_decimal(value, field):
+    number = to_number(value, field)
+    if not fits_decimal_field(number, field):
+        raise RowError(f'{field}: {value!r} is out of range')
+    return number
+
+def to_int(value, field):
+    number = int(to_number(value, field))
+    low, high = connection.ops.integer_field_range(Property._meta.get_field(field).get_internal_type())
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise RowError(f'{field}: {value!r} is out of range')
+    return number
+
+def to_date(value, field):
+    if isinstance(value, date):
+        return value
+    text = str(value)[:10]
+    for fmt in ('%Y-%m-%d', '%m/%d/%Y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise RowError(f'{field}: invalid date {value!r}')
+
+def build_property(raw, today):
+    """Validate one feed row and build an unsaved Property"""
+    row = normalize_keys(raw)
+    values = {field: pick(row, field) for field in FIELD_ALIASES}
+
+    missing = [field for field in REQUIRED_FIELDS if values[field] is None]
+    if missing:
+        raise RowError(f'Missing required fields: {", ".join(missing)}')
+
+    property_type = PROPERTY_TYPE_ALIASES.get(str(values['property_type']).lower())
+    if not property_type:
+        raise RowError(f'property_type: unknown value {values["property_type"]!r}')
+    status = STATUS_ALIASES.get(str(values['status'] or 'active').lower())
+    if not status:
+        raise RowError(f'status: unknown value {values["status"]!r}')
+
+    listing = Property(
+        mls_number=str(values['mls_number'])[:50],
+        address=str(values['address'])[:255],
+        city=str(values['city'])[:100],
+        state=str(values['state'])[:50],
+        zip_code=str(values['zip_code'])[:10],
+        property_type=property_type,
+        bedrooms=to_int(values['bedrooms'], 'bedrooms'),
+        bathrooms=to_decimal(values['bathrooms'], 'bathrooms'),
+        list_price=to_decimal(values['list_price'], 'list_price'),
+        status=status,
+        list_date=to_date(values['list_date'], 'list_date') if values['list_date'] else today,
+        description=str(values['description'] or ''),
+    )
+    for field in ('square_feet', 'year_built', 'days_on_market'):
+        if values[field] is not None:
+            setattr(listing, field, to_int(values[field], field))
+    for field in ('lot_size', 'original_price', 'latitude', 'longitude'):
+        if values[field] is not None:
+            setattr(listing, field, to_decimal(values[field], field))
+
+    # bulk_create skips save(), so derived columns are filled in here
+    if listing.latitude is not None and listing.longitude is not None:
+        listing.geohash = encode_geohash(listing.latitude, listing.longitude)
+    if listing.square_feet:
+        price_per_sqft = round(listing.list_price / listing.square_feet, 2)
+        # Derived, so a tiny or mistyped area leaves it blank instead of failing the row
+        if fits_decimal_field(price_per_sqft, 'price_per_sqft'):
+            listing.price_per_sqft = price_per_sqft
+    listing.content_hash = listing_hash(listing)
+    return listing
+
+def listing_hash(listing):
+    """Stable digest of a listing's feed-sourced fields"""
+    values = [str(getattr(listing, field)) for field in HASHED_FIELDS]
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+def upsert_properties(listings):
+    """Insert or update listings on (tenant, mls_number) in one statement"""
+    upsert_kwargs = {'update_conflicts': True, 'update_fields': UPSERT_FIELDS}
+    if connection.features.supports_update_conflicts_with_target:
+        upsert_kwargs['unique_fields'] = ['tenant', 'mls_number']
+    Property.objects.bulk_create(listings, **upsert_kwargs)
+
+def upsert_batch(listings):
+    """
+    Upsert listings in one statement, falling back to one per row when the
+    batch fails so a single bad row costs only itself; returns the
+    (listing, error) pairs that could not be saved
+    """
+    try:
+        with transaction.atomic():
+            upsert_properties(listings)
+        return []
+    except DatabaseError:
+        logger.exception('Property upsert batch failed, retrying %d rows individually', len(listings))
+
+    failed = []
+    for listing in listings:
+        try:
+            with transaction.atomic():
+                upsert_properties([listing])
+        except DatabaseError as e:
+            failed.append((listing, e))
+    return failed
+
+# ============================================================================
+# IMPORTER
+# ============================================================================
+
+class PropertyImporter:
+    """
+    Stream a listing feed into Property rows.
+
+    Rows are parsed one at a time, validated, and upserted on (tenant,
+    mls_number) in batches of `batch_size`, so memory use is bounded by the
+    batch rather than the file.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, tenant_id=None):
+        self.batch_size = batch_size
+        self.tenant_id = tenant_id or get_current_tenant_id()
+        # Rows without a tenant never conflict, so a reimport would duplicate them
+        if not self.tenant_id:
+            raise ValueError('Listings are imported into a tenant; none was given or is active')
+        self.rows = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+        self.seconds = 0
+
+    def record_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def flush(self, batch):
+        if not batch:
+            return
+        # Feeds can repeat a listing; the last occurrence wins
+        listings = list({listing.mls_number: listing for listing in batch}.values())
+        failed = upsert_batch(listings)
+        for listing, error in failed:
+            self.record_error(listing._row_number, f'Could not be saved: {error}')
+        self.imported += len(listings) - len(failed)
+        batch.clear()
+
+    def run(self, stream, file_format):
+        """Import every row from a binary stream; returns the report"""
+        if file_format not in PARSERS:
+            raise ValueError(f'Unsupported import format: {file_format}')
+
+        started = time.monotonic()
+        today = timezone.now().date()
+        batch = []
+
+        try:
+            for row_number, raw in enumerate(PARSERS[file_format](stream), start=1):
+                self.rows = row_number
+                try:
+                    if isinstance(raw, RowError):
+                        raise raw
+                    if not isinstance(raw, dict):
+                        raise RowError('Row is not an object')
+                    listing = build_property(raw, today)
+                except RowError as e:
+                    self.record_error(row_number, str(e))
+                    continue
+                # bulk_create skips the pre_save tenant assignment
+                listing.tenant_id = self.tenant_id
+                listing._row_number = row_number
+                batch.append(listing)
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+        except (csv.Error, ElementTree.ParseError, UnicodeDecodeError) as e:
+            self.record_error(self.rows + 1, f'Unreadable file: {e}')
+
+        self.flush(batch)
+        self.seconds = time.monotonic() - started
+        return self.report()
+
+    def report(self):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 2),
+            'rows_per_second': round(self.rows / self.seconds) if self.seconds else self.rows,
+        }
@@ -0,0 +1,103 @@
+# Revolution Realty - Queryset Planning
+# Derive select_related/prefetch_related joins from serializer definitions
+
+from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
+
+# Query plans per serializer class, built once per process
+_plan_cache = {}
+
+# ============================================================================
+# SERIALIZER QUERY PLANNER
+# ============================================================================
+
+def resolve_relation_path(model, source):
+    """
+    Walk a dotted serializer source across model relations.
+    Returns (select_path, prefetch_path, related_model); select_path collects
+    the leading forward FK/OneToOne hops and prefetch_path is set once the
+    walk crosses a reverse or many-to-many relation.
+    """
+    select_parts = []
+    for part in source.split('.'):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        select_parts.append(part)
+        model = field.related_model
+        if field.many_to_many or field.one_to_many:
+            return None, '__'.join(select_parts), model
+    return '__'.join(select_parts) or None, None, model
+
+def build_query_plan(serializer_class):
+    """Collect the select_related and prefetch_related lookups a serializer needs"""
+    select_related = set()
+    prefetch_related = set()
+    model = serializer_class.Meta.model
+
+    for field in serializer_class().fields.values():
+        if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            continue
+
+        # Nested serializers: join to the relation and plan the child's needs under it
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(child, serializers.ModelSerializer):
+            select_path, prefetch_path, _ = resolve_relation_path(model, field.source)
+            child_select, child_prefetch = build_query_plan(type(child))
+            if prefetch_path:
+                prefetch_related.add(prefetch_path)
+                prefetch_related.update(f'{prefetch_path}__{path}' for path in child_select | child_prefetch)
+            elif select_path:
+                select_related.add(select_path)
+                select_related.update(f'{select_path}__{path}' for path in child_select)
+                prefetch_related.update(f'{select_path}__{path}' for path in child_prefetch)
+            continue
+
+        # Many-to-many primary key lists
+        if isinstance(field, serializers.ManyRelatedField):
+            prefetch_related.add(field.source.replace('.', '__'))
+            continue
+
+        # Dotted sources such as 'assigned_agent.get_full_name'
+        if '.' in field.source:
+            select_path, prefetch_path, _ = resolve_relation_path(model, field.source)
+            if select_path:
+                select_related.add(select_path)
+            if prefetch_path:
+                prefetch_related.add(prefetch_path)
+
+    return select_related, prefetch_related
+
+def get_query_plan(serializer_class):
+    """Cached query plan for a serializer class"""
+    if serializer_class not in _plan_cache:
+        _plan_cache[serializer_class] = build_query_plan(serializer_class)
+    return _plan_cache[serializer_class]
+
+def apply_query_plan(queryset, serializer_class):
+    """Apply the joins a serializer needs to a queryset"""
+    select_related, prefetch_related = get_query_plan(serializer_class)
+    if select_related:
+        queryset = queryset.select_related(*sorted(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*sorted(prefetch_related))
+
+    # Serializers can annotate what their method fields read
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        queryset = serializer_class.setup_eager_loading(queryset)
+    return queryset
+
+class SerializerQueryPlanMixin:
+    """Mixin to join everything the action's serializer dereferences"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+
+        if issubclass(serializer_class, serializers.ModelSerializer):
+            queryset = apply_query_plan(queryset, serializer_class)
+
+        return queryset
@@ -0,0 +1,156 @@
+# Revolution Realty - Subscription Quotas
+# Per-tenant usage counters and cached plan limits for quota enforcement
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .saas_models import Tenant
+
+# Snapshots are dropped when status or plan changes and adjusted in place when
+# usage moves; the TTL bounds drift from changes made by other workers
+QUOTA_CACHE_TTL = 60 * 60
+
+# Within this many of a limit, capacity is checked against freshly read usage
+QUOTA_RECHECK_MARGIN = 5
+
+# Quota resource -> (Tenant usage counter, SubscriptionPlan limit)
+QUOTA_RESOURCES = {
+    'agents': ('current_agents', 'max_agents'),
+    'leads': ('current_leads_this_month', 'max_leads_per_month'),
+    'properties': ('current_properties', 'max_properties'),
+}
+
+# Counters that restart every usage period (calendar month)
+MONTHLY_RESOURCES = {'leads'}
+
+class QuotaExceeded(APIException):
+    status_code = status.HTTP_403_FORBIDDEN
+    default_detail = 'Your subscription plan limit has been reached. Upgrade your plan to add more.'
+    default_code = 'quota_exceeded'
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+def current_period():
+    return timezone.localdate().replace(day=1)
+
+def cache_key(tenant_id):
+    return f"quota:{tenant_id}"
+
+def load_snapshot(tenant_id):
+    """Limits, usage and status for a tenant, read in one query"""
+    tenant = Tenant.objects.select_related('subscription_plan').filter(pk=tenant_id).first()
+    if tenant is None:
+        return None
+
+    period_is_current = tenant.usage_period == current_period()
+    usage = {}
+    limits = {}
+    for resource, (counter, limit) in QUOTA_RESOURCES.items():
+        value = getattr(tenant, counter)
+        if resource in MONTHLY_RESOURCES and not period_is_current:
+            value = 0
+        usage[resource] = value
+        limits[resource] = getattr(tenant.subscription_plan, limit)
+
+    return {
+        'period': current_period(),
+        'status': tenant.status,
+        'trial_ends_at': tenant.trial_ends_at,
+        'limits': limits,
+        'usage': usage,
+    }
+
+def refresh_snapshot(tenant_id):
+    """Read a tenant's snapshot from the database and cache it"""
+    snapshot = load_snapshot(tenant_id)
+    if snapshot is not None:
+        cache.set(cache_key(tenant_id), snapshot, QUOTA_CACHE_TTL)
+    return snapshot
+
+def get_snapshot(tenant_id):
+    """Cached quota snapshot for a tenant (one cache lookup when warm)"""
+    snapshot = cache.get(cache_key(tenant_id))
+    if snapshot is None or snapshot.get('period') != current_period():
+        snapshot = refresh_snapshot(tenant_id)
+    return snapshot
+
+async def aget_snapshot(tenant_id):
+    """Async get_snapshot"""
+    key = cache_key(tenant_id)
+    snapshot = await cache.aget(key)
+    if snapshot is None or snapshot.get('period') != current_period():
+        snapshot = await sync_to_async(load_snapshot)(tenant_id)
+        if snapshot is not None:
+            await cache.aset(key, snapshot, QUOTA_CACHE_TTL)
+    return snapshot
+
+def apply_usage(tenant_id, resource, delta):
+    """Move the usage in a tenant's cached snapshot, keeping it warm"""
+    key = cache_key(tenant_id)
+    snapshot = cache.get(key)
+    if snapshot is not None and snapshot.get('period') != current_period():
+        # Cached last month: monthly usage restarted with the new period
+        cache.delete(key)
+    elif snapshot is not None:
+        snapshot['usage'][resource] = max(snapshot['usage'][resource] + delta, 0)
+        cache.set(key, snapshot, QUOTA_CACHE_TTL)
+
+def invalidate(*tenant_ids):
+    cache.delete_many([cache_key(tenant_id) for tenant_id in tenant_ids])
+
+def invalidate_plan(plan_id):
+    """Drop snapshots for every tenant on a plan after its limits change"""
+    invalidate(*Tenant.objects.filter(subscription_plan_id=plan_id).values_list('id', flat=True))
+
+# ============================================================================
+# ENFORCEMENT
+# ============================================================================
+
+def has_capacity(tenant_id, resource, amount=1):
+    """Whether a tenant can add `amount` more of a resource"""
+    snapshot = get_snapshot(tenant_id)
+    if snapshot is None:
+        return True
+    if snapshot['usage'][resource] + amount + QUOTA_RECHECK_MARGIN > snapshot['limits'][resource]:
+        # Cached usage can trail other workers' writes; decide close calls on stored counts
+        snapshot = refresh_snapshot(tenant_id)
+        if snapshot is None:
+            return True
+    return snapshot['usage'][resource] + amount <= snapshot['limits'][resource]
+
+def enforce_quota(tenant_id, resource, amount=1):
+    """Raise QuotaExceeded if a tenant cannot add `amount` more of a resource"""
+    if tenant_id and not has_capacity(tenant_id, resource, amount):
+        raise QuotaExceeded()
+
+# ============================================================================
+# COUNTERS
+# ============================================================================
+
+def adjust_usage(tenant_id, resource, delta):
+    """Atomically move a tenant's usage counter and its cached snapshot"""
+    counter = QUOTA_RESOURCES[resource][0]
+    if resource in MONTHLY_RESOURCES:
+        period = current_period()
+        # A stale period restarts the count in the same statement
+        updates = {
+            counter: Case(
+                When(usage_period=period, then=Greatest(F(counter) + delta, 0)),
+                default=max(delta, 0),
+            ),
+            'usage_period': period,
+        }
+    else:
+        updates = {counter: Greatest(F(counter) + delta, 0)}
+
+    Tenant.objects.filter(pk=tenant_id).update(**updates)
+    # Applied after commit, so a rolled-back change never reaches the cache
+    transaction.on_commit(lambda: apply_usage(tenant_id, resource, delta))
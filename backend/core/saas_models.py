@@ -4,10 +4,14 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+import math
 import uuid
 import json
 
+from .models import Activity
+
 # ============================================================================
 # SAAS & TENANT MANAGEMENT
 # ============================================================================
@@ -80,6 +84,7 @@ class Tenant(models.Model):
     current_leads_this_month = models.IntegerField(default=0)
     current_properties = models.IntegerField(default=0)
     storage_used_gb = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    usage_period = models.DateField(null=True, blank=True)  # Month current_leads_this_month counts
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -97,13 +102,16 @@ class Tenant(models.Model):
         return False
     
     def can_add_agent(self):
-        return self.current_agents < self.subscription_plan.max_agents
+        from .quotas import has_capacity
+        return has_capacity(self.pk, 'agents')
     
     def can_add_lead(self):
-        return self.current_leads_this_month < self.subscription_plan.max_leads_per_month
+        from .quotas import has_capacity
+        return has_capacity(self.pk, 'leads')
     
     def can_add_property(self):
-        return self.current_properties < self.subscription_plan.max_properties
+        from .quotas import has_capacity
+        return has_capacity(self.pk, 'properties')
 
 class TenantUser(models.Model):
     """Link users to tenants with roles"""
@@ -188,6 +196,83 @@ class TenantBranding(models.Model):
     def __str__(self):
         return f"Branding for {self.tenant.name}"
 
+class LeadScoringProfile(models.Model):
+    """Per-tenant weights for the lead scoring engine (see lead_scoring)"""
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name='lead_scoring')
+    
+    # Points per engagement event (counts are log-damped)
+    website_visit_weight = models.FloatField(default=1.0)
+    email_open_weight = models.FloatField(default=0.5)
+    email_click_weight = models.FloatField(default=2.0)
+    activity_weights = models.JSONField(default=dict, blank=True)  # {"call": 3.0, ...} overrides per activity type
+    
+    # Activity points halve every half_life_days
+    half_life_days = models.PositiveIntegerField(default=30)
+    # Engagement points at which lead_score reaches ~63
+    score_scale = models.FloatField(default=25.0)
+    
+    # Incremental runs rescore leads touched since the last run
+    last_scored_at = models.DateTimeField(null=True, blank=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Lead scoring for {self.tenant.name}"
+    
+    def clean(self):
+        """activity_weights must map known activity types to finite numbers"""
+        weights = self.activity_weights or {}
+        if not isinstance(weights, dict):
+            raise ValidationError({'activity_weights': 'Expected an object of activity type to weight.'})
+        activity_types = {choice for choice, _ in Activity.ACTIVITY_TYPE_CHOICES}
+        errors = []
+        for activity_type, weight in weights.items():
+            if activity_type not in activity_types:
+                errors.append(f'Unknown activity type "{activity_type}".')
+            elif isinstance(weight, bool) or not isinstance(weight, (int, float)) or not math.isfinite(weight):
+                errors.append(f'Weight for "{activity_type}" must be a number.')
+        if errors:
+            raise ValidationError({'activity_weights': errors})
+
+class LeadRoutingConfig(models.Model):
+    """Per-tenant automatic assignment of new leads (see lead_routing)"""
+    ROUTING_STRATEGIES = [
+        ('round_robin', 'Round Robin'),
+        ('territory', 'Territory'),  # Agents whose territories match the lead's preferred locations
+        ('load', 'Fewest Open Leads'),
+    ]
+    
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name='lead_routing')
+    strategy = models.CharField(max_length=20, choices=ROUTING_STRATEGIES, default='round_robin')
+    is_enabled = models.BooleanField(default=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Lead routing for {self.tenant.name}"
+
+class AgentRoutingState(models.Model):
+    """An agent's routing territories, open-lead counter and round-robin turn"""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='agent_routing')
+    agent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='routing_states')
+    is_available = models.BooleanField(default=True)
+    territories = models.TextField(blank=True)  # Zip codes and cities, comma separated
+    
+    # Maintained on assignment and lead changes, recounted by rebuild_agent_load
+    open_leads = models.IntegerField(default=0)
+    last_turn = models.BigIntegerField(default=0)
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['tenant', 'agent']
+    
+    def __str__(self):
+        return f"{self.agent.get_full_name() or self.agent.username} ({self.open_leads} open)"
+
 class WebsiteTemplate(models.Model):
     """Available website templates for tenants"""
     name = models.CharField(max_length=100)
@@ -350,6 +435,40 @@ class TenantIntegration(models.Model):
     def __str__(self):
         return f"{self.tenant.name} - {self.integration.name}"
 
+class FeedSyncRun(models.Model):
+    """One incremental IDX/MLS feed sync and its stats"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+    
+    tenant_integration = models.ForeignKey(TenantIntegration, on_delete=models.CASCADE, related_name='sync_runs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    modified_since = models.DateTimeField(null=True, blank=True)  # last_sync when the run started
+    
+    # Row counts
+    fetched = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    unchanged = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)  # First few per-row errors
+    
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(default=0)
+    
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            # Latest runs per feed for the IDX dashboard
+            models.Index(fields=['tenant_integration', '-started_at'], name='feed_sync_run_recent_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tenant_integration} sync {self.started_at:%Y-%m-%d %H:%M} ({self.status})"
+
 # ============================================================================
 # ANALYTICS & REPORTING
 # ============================================================================
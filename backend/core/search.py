@@ -0,0 +1,92 @@
+# Revolution Realty - Property Search
+# Full-text search over listings backed by Postgres tsvector or SQLite FTS5
+
+import re
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# Columns indexed for search (see migration 0005_property_search_index)
+SEARCH_FIELDS = ['address', 'city', 'zip_code', 'description']
+
+# Search terms are reduced to word tokens before reaching the query syntax
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# ============================================================================
+# QUERY BUILDING
+# ============================================================================
+
+def tokenize(query):
+    """Split a free-text query into lowercase search tokens"""
+    return TOKEN_PATTERN.findall(query.lower())
+
+def postgres_query(tokens):
+    """to_tsquery expression matching every token, last one as a prefix"""
+    terms = tokens[:-1] + [f'{tokens[-1]}:*']
+    return ' & '.join(terms)
+
+def sqlite_query(tokens):
+    """FTS5 MATCH expression matching every token, last one as a prefix"""
+    terms = [f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return ' '.join(terms)
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+def search_properties(queryset, query):
+    """
+    Restrict a Property queryset to listings matching a search query and
+    annotate them with search_rank (higher is better). The final token is
+    matched as a prefix so type-ahead queries return results as you type.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        tsquery = postgres_query(tokens)
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT id FROM core_property WHERE search_vector @@ to_tsquery('english', %s)",
+                [tsquery]
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                "ts_rank_cd(core_property.search_vector, to_tsquery('english', %s))",
+                [tsquery], output_field=FloatField()
+            )
+        )
+
+    if connection.vendor == 'sqlite':
+        match = sqlite_query(tokens)
+        return queryset.filter(
+            id__in=RawSQL(
+                "SELECT p.id FROM core_property p JOIN core_property_fts f ON f.rowid = p.rowid "
+                "WHERE core_property_fts MATCH %s",
+                [match]
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                "SELECT -bm25(core_property_fts) FROM core_property_fts "
+                "WHERE core_property_fts MATCH %s AND core_property_fts.rowid = core_property.rowid",
+                [match], output_field=FloatField()
+            )
+        )
+
+    # Other backends have no search index; fall back to substring matching
+    condition = Q()
+    for token in tokens:
+        token_condition = Q()
+        for field in SEARCH_FIELDS:
+            token_condition |= Q(**{f'{field}__icontains': token})
+        condition &= token_condition
+    return queryset.filter(condition).annotate(
+        search_rank=RawSQL('0', [], output_field=FloatField())
+    )
+
+def rebuild_search_index():
+    """Re-index every listing (SQLite only; Postgres maintains a generated column)"""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO core_property_fts(core_property_fts) VALUES('rebuild')")
@@ -3,6 +3,7 @@
 
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import OuterRef, Subquery
 from .models import (
     Lead, LeadSource, Transaction, Task, TaskBoard, TaskList,
     Property, PropertyImage, Activity, SiteSettings
@@ -37,6 +38,7 @@ class LeadSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     lead_type_display = serializers.CharField(source='get_lead_type_display', read_only=True)
     days_since_created = serializers.SerializerMethodField()
+    tags = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
     
     class Meta:
         model = Lead
@@ -51,8 +53,8 @@ class LeadCreateSerializer(serializers.ModelSerializer):
         model = Lead
         fields = [
             'first_name', 'last_name', 'email', 'phone', 'lead_type',
-            'source', 'min_price', 'max_price', 'preferred_areas',
-            'bedrooms', 'bathrooms'
+            'source', 'min_price', 'max_price', 'preferred_locations',
+            'preferred_bedrooms', 'preferred_bathrooms'
         ]
 
 # ============================================================================
@@ -72,9 +74,9 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_days_to_closing(self, obj):
-        if obj.closing_date:
+        if obj.expected_close_date:
             from django.utils import timezone
-            return (obj.closing_date - timezone.now().date()).days
+            return (obj.expected_close_date - timezone.now().date()).days
         return None
 
 # ============================================================================
@@ -153,22 +155,37 @@ class PropertySerializer(serializers.ModelSerializer):
     
     def get_days_on_market(self, obj):
         from django.utils import timezone
-        return (timezone.now().date() - obj.listing_date).days
+        return (timezone.now().date() - obj.list_date).days
 
 class PropertyListSerializer(serializers.ModelSerializer):
     """Simplified serializer for property lists"""
     primary_image = serializers.SerializerMethodField()
     full_address = serializers.SerializerMethodField()
+    distance = serializers.SerializerMethodField()
     
     class Meta:
         model = Property
         fields = [
             'id', 'address', 'city', 'state', 'zip_code', 'full_address',
             'property_type', 'bedrooms', 'bathrooms', 'square_feet',
-            'list_price', 'status', 'primary_image', 'listing_date'
+            'list_price', 'status', 'primary_image', 'list_date',
+            'latitude', 'longitude', 'distance'
         ]
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Annotate the primary image path so a page resolves it in the same query"""
+        primary_images = PropertyImage.objects.filter(
+            property=OuterRef('pk'), is_primary=True
+        ).order_by('order', 'created_at').values('image')[:1]
+        return queryset.annotate(primary_image_name=Subquery(primary_images))
+    
     def get_primary_image(self, obj):
+        if hasattr(obj, 'primary_image_name'):
+            if obj.primary_image_name:
+                return PropertyImage._meta.get_field('image').storage.url(obj.primary_image_name)
+            return None
+        
         primary_image = obj.images.filter(is_primary=True).first()
         if primary_image:
             return primary_image.image.url
@@ -176,6 +193,11 @@ class PropertyListSerializer(serializers.ModelSerializer):
     
     def get_full_address(self, obj):
         return f"{obj.address}, {obj.city}, {obj.state} {obj.zip_code}"
+    
+    def get_distance(self, obj):
+        # Miles from the search point, present on radius searches
+        distance = getattr(obj, 'distance', None)
+        return round(distance, 2) if distance is not None else None
 
 # ============================================================================
 # ACTIVITY SERIALIZERS
@@ -223,8 +245,13 @@ class LeadSourceStatsSerializer(serializers.Serializer):
     """Lead source performance statistics"""
     source_name = serializers.CharField()
     lead_count = serializers.IntegerField()
+    qualified_lead_count = serializers.IntegerField()
     conversion_rate = serializers.FloatField()
     cost_per_lead = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    cost_per_qualified_lead = serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True)
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    roi = serializers.FloatField(allow_null=True)
 
 class MonthlyStatsSerializer(serializers.Serializer):
     """Monthly performance statistics"""
@@ -0,0 +1,279 @@
+# Revolution Realty - Model Signals
+# Keep denormalized data and caches in sync with the CRM and tenant tables
+
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .branding import invalidate_branding, warm_branding
+from .counters import record as record_counter
+from .lead_intake import invalidate_website_source
+from .lead_matching import MATCH_FIELDS, match_properties, refresh_leads
+from .lead_routing import ROUTING_ROLES, lead_load_changed
+from .models import Activity, Lead, LeadSource, Property, Task, Transaction
+from .quotas import adjust_usage, current_period, invalidate as invalidate_quota, invalidate_plan
+from .saas_models import AgentRoutingState, SubscriptionPlan, Tenant, TenantBranding, TenantUser
+from .stats import month_start, record_leads, refresh_monthly_performance
+from .tenant_cache import invalidate_hosts, tenant_hosts
+from .tenant_context import get_current_tenant_id
+
+# ============================================================================
+# TENANT ASSIGNMENT
+# ============================================================================
+
+@receiver(pre_save, sender=Lead)
+@receiver(pre_save, sender=Property)
+@receiver(pre_save, sender=Transaction)
+@receiver(pre_save, sender=Task)
+@receiver(pre_save, sender=Activity)
+def assign_current_tenant(sender, instance, **kwargs):
+    """New CRM records belong to the tenant of the request creating them"""
+    if instance.tenant_id is None:
+        instance.tenant_id = get_current_tenant_id()
+
+# ============================================================================
+# PROPERTY COUNTERS
+# ============================================================================
+
+@receiver(post_save, sender=Activity)
+def activity_saved_counters(sender, instance, created, **kwargs):
+    """Logged showings count toward the property's showing total"""
+    if created and instance.activity_type == 'showing' and instance.property_id:
+        record_counter(instance.property_id, 'showings')
+
+# ============================================================================
+# MONTHLY PERFORMANCE ROLLUP
+# ============================================================================
+
+@receiver(post_save, sender=Lead)
+def lead_saved_rollup(sender, instance, created, **kwargs):
+    """Count new leads into their month's rollup row"""
+    if created:
+        record_leads(instance.tenant_id, instance.created_at, 1)
+
+@receiver(post_delete, sender=Lead)
+def lead_deleted_rollup(sender, instance, **kwargs):
+    """Remove deleted leads from their month's rollup row"""
+    if getattr(instance, '_bulk_deleted', False):
+        return  # delete_leads() updates the rollup per month
+    record_leads(instance.tenant_id, instance.created_at, -1)
+
+@receiver(pre_save, sender=Transaction)
+def transaction_presave_rollup(sender, instance, **kwargs):
+    """Remember the month a closed commission was previously counted in"""
+    # updated_at still holds the stored value until auto_now runs
+    instance._rollup_months = {month_start(instance.updated_at)} if instance.updated_at else set()
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def transaction_changed_rollup(sender, instance, **kwargs):
+    """Recompute every month a transaction contributes to"""
+    months = set(getattr(instance, '_rollup_months', set()))
+    months.add(month_start(instance.created_at))
+    months.add(month_start(instance.updated_at))
+
+    tenant_id = instance.tenant_id
+
+    def refresh():
+        for month in months:
+            refresh_monthly_performance(tenant_id, month)
+
+    transaction.on_commit(refresh)
+
+# ============================================================================
+# TENANT HOST CACHE
+# ============================================================================
+
+@receiver(pre_save, sender=Tenant)
+def tenant_presave_hosts(sender, instance, **kwargs):
+    """Remember the routing fields a tenant was stored with"""
+    instance._stored_routing = Tenant.objects.filter(pk=instance.pk).values(
+        'domain', 'subdomain', 'status'
+    ).first() if not instance._state.adding else None
+
+@receiver(post_save, sender=Tenant)
+def tenant_saved_hosts(sender, instance, created, **kwargs):
+    """Drop cached host resolutions when a tenant's domains or status change"""
+    stored = getattr(instance, '_stored_routing', None)
+    current = {'domain': instance.domain, 'subdomain': instance.subdomain, 'status': instance.status}
+    if stored == current:
+        return
+
+    hosts = tenant_hosts(instance.domain, instance.subdomain)
+    if stored:
+        hosts += tenant_hosts(stored['domain'], stored['subdomain'])
+    transaction.on_commit(lambda: invalidate_hosts(set(hosts)))
+
+@receiver(post_delete, sender=Tenant)
+def tenant_deleted_hosts(sender, instance, **kwargs):
+    hosts = tenant_hosts(instance.domain, instance.subdomain)
+    transaction.on_commit(lambda: invalidate_hosts(set(hosts)))
+
+# ============================================================================
+# TENANT BRANDING CACHE
+# ============================================================================
+
+@receiver(post_save, sender=TenantBranding)
+def branding_saved_cache(sender, instance, **kwargs):
+    """Publish the new branding version once it is committed"""
+    transaction.on_commit(lambda: warm_branding(instance.tenant_id, instance))
+
+@receiver(post_delete, sender=TenantBranding)
+def branding_deleted_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_branding(instance.tenant_id))
+
+# ============================================================================
+# SUBSCRIPTION QUOTAS
+# ============================================================================
+
+def owning_tenant_id(instance):
+    """Tenant a record counts against: its own tenant, else the request's"""
+    return getattr(instance, 'tenant_id', None) or get_current_tenant_id()
+
+@receiver(post_save, sender=Lead)
+def lead_saved_quota(sender, instance, created, **kwargs):
+    tenant_id = owning_tenant_id(instance)
+    if created and tenant_id:
+        adjust_usage(tenant_id, 'leads', 1)
+
+@receiver(post_delete, sender=Lead)
+def lead_deleted_quota(sender, instance, **kwargs):
+    """Deleting a lead only frees capacity in the month it was created"""
+    if getattr(instance, '_bulk_deleted', False):
+        return  # delete_leads() adjusts usage per tenant
+    tenant_id = owning_tenant_id(instance)
+    if tenant_id and timezone.localdate(instance.created_at).replace(day=1) == current_period():
+        adjust_usage(tenant_id, 'leads', -1)
+
+@receiver(post_save, sender=Property)
+def property_saved_quota(sender, instance, created, **kwargs):
+    tenant_id = owning_tenant_id(instance)
+    if created and tenant_id:
+        adjust_usage(tenant_id, 'properties', 1)
+
+@receiver(post_delete, sender=Property)
+def property_deleted_quota(sender, instance, **kwargs):
+    tenant_id = owning_tenant_id(instance)
+    if tenant_id:
+        adjust_usage(tenant_id, 'properties', -1)
+
+def counts_as_agent(role, is_active):
+    """Only active members in a routing role use an agent seat"""
+    return is_active and role in ROUTING_ROLES
+
+@receiver(pre_save, sender=TenantUser)
+def tenant_user_presave_quota(sender, instance, **kwargs):
+    """Remember the role and active flag the membership was stored with"""
+    stored = TenantUser.objects.filter(pk=instance.pk).values(
+        'role', 'is_active'
+    ).first() if not instance._state.adding else None
+    instance._stored_seat = counts_as_agent(stored['role'], stored['is_active']) if stored else False
+    instance._stored_active = stored['is_active'] if stored else None
+
+@receiver(post_save, sender=TenantUser)
+def tenant_user_saved_quota(sender, instance, **kwargs):
+    """Take or free a seat when a membership becomes, or stops being, an active agent"""
+    seat = counts_as_agent(instance.role, instance.is_active)
+    if seat != getattr(instance, '_stored_seat', False):
+        adjust_usage(instance.tenant_id, 'agents', 1 if seat else -1)
+
+@receiver(post_delete, sender=TenantUser)
+def tenant_user_deleted_quota(sender, instance, **kwargs):
+    if counts_as_agent(instance.role, instance.is_active):
+        adjust_usage(instance.tenant_id, 'agents', -1)
+
+@receiver(post_save, sender=Tenant)
+def tenant_saved_quota(sender, instance, **kwargs):
+    """Status or plan changes invalidate the tenant's snapshot"""
+    transaction.on_commit(lambda: invalidate_quota(instance.pk))
+
+@receiver(post_save, sender=SubscriptionPlan)
+def plan_saved_quota(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_plan(instance.pk))
+
+# ============================================================================
+# LEAD SOURCE CACHE
+# ============================================================================
+
+@receiver(post_save, sender=LeadSource)
+@receiver(post_delete, sender=LeadSource)
+def lead_source_changed(sender, instance, **kwargs):
+    """Drop the cached Website source ID if that source is renamed or deleted"""
+    transaction.on_commit(invalidate_website_source)
+
+# ============================================================================
+# LEAD ROUTING LOAD
+# ============================================================================
+
+@receiver(pre_save, sender=Lead)
+def lead_presave_load(sender, instance, **kwargs):
+    """Remember the agent, status and saved preferences a lead was stored with"""
+    # Status is read once even though it is also a match field
+    fields = dict.fromkeys(('assigned_agent_id', 'status', *MATCH_FIELDS))
+    stored = Lead.all_objects.filter(pk=instance.pk).values(*fields).first() if not instance._state.adding else None
+    instance._stored_load = (stored['assigned_agent_id'], stored['status']) if stored else None
+    instance._stored_match = tuple(stored[field] for field in MATCH_FIELDS) if stored else None
+
+@receiver(post_save, sender=Lead)
+def lead_saved_load(sender, instance, **kwargs):
+    """Move the lead between agents' open-lead counters"""
+    before = getattr(instance, '_stored_load', None) or (None, None)
+    lead_load_changed(instance.tenant_id, before, (instance.assigned_agent_id, instance.status))
+
+@receiver(post_delete, sender=Lead)
+def lead_deleted_load(sender, instance, **kwargs):
+    if getattr(instance, '_bulk_deleted', False):
+        return  # delete_leads() recounts agent load per tenant
+    lead_load_changed(instance.tenant_id, (instance.assigned_agent_id, instance.status), (None, None))
+
+@receiver(post_save, sender=TenantUser)
+def tenant_user_saved_routing(sender, instance, **kwargs):
+    """
+    Agents join lead routing with their membership, leave it when deactivated
+    and rejoin when reactivated; other saves keep a manually set availability
+    """
+    if instance.role in ROUTING_ROLES:
+        state, created = AgentRoutingState.objects.get_or_create(
+            tenant_id=instance.tenant_id, agent_id=instance.user_id,
+            defaults={'is_available': instance.is_active},
+        )
+        activity_changed = getattr(instance, '_stored_active', None) not in (None, instance.is_active)
+        if not created and activity_changed and state.is_available != instance.is_active:
+            AgentRoutingState.objects.filter(pk=state.pk).update(is_available=instance.is_active)
+    else:
+        AgentRoutingState.objects.filter(tenant_id=instance.tenant_id, agent_id=instance.user_id).delete()
+
+@receiver(post_delete, sender=TenantUser)
+def tenant_user_deleted_routing(sender, instance, **kwargs):
+    AgentRoutingState.objects.filter(tenant_id=instance.tenant_id, agent_id=instance.user_id).delete()
+
+# ============================================================================
+# LISTING MATCHES
+# ============================================================================
+
+@receiver(post_save, sender=Lead)
+def lead_saved_match_index(sender, instance, created, **kwargs):
+    """Reindex a lead's saved preferences when they, or its status, change"""
+    if created and not instance.preferred_locations:
+        return
+    stored = getattr(instance, '_stored_match', None)
+    if created or stored != tuple(getattr(instance, field) for field in MATCH_FIELDS):
+        # Read back, as the instance can still hold unconverted form values
+        refresh_leads([instance.pk])
+
+@receiver(pre_save, sender=Property)
+def property_presave_match(sender, instance, **kwargs):
+    """Remember the price and status a listing was stored with"""
+    instance._stored_listing = Property.all_objects.filter(pk=instance.pk).values_list(
+        'list_price', 'status'
+    ).first() if not instance._state.adding else None
+
+@receiver(post_save, sender=Property)
+def property_saved_match(sender, instance, created, **kwargs):
+    """New, repriced and relisted listings are matched to leads once committed"""
+    if instance.status != 'active':
+        return
+    if created or getattr(instance, '_stored_listing', None) != (instance.list_price, instance.status):
+        pk = instance.pk
+        transaction.on_commit(lambda: match_properties(Property.all_objects.filter(pk=pk)))
@@ -0,0 +1,289 @@
+# Revolution Realty - Statistics Engine
+# Aggregate queries and rollups backing the analytics endpoints
+
+from datetime import datetime, time
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, Q, F, DecimalField, ExpressionWrapper
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Lead, LeadSource, Transaction, Property, Task, MonthlyPerformance
+from .tenant_context import get_current_tenant_id
+from .write_behind import WriteBehindBuffer
+
+# Lead statuses counted as qualified for conversion reporting
+QUALIFIED_LEAD_STATUSES = ['qualified', 'hot', 'appointment']
+
+# Dashboard is polled by the frontend; a short TTL absorbs the polling
+DASHBOARD_STATS_CACHE_TIMEOUT = 60
+
+# Buffered rollup increments are written at least this often (seconds) ...
+ROLLUP_FLUSH_INTERVAL = 10
+
+# ... or as soon as this many tenant/month rows have pending increments
+ROLLUP_MAX_PENDING = 200
+
+# ============================================================================
+# DASHBOARD STATISTICS
+# ============================================================================
+
+def lead_stats(today):
+    """Lead counters in a single aggregate query"""
+    return Lead.objects.aggregate(
+        total_leads=Count('id'),
+        new_leads_today=Count('id', filter=Q(created_at__date=today)),
+        hot_leads=Count('id', filter=Q(status='hot')),
+        qualified_leads=Count('id', filter=Q(status__in=QUALIFIED_LEAD_STATUSES)),
+    )
+
+def transaction_stats(this_month_start):
+    """Transaction counters and commission total in a single aggregate query"""
+    closed_this_month = Q(status='closed', updated_at__date__gte=this_month_start)
+    return Transaction.objects.aggregate(
+        total_transactions=Count('id'),
+        active_transactions=Count('id', filter=~Q(status__in=['closed', 'cancelled'])),
+        closed_transactions_this_month=Count('id', filter=closed_this_month),
+        total_commission_this_month=Sum('estimated_commission', filter=closed_this_month),
+    )
+
+def property_stats():
+    """Property counters in a single aggregate query"""
+    return Property.objects.aggregate(
+        total_properties=Count('id'),
+        active_listings=Count('id', filter=Q(status='active')),
+    )
+
+def task_stats(now):
+    """Task counters in a single aggregate query"""
+    return Task.objects.aggregate(
+        pending_tasks=Count('id', filter=Q(is_completed=False)),
+        overdue_tasks=Count('id', filter=Q(is_completed=False, due_date__lt=now)),
+    )
+
+def compute_dashboard_stats():
+    """Compute the dashboard payload with one query per table"""
+    now = timezone.now()
+    today = now.date()
+    this_month_start = today.replace(day=1)
+
+    stats = {}
+    stats.update(lead_stats(today))
+    stats.update(transaction_stats(this_month_start))
+    stats.update(property_stats())
+    stats.update(task_stats(now))
+
+    total_leads = stats['total_leads']
+    qualified_leads = stats.pop('qualified_leads')
+    conversion_rate = (qualified_leads / total_leads * 100) if total_leads > 0 else 0
+
+    stats['total_commission_this_month'] = stats['total_commission_this_month'] or 0
+    stats['conversion_rate'] = round(conversion_rate, 2)
+    return stats
+
+def get_dashboard_stats(use_cache=True):
+    """Get dashboard statistics, served from a short-lived snapshot when available"""
+    if not use_cache:
+        return compute_dashboard_stats()
+
+    # Querysets are scoped to the current tenant, so snapshots are too
+    tenant_id = get_current_tenant_id() or 'all'
+    cache_key = f"dashboard_stats:{tenant_id}:{timezone.now().date().isoformat()}"
+    stats = cache.get(cache_key)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(cache_key, stats, DASHBOARD_STATS_CACHE_TIMEOUT)
+    return stats
+
+# ============================================================================
+# LEAD SOURCE PERFORMANCE
+# ============================================================================
+
+def get_lead_source_performance(start_date=None, end_date=None):
+    """Per-source lead, conversion and spend figures in one grouped query"""
+    window = Q()
+    # Reverse joins bypass the scoped manager, so the tenant is filtered here
+    tenant_id = get_current_tenant_id()
+    if tenant_id:
+        window &= Q(lead__tenant_id=tenant_id)
+    if start_date:
+        window &= Q(lead__created_at__date__gte=start_date)
+    if end_date:
+        window &= Q(lead__created_at__date__lte=end_date)
+    qualified = window & Q(lead__status__in=QUALIFIED_LEAD_STATUSES)
+    closed = window & Q(lead__transaction__status='closed')
+
+    lead_count = Count('lead', filter=window, distinct=True)
+    sources = LeadSource.objects.annotate(
+        lead_count=lead_count,
+        qualified_lead_count=Count('lead', filter=qualified, distinct=True),
+        total_spend=ExpressionWrapper(
+            F('cost_per_lead') * lead_count,
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+        revenue=Sum('lead__transaction__estimated_commission', filter=closed),
+    ).filter(lead_count__gt=0).order_by('name').values(
+        'name', 'cost_per_lead', 'lead_count', 'qualified_lead_count', 'total_spend', 'revenue'
+    )
+
+    stats = []
+    for source in sources:
+        lead_count = source['lead_count']
+        qualified_leads = source['qualified_lead_count']
+        total_spend = source['total_spend'] or 0
+        revenue = source['revenue'] or 0
+
+        stats.append({
+            'source_name': source['name'],
+            'lead_count': lead_count,
+            'qualified_lead_count': qualified_leads,
+            'conversion_rate': round(qualified_leads / lead_count * 100, 2),
+            'cost_per_lead': source['cost_per_lead'],
+            'total_spend': total_spend,
+            'cost_per_qualified_lead': (total_spend / qualified_leads) if qualified_leads else None,
+            'revenue': revenue,
+            'roi': round(float((revenue - total_spend) / total_spend * 100), 2) if total_spend else None,
+        })
+    return stats
+
+# ============================================================================
+# MONTHLY PERFORMANCE ROLLUP
+# ============================================================================
+
+def month_start(value):
+    """First day of the month containing a date or datetime"""
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+def add_months(month, count):
+    """Shift a first-of-month date by a number of months"""
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+def month_bounds(month):
+    """Aware datetime range [start, end) covering a month"""
+    start = timezone.make_aware(datetime.combine(month, time.min))
+    end = timezone.make_aware(datetime.combine(add_months(month, 1), time.min))
+    return start, end
+
+def apply_monthly_performance(tenant_id, month, **deltas):
+    """Add counter deltas to a tenant's rollup row for a month, creating it if needed"""
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if MonthlyPerformance.all_objects.filter(tenant_id=tenant_id, month=month).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            MonthlyPerformance.all_objects.create(tenant_id=tenant_id, month=month, **deltas)
+    except IntegrityError:
+        # Another worker created the row first
+        MonthlyPerformance.all_objects.filter(tenant_id=tenant_id, month=month).update(**updates)
+
+def write_rollup(items):
+    for (tenant_id, month), leads in items:
+        apply_monthly_performance(tenant_id, month, leads=leads)
+
+# Every lead insert and delete touches its tenant's current-month row, so
+# writing through would serialize lead writes on that row
+rollup_buffer = WriteBehindBuffer('monthly rollup', write_rollup, ROLLUP_FLUSH_INTERVAL, ROLLUP_MAX_PENDING)
+
+def record_leads(tenant_id, created_at, count):
+    """Count leads into (or, negative, out of) their month once the caller's transaction commits"""
+    month = month_start(created_at)
+    transaction.on_commit(lambda: rollup_buffer.add((tenant_id, month), count))
+
+def refresh_monthly_performance(tenant_id, month):
+    """
+    Recompute a tenant's transaction figures for a month from the source
+    tables; lead counts are maintained by record_leads()
+    """
+    month = month_start(month)
+    start, end = month_bounds(month)
+    created_in_month = Q(created_at__gte=start, created_at__lt=end)
+    closed_in_month = Q(status='closed', updated_at__gte=start, updated_at__lt=end)
+
+    # Signals run outside the request's tenant context, so the tenant is explicit
+    totals = Transaction.all_objects.filter(created_in_month | closed_in_month, tenant_id=tenant_id).aggregate(
+        transactions=Count('id', filter=created_in_month),
+        commission=Sum('estimated_commission', filter=closed_in_month),
+    )
+
+    row, created = MonthlyPerformance.all_objects.update_or_create(
+        tenant_id=tenant_id,
+        month=month,
+        defaults={
+            'transactions': totals['transactions'],
+            'commission': totals['commission'] or 0,
+        }
+    )
+    return row
+
+def backfill_monthly_performance(since=None):
+    """Rebuild every tenant's rollup rows from full history with one grouped query per metric"""
+    rollup_buffer.flush()
+    leads = Lead.all_objects.all()
+    transactions = Transaction.all_objects.all()
+    closed = Transaction.all_objects.filter(status='closed')
+    if since:
+        start, _ = month_bounds(month_start(since))
+        leads = leads.filter(created_at__gte=start)
+        transactions = transactions.filter(created_at__gte=start)
+        closed = closed.filter(updated_at__gte=start)
+
+    rows = {}
+
+    def row_for(entry):
+        key = (entry['tenant_id'], month_start(entry['period']))
+        if key not in rows:
+            rows[key] = MonthlyPerformance(tenant_id=key[0], month=key[1], leads=0, transactions=0, commission=0)
+        return rows[key]
+
+    def monthly(queryset, field, total):
+        return (
+            queryset.annotate(period=TruncMonth(field)).order_by()
+            .values('tenant_id', 'period').annotate(total=total)
+        )
+
+    for entry in monthly(leads, 'created_at', Count('id')):
+        row_for(entry).leads = entry['total']
+
+    for entry in monthly(transactions, 'created_at', Count('id')):
+        row_for(entry).transactions = entry['total']
+
+    for entry in monthly(closed, 'updated_at', Sum('estimated_commission')):
+        row_for(entry).commission = entry['total'] or 0
+
+    # Rows are replaced rather than upserted: tenant-less rows never conflict on (tenant, month)
+    stale = MonthlyPerformance.all_objects.all()
+    if since:
+        stale = stale.filter(month__gte=month_start(since))
+    with transaction.atomic():
+        stale.delete()
+        MonthlyPerformance.all_objects.bulk_create(rows.values())
+    return len(rows)
+
+def get_monthly_performance(months=12):
+    """Monthly series for the trailing window, read with one range scan"""
+    current = month_start(timezone.now().date())
+    first = add_months(current, -months)
+    # Scoped to the current tenant; platform-wide requests sum every tenant's rows
+    rows = {
+        row['month']: row
+        for row in MonthlyPerformance.objects.filter(month__gte=first, month__lte=current)
+        .order_by().values('month').annotate(
+            leads=Sum('leads'), transactions=Sum('transactions'), commission=Sum('commission')
+        )
+    }
+
+    series = []
+    month = first
+    while month <= current:
+        row = rows.get(month, {})
+        series.append({
+            'month': month.strftime('%Y-%m'),
+            'leads': row.get('leads', 0),
+            'transactions': row.get('transactions', 0),
+            'commission': row.get('commission', 0),
+        })
+        month = add_months(month, 1)
+    return series
@@ -0,0 +1,140 @@
+# Revolution Realty - Tenant Resolution Cache
+# Two-tier host -> tenant ID cache (in-process LRU, then the shared cache)
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .saas_models import Tenant
+
+PLATFORM_DOMAIN = '.revolutionrealty.com'
+
+# Development hosts resolve to the first active tenant
+DEV_HOSTS = ['localhost', '127.0.0.1', 'revolutionmvpmigrated-production.up.railway.app']
+
+# In-process entries expire so other workers pick up invalidations quickly
+LOCAL_CACHE_SIZE = 1024
+LOCAL_CACHE_TTL = 60
+
+# Shared cache entries; unknown hosts are remembered for less time
+SHARED_CACHE_TTL = 300
+NEGATIVE_CACHE_TTL = 60
+
+# Cached value for hosts that belong to no active tenant
+NO_TENANT = ''
+
+# ============================================================================
+# IN-PROCESS LRU
+# ============================================================================
+
+class HostLRUCache:
+    """Thread-safe LRU map with per-entry expiry"""
+
+    def __init__(self, maxsize=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, host):
+        """Cached value for a host, or None when missing or expired"""
+        with self.lock:
+            entry = self.entries.get(host)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[host]
+                return None
+            self.entries.move_to_end(host)
+            return value
+
+    def set(self, host, value, ttl=None):
+        with self.lock:
+            self.entries[host] = (value, time.monotonic() + (ttl or self.ttl))
+            self.entries.move_to_end(host)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, host):
+        with self.lock:
+            self.entries.pop(host, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+_local_cache = HostLRUCache()
+
+# ============================================================================
+# RESOLUTION
+# ============================================================================
+
+def cache_key(host):
+    return f"tenant_id:{host}"
+
+def lookup_tenant_id(host):
+    """
+    Resolve a host to an active tenant's ID from the database
+    Priority:
+    1. Custom domain (e.g., johnsmithrealty.com)
+    2. Subdomain (e.g., johnsmith.revolutionrealty.com)
+    """
+    active = Tenant.objects.filter(status='active')
+
+    tenant_id = active.filter(domain=host).values_list('id', flat=True).first()
+    if tenant_id:
+        return tenant_id
+
+    if host.endswith(PLATFORM_DOMAIN):
+        subdomain = host[:-len(PLATFORM_DOMAIN)]
+        tenant_id = active.filter(subdomain=subdomain).values_list('id', flat=True).first()
+        if tenant_id:
+            return tenant_id
+
+    if host in DEV_HOSTS:
+        return active.order_by('name').values_list('id', flat=True).first()
+
+    return None
+
+def get_tenant_id(host):
+    """Active tenant ID for a host, or None; cached in-process, then in the shared cache"""
+    value = _local_cache.get(host)
+    if value is None:
+        value = cache.get(cache_key(host))
+        if value is None:
+            tenant_id = lookup_tenant_id(host)
+            value = str(tenant_id) if tenant_id else NO_TENANT
+            cache.set(cache_key(host), value, SHARED_CACHE_TTL if value else NEGATIVE_CACHE_TTL)
+        _local_cache.set(host, value, None if value else NEGATIVE_CACHE_TTL)
+    return value or None
+
+async def aget_tenant_id(host):
+    """Async get_tenant_id; only a full miss leaves the event loop"""
+    value = _local_cache.get(host)
+    if value is None:
+        value = await cache.aget(cache_key(host))
+        if value is None:
+            tenant_id = await sync_to_async(lookup_tenant_id)(host)
+            value = str(tenant_id) if tenant_id else NO_TENANT
+            await cache.aset(cache_key(host), value, SHARED_CACHE_TTL if value else NEGATIVE_CACHE_TTL)
+        _local_cache.set(host, value, None if value else NEGATIVE_CACHE_TTL)
+    return value or None
+
+def tenant_hosts(domain, subdomain):
+    """Hosts whose resolution depends on a tenant's domain and subdomain"""
+    hosts = list(DEV_HOSTS)
+    if domain:
+        hosts.append(domain.lower())
+    if subdomain:
+        hosts.append(f"{subdomain.lower()}{PLATFORM_DOMAIN}")
+    return hosts
+
+def invalidate_hosts(hosts):
+    """Drop cached resolutions for hosts in this process and the shared cache"""
+    for host in hosts:
+        _local_cache.delete(host)
+    cache.delete_many([cache_key(host) for host in hosts])
@@ -0,0 +1,27 @@
+# Revolution Realty - Tenant Context
+# Current-tenant state shared by the middleware, managers and signals
+
+from contextvars import ContextVar
+
+# Context variables follow the request across threads (WSGI) and tasks (ASGI),
+# including sync_to_async/async_to_sync hops, without leaking between requests
+_current_tenant = ContextVar('current_tenant', default=None)
+_current_tenant_id = ContextVar('current_tenant_id', default=None)
+
+def get_current_tenant():
+    """Get the current tenant from the request context"""
+    return _current_tenant.get()
+
+def get_current_tenant_id():
+    """Get the current tenant's ID without loading the tenant"""
+    return _current_tenant_id.get()
+
+def set_current_tenant(tenant, tenant_id=None):
+    """Set the current tenant in the request context"""
+    _current_tenant.set(tenant)
+    _current_tenant_id.set(tenant_id or (tenant.pk if tenant is not None else None))
+
+def clear_current_tenant():
+    """Clear the current tenant from the request context"""
+    _current_tenant.set(None)
+    _current_tenant_id.set(None)
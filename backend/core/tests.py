@@ -1,3 +1,1171 @@
-from django.test import TestCase
+from unittest import mock, skipUnless
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import uuid
 
-# Create your tests here.
+from datetime import date, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .api_views import api_leads, api_properties, api_tasks, api_update_lead
+from .branding import version_key
+from .counters import counter_buffer
+from .geo import MAX_COVERING_CELLS, covering_cells, encode_geohash
+from .idx_sync import FeedSync
+from .lead_dedup import dedupe_leads
+from .lead_identity import normalize_email, normalize_phone
+from .lead_intake import SYSTEM_USER_ID, drain, invalidate_website_source
+from .lead_matching import ANY_PRICE_BAND, MATCH_RECORD_FIELDS, insert_rows, lead_price_bands
+from .lead_routing import recount_agent_load
+from .lead_scoring import ScoringWeights, run_scoring
+from .middleware import TenantMiddleware
+from .models import (
+    Lead, LeadMatchKey, LeadSource, LeadSubmission, LeadTag, Transaction, Task, TaskBoard, TaskList, Property,
+    PropertyImage, PropertyMatch, Activity
+)
+from .saas_models import (
+    AgentRoutingState, Integration, LeadRoutingConfig, LeadScoringProfile, SubscriptionPlan, Tenant,
+    TenantIntegration, TenantUser
+)
+from .property_import import MAX_REPORTED_ERRORS, PropertyImporter, detect_format
+from .quotas import adjust_usage, cache_key, current_period, get_snapshot, has_capacity
+from .search import search_properties
+from .stats import add_months, backfill_monthly_performance, get_monthly_performance, rollup_buffer
+from .tenant_cache import (
+    NO_TENANT, HostLRUCache, _local_cache, cache_key as tenant_cache_key, get_tenant_id, invalidate_hosts, tenant_hosts
+)
+from .tenant_context import get_current_tenant_id, set_current_tenant
+from .views import (
+    LeadViewSet, TransactionViewSet, TaskViewSet, ActivityViewSet, PropertyViewSet,
+    branding_css, capture_lead, property_search
+)
+
+def create_tenant(owner, slug='smith', **fields):
+    """A tenant on the shared Pro plan, at <slug>.test and <slug>.revolutionrealty.com"""
+    plan, _ = SubscriptionPlan.objects.get_or_create(
+        name='Pro', defaults=dict(plan_type='professional', description='', monthly_price=99)
+    )
+    fields = dict(dict(
+        name=f'{slug.title()} Realty', slug=slug, domain=f'{slug}.test', subdomain=slug,
+        owner=owner, contact_email=f'broker@{slug}.test', subscription_plan=plan
+    ), **fields)
+    return Tenant.objects.create(**fields)
+
+# ============================================================================
+# QUERY PLAN TESTS
+# ============================================================================
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN parsing supports SQLite and PostgreSQL')
+class ListEndpointIndexTests(TestCase):
+    """Every filtered list endpoint should be answered from an index"""
+
+    def list_queryset(self, viewset_class, params):
+        request = Request(APIRequestFactory().get('/', params))
+        view = viewset_class(request=request, action='list', format_kwarg=None, kwargs={})
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset):
+        table = queryset.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+        else:
+            plan = queryset.explain()
+            for line in plan.splitlines():
+                if f' {table}' in line and 'SCAN' in line:
+                    self.assertIn('INDEX', line, plan)
+
+    def test_lead_list(self):
+        for params in [{}, {'status': 'hot'}, {'lead_type': 'seller'}, {'assigned_agent': 1}]:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.list_queryset(LeadViewSet, params))
+
+    def test_task_list(self):
+        for params in [{}, {'assigned_to': 1}, {'is_completed': 'false'},
+                       {'is_completed': 'false', 'priority': 'high'}]:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.list_queryset(TaskViewSet, params))
+
+    def test_open_tasks_by_due_date(self):
+        self.assertUsesIndex(Task.objects.filter(is_completed=False, due_date__lt=timezone.now()))
+
+    def test_activity_list(self):
+        for params in [{}, {'lead_id': uuid.uuid4()}, {'transaction_id': uuid.uuid4()},
+                       {'activity_type': 'call'}]:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.list_queryset(ActivityViewSet, params))
+
+    def test_property_list(self):
+        for params in [{}, {'status': 'active'}, {'status': 'active', 'property_type': 'condo'},
+                       {'status': 'active', 'min_price': 100000, 'max_price': 500000},
+                       {'status': 'active', 'bedrooms': 3}]:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.list_queryset(PropertyViewSet, params))
+
+# ============================================================================
+# QUERY COUNT TESTS
+# ============================================================================
+
+class ListEndpointQueryCountTests(TestCase):
+    """List pages should cost the same number of queries regardless of size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user('agent', first_name='Alex', last_name='Agent')
+        cls.source = LeadSource.objects.create(name='Zillow')
+        board = TaskBoard.objects.create(name='Pipeline', created_by=cls.agent)
+        cls.task_list = TaskList.objects.create(board=board, name='To Do')
+
+    def create_lead(self):
+        return Lead.objects.create(
+            first_name='Pat', last_name='Buyer', email='pat@example.com',
+            source=self.source, assigned_agent=self.agent
+        )
+
+    def create_property(self):
+        return Property.objects.create(
+            address='1 Main St', city='Austin', state='TX', zip_code='78701',
+            property_type='condo', bedrooms=2, bathrooms=2, list_price=350000,
+            list_date=date.today(), listing_agent=self.agent
+        )
+
+    def create_transaction(self):
+        return Transaction.objects.create(
+            transaction_type='buyer', property=self.create_property(), lead=self.create_lead(),
+            listing_agent=self.agent, buyer_agent=self.agent, sale_price=350000
+        )
+
+    def create_task(self):
+        return Task.objects.create(
+            task_list=self.task_list, title='Follow up', assigned_to=self.agent,
+            created_by=self.agent, lead=self.create_lead()
+        )
+
+    def create_activity(self):
+        return Activity.objects.create(
+            activity_type='call', subject='Intro call', lead=self.create_lead(),
+            property=self.create_property(), created_by=self.agent
+        )
+
+    def create_listing(self):
+        listing = self.create_property()
+        PropertyImage.objects.create(property=listing, image='property_images/front.jpg', is_primary=True)
+        PropertyImage.objects.create(property=listing, image='property_images/kitchen.jpg')
+        return listing
+
+    def count_list_queries(self, viewset_class):
+        view = viewset_class.as_view({'get': 'list'})
+        return self.count_view_queries(view)
+
+    def count_view_queries(self, view):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.agent)
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, viewset_class, create_row):
+        for _ in range(2):
+            create_row()
+        small_page = self.count_list_queries(viewset_class)
+        for _ in range(8):
+            create_row()
+        full_page = self.count_list_queries(viewset_class)
+        self.assertEqual(small_page, full_page)
+
+    def test_lead_list(self):
+        self.assertConstantQueries(LeadViewSet, self.create_lead)
+
+    def test_transaction_list(self):
+        self.assertConstantQueries(TransactionViewSet, self.create_transaction)
+
+    def test_task_list(self):
+        self.assertConstantQueries(TaskViewSet, self.create_task)
+
+    def test_activity_list(self):
+        self.assertConstantQueries(ActivityViewSet, self.create_activity)
+
+    def test_property_list(self):
+        self.assertConstantQueries(PropertyViewSet, self.create_listing)
+
+    def test_property_search(self):
+        for _ in range(10):
+            self.create_listing()
+        # One count and one page query, primary images included
+        self.assertEqual(self.count_view_queries(property_search), 2)
+
+# ============================================================================
+# KEYSET PAGINATION TESTS
+# ============================================================================
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user('agent')
+        for n in range(5):
+            lead = Lead.objects.create(first_name='Pat', last_name=f'Buyer {n}', email=f'pat{n}@example.com')
+            Activity.objects.create(activity_type='call', subject='Intro call', lead=lead, created_by=cls.agent)
+
+    def get(self, viewset_class, params):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=self.agent)
+        return viewset_class.as_view({'get': 'list'})(request)
+
+    def cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+
+    def test_cursor_pages_walk_every_row_once(self):
+        ids, params = [], {'cursor': '', 'page_size': 2, 'count': 'exact'}
+        while True:
+            response = self.get(LeadViewSet, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['count'], 5)
+            ids += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            params['cursor'] = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        expected = [str(pk) for pk in Lead.objects.order_by('-created_at', '-id').values_list('pk', flat=True)]
+        self.assertEqual(ids, expected)
+
+    def test_malformed_cursors_are_not_found(self):
+        valid = {'created_at': timezone.now().isoformat(), 'id': str(uuid.uuid4())}
+        for position in ({'created_at': 'garbage', 'id': valid['id']}, {'created_at': [1], 'id': valid['id']},
+                         {'created_at': valid['created_at'], 'id': 'not-a-uuid'},
+                         {'created_at': None, 'id': valid['id']}, {'id': valid['id']}, [1]):
+            for viewset_class in (LeadViewSet, ActivityViewSet):
+                with self.subTest(position=position, viewset=viewset_class.__name__):
+                    response = self.get(viewset_class, {'cursor': self.cursor(position)})
+                    self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.get(LeadViewSet, {'cursor': 'not base64!'}).status_code, 404)
+        self.assertEqual(self.get(LeadViewSet, {'cursor': self.cursor(valid)}).status_code, 200)
+
+# ============================================================================
+# FULL-TEXT SEARCH TESTS
+# ============================================================================
+
+class PropertySearchTests(TestCase):
+    def setUp(self):
+        # Test databases built without migrations lack the index, so 0005's SQLite schema is applied here
+        if connection.vendor == 'sqlite' and 'core_property_fts' not in connection.introspection.table_names():
+            search_index = import_module('core.migrations.0005_property_search_index')
+            with connection.cursor() as cursor:
+                for statement in search_index.SQLITE_FORWARD:
+                    cursor.execute(statement)
+        self.agent = User.objects.create_user('agent')
+        self.oak = self.listing('12 Oak Lane', 'Austin', 'Craftsman near Zilker park')
+        self.maple = self.listing('48 Maple Ave', 'Round Rock', 'Oak floors, oak cabinets and an oak-shaded yard')
+        self.cedar = self.listing('3 Cedar Ct', 'Austin', 'Lake views')
+
+    def listing(self, address, city, description):
+        return Property.objects.create(
+            address=address, city=city, state='TX', zip_code='78701', description=description,
+            property_type='house', bedrooms=3, bathrooms=2, list_price=450000,
+            list_date=date.today(), listing_agent=self.agent
+        )
+
+    def search(self, query):
+        return list(search_properties(Property.objects.all(), query).order_by('-search_rank', 'address'))
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 index is SQLite-specific')
+    def test_fts_triggers_follow_inserts_updates_and_deletes(self):
+        self.assertEqual(self.search('zilker'), [self.oak])
+        self.oak.description = 'Close to Barton Springs'
+        self.oak.save()
+        self.assertEqual(self.search('zilker'), [])
+        self.assertEqual(self.search('barton springs'), [self.oak])
+        self.oak.delete()
+        self.assertEqual(self.search('barton'), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 index is SQLite-specific')
+    def test_last_token_is_a_prefix_and_rank_orders_results(self):
+        self.assertEqual(set(self.search('aus')), {self.oak, self.cedar})
+        self.assertEqual(self.search('austin ced'), [self.cedar])
+        self.assertEqual(self.search('"; DROP TABLE core_property --'), [])
+        # Three mentions of oak outrank one in the address
+        self.assertEqual(self.search('oak'), [self.maple, self.oak])
+
+    def test_substring_fallback_without_a_search_index(self):
+        with mock.patch('core.search.connection', vendor='mysql'):
+            self.assertEqual(self.search('ma round'), [self.maple])
+            self.assertEqual(self.search('lake austin'), [self.cedar])
+            self.assertEqual({row.search_rank for row in self.search('78701')}, {0})
+
+# ============================================================================
+# MAP SEARCH TESTS
+# ============================================================================
+
+class MapSearchTests(TestCase):
+    def create_listing(self, address, latitude, longitude):
+        return Property.objects.create(
+            address=address, city='Austin', state='TX', zip_code='78701', property_type='condo',
+            bedrooms=2, bathrooms=2, list_price=350000, list_date=date.today(),
+            latitude=latitude, longitude=longitude
+        )
+
+    def search(self, params):
+        return property_search(APIRequestFactory().get('/', params))
+
+    def test_geohash_cells_cover_the_box(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744), 'u4pruydqq')
+        cells = covering_cells(30.2, -97.8, 30.3, -97.7)
+        self.assertLessEqual(len(cells), MAX_COVERING_CELLS)
+        for latitude, longitude in ((30.2, -97.8), (30.25, -97.75), (30.3, -97.7)):
+            geohash = encode_geohash(latitude, longitude)
+            self.assertTrue(any(geohash.startswith(cell) for cell in cells), geohash)
+
+    def test_bbox_and_radius_searches(self):
+        self.create_listing('Downtown', 30.2672, -97.7431)
+        self.create_listing('Round Rock', 30.5083, -97.6789)
+        data = self.search({'bbox': '-97.8,30.2,-97.7,30.3'}).data
+        self.assertEqual([row['address'] for row in data['results']], ['Downtown'])
+        data = self.search({'lat': 30.27, 'lng': -97.74, 'radius': 5}).data
+        self.assertEqual([row['address'] for row in data['results']], ['Downtown'])
+
+    def test_malformed_map_parameters_are_rejected(self):
+        for params in (
+            {'bbox': '-1e20,-1e20,1e20,1e20'}, {'bbox': '0,0,1,inf'}, {'bbox': '0,0,nan,1'},
+            {'bbox': '-97.7,30.2,-97.8,30.3'}, {'bbox': '1,2,3'},
+            {'lat': 91, 'lng': 0, 'radius': 5}, {'lat': 30, 'lng': -97, 'radius': 1e9},
+            {'lat': 30, 'lng': -97, 'radius': -1},
+        ):
+            self.assertEqual(self.search(params).status_code, 400, params)
+
+# ============================================================================
+# PROPERTY IMPORT TESTS
+# ============================================================================
+
+class PropertyImportTests(TestCase):
+    CSV_HEADER = 'MLS,Address,City,State,Zip,PropertyType,Beds,Baths,Price,Status,SqFt\n'
+
+    def setUp(self):
+        self.tenant = create_tenant(User.objects.create_user('broker'))
+
+    def run_import(self, content, file_format, **kwargs):
+        importer = PropertyImporter(tenant_id=self.tenant.pk, **kwargs)
+        return importer.run(BytesIO(content.encode('utf-8')), file_format)
+
+    def csv_row(self, number, price, property_type='Condominium', status='Active'):
+        return f'MLS{number},{number} Main St,Austin,TX,78701,{property_type},2,1.5,"{price}",{status},1000\n'
+
+    def test_detect_format(self):
+        for filename, file_format in (('feed.CSV', 'csv'), ('feed.ndjson', 'jsonl'), ('feed.json', 'jsonl'),
+                                      ('reso.xml', 'xml'), ('feed.xlsx', None)):
+            self.assertEqual(detect_format(filename), file_format, filename)
+        with self.assertRaises(ValueError):
+            self.run_import('', 'xlsx')
+
+    def test_csv_rows_are_validated_and_upserted(self):
+        content = self.CSV_HEADER + ''.join([
+            self.csv_row(1, '$350,000'),
+            self.csv_row(2, 'call'),
+            self.csv_row(3, '300000', property_type='Castle'),
+            self.csv_row(4, '300000', status='Under Contract'),
+            self.csv_row(1, '340000'),
+        ])
+        report = self.run_import(content, 'csv', batch_size=2)
+        # MLS1 is written by both batches, the later row winning
+        self.assertEqual((report['rows'], report['imported'], report['error_count']), (5, 3, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3])
+        self.assertEqual(Property.objects.count(), 2)
+
+        listing = Property.objects.get(mls_number='MLS1')
+        self.assertEqual((listing.list_price, listing.property_type, listing.price_per_sqft), (340000, 'condo', 340))
+        self.assertEqual(Property.objects.get(mls_number='MLS4').status, 'pending')
+
+        # A reimport updates listings in place
+        self.run_import(self.CSV_HEADER + self.csv_row(1, '330000'), 'csv')
+        self.assertEqual(Property.objects.filter(mls_number='MLS1').get().list_price, 330000)
+
+    def test_xml_listings_are_read_from_nested_namespaced_elements(self):
+        content = '''<?xml version="1.0"?>
+            <Listings xmlns="http://www.reso.org/2024">
+              <Listing>
+                <ListingId>MLS7</ListingId><UnparsedAddress>7 Oak Ln</UnparsedAddress>
+                <Location><City>Austin</City><StateOrProvince>TX</StateOrProvince><PostalCode>78704</PostalCode></Location>
+                <PropertyType>Single Family Residence</PropertyType><BedroomsTotal>3</BedroomsTotal>
+                <BathroomsTotalDecimal>2</BathroomsTotalDecimal><ListPrice>525000</ListPrice>
+                <StandardStatus>Closed</StandardStatus><ListingContractDate>09/15/2026</ListingContractDate>
+              </Listing>
+              <Listing><ListingId>MLS8</ListingId></Listing>
+            </Listings>'''
+        report = self.run_import(content, 'xml')
+        self.assertEqual((report['rows'], report['imported'], report['error_count']), (2, 1, 1))
+        listing = Property.objects.get(mls_number='MLS7')
+        self.assertEqual((listing.city, listing.zip_code, listing.status), ('Austin', '78704', 'sold'))
+        self.assertEqual(listing.list_date, date(2026, 9, 15))
+
+        report = self.run_import('<Listings><Listing><ListingId>MLS9', 'xml')
+        self.assertEqual((report['imported'], report['error_count']), (0, 1))
+        self.assertIn('Unreadable file', report['errors'][0]['error'])
+
+    def test_reported_errors_are_capped_but_all_counted(self):
+        content = self.CSV_HEADER + ''.join(self.csv_row(n, 'unknown') for n in range(MAX_REPORTED_ERRORS + 5))
+        report = self.run_import(content, 'csv')
+        self.assertEqual(report['error_count'], MAX_REPORTED_ERRORS + 5)
+        self.assertEqual(len(report['errors']), MAX_REPORTED_ERRORS)
+        self.assertEqual(report['errors'][-1]['row'], MAX_REPORTED_ERRORS)
+
+# ============================================================================
+# IDX FEED SYNC TESTS
+# ============================================================================
+
+class FeedSyncTests(TestCase):
+    """Incremental feed sync against a local JSON-lines feed"""
+
+    def setUp(self):
+        tenant = create_tenant(User.objects.create_user('broker'))
+        integration = Integration.objects.create(name='MLS', description='', provider='MLS', integration_type='mls')
+        handle, self.feed_path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        self.addCleanup(os.remove, self.feed_path)
+        self.feed = TenantIntegration.objects.create(
+            tenant=tenant, integration=integration,
+            configuration={'adapter': 'local_file', 'path': self.feed_path}
+        )
+
+    def write_feed(self, listings):
+        with open(self.feed_path, 'w') as feed:
+            for listing in listings:
+                feed.write(json.dumps(listing) + '\n')
+
+    def listing(self, number, price, modified):
+        return {
+            'ListingId': f'MLS{number}', 'UnparsedAddress': f'{number} Main St', 'City': 'Austin',
+            'StateOrProvince': 'TX', 'PostalCode': '78701', 'PropertyType': 'Residential',
+            'BedroomsTotal': 3, 'BathroomsTotalDecimal': 2, 'ListPrice': price,
+            'StandardStatus': 'Active', 'ModificationTimestamp': modified,
+        }
+
+    def sync(self):
+        self.feed.refresh_from_db()
+        return FeedSync(self.feed).run()
+
+    def test_initial_sync_imports_everything(self):
+        self.write_feed([self.listing(n, 400000, '2026-10-01T10:00:00Z') for n in range(3)])
+        run = self.sync()
+        self.assertEqual((run.status, run.fetched, run.created, run.updated), ('success', 3, 3, 0))
+        self.assertEqual(Property.objects.count(), 3)
+        self.feed.refresh_from_db()
+        self.assertEqual(self.feed.sync_status, 'success')
+        self.assertEqual(self.feed.last_sync.isoformat(), '2026-10-01T10:00:00+00:00')
+
+    def test_incremental_sync_skips_old_and_unchanged_rows(self):
+        self.write_feed([self.listing(n, 400000, '2026-10-01T10:00:00Z') for n in range(3)])
+        self.sync()
+        self.write_feed([
+            self.listing(0, 400000, '2026-09-01T10:00:00Z'),  # older than last_sync
+            self.listing(1, 400000, '2026-10-01T10:00:00Z'),  # at the watermark, unchanged
+            self.listing(2, 375000, '2026-10-02T09:00:00Z'),  # price change
+        ])
+        run = self.sync()
+        self.assertEqual((run.fetched, run.created, run.updated, run.unchanged), (2, 0, 1, 1))
+        self.assertEqual(Property.objects.get(mls_number='MLS2').list_price, 375000)
+
+    def test_sync_ignores_other_tenants_listings(self):
+        tenant = self.feed.tenant
+        other = create_tenant(tenant.owner, 'jones')
+        Property.all_objects.create(
+            tenant=other, mls_number='MLS1', address='1 Elm St', city='Dallas', state='TX', zip_code='75201',
+            property_type='condo', bedrooms=2, bathrooms=1, list_price=250000, list_date='2026-09-01'
+        )
+        self.write_feed([self.listing(1, 400000, '2026-10-01T10:00:00Z')])
+        run = self.sync()
+        self.assertEqual((run.created, run.updated), (1, 0))
+        self.assertEqual(Property.all_objects.get(tenant=other, mls_number='MLS1').list_price, 250000)
+
+    def test_non_finite_and_out_of_range_numbers_are_row_errors(self):
+        rows = [self.listing(n, price, '2026-10-01T10:00:00Z') for n, price in enumerate(('NaN', 'Infinity', 10 ** 12))]
+        rows.append(dict(self.listing(3, 400000, '2026-10-01T10:00:00Z'), BedroomsTotal=10 ** 20))
+        rows.append(self.listing(4, 400000, '2026-10-01T10:00:00Z'))
+        self.write_feed(rows)
+        run = self.sync()
+        self.assertEqual((run.created, run.error_count), (1, 4))
+        self.assertEqual([error['row'] for error in run.errors], [1, 2, 3, 4])
+
+    def test_row_errors_are_recorded(self):
+        bad = self.listing(9, 400000, '2026-10-01T10:00:00Z')
+        del bad['City']
+        self.write_feed([self.listing(1, 400000, '2026-10-01T10:00:00Z'), bad])
+        run = self.sync()
+        self.assertEqual((run.status, run.created, run.error_count), ('success', 1, 1))
+        self.assertEqual(run.errors[0]['row'], 2)
+
+# ============================================================================
+# MONTHLY ROLLUP TESTS
+# ============================================================================
+
+class MonthlyPerformanceTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('broker')
+        self.tenants = [create_tenant(owner, slug) for slug in ('smith', 'jones')]
+        self.addCleanup(set_current_tenant, None, None)
+
+    def current_leads(self, tenant=None):
+        set_current_tenant(None, tenant.pk if tenant else None)
+        return get_monthly_performance(months=1)[-1]['leads']
+
+    def test_rollup_is_kept_per_tenant(self):
+        smith, jones = self.tenants
+        with self.captureOnCommitCallbacks(execute=True):
+            for n, tenant in enumerate([smith, smith, jones]):
+                Lead.objects.create(first_name='Pat', last_name=str(n), email=f'pat{n}@example.com', tenant=tenant)
+        rollup_buffer.flush()
+        self.assertEqual((self.current_leads(smith), self.current_leads(jones), self.current_leads()), (2, 1, 3))
+
+        backfill_monthly_performance()
+        self.assertEqual((self.current_leads(smith), self.current_leads(jones), self.current_leads()), (2, 1, 3))
+
+# ============================================================================
+# CRM API TESTS
+# ============================================================================
+
+class CRMApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user('agent')
+        source = LeadSource.objects.create(name='Zillow')
+        for n in range(12):
+            Lead.objects.create(
+                first_name='Sarah', last_name=f'Johnson {n}', email=f'sarah{n}@example.com',
+                status='hot' if n % 2 else 'new', source=source,
+                min_price=450000, max_price=550000, preferred_bedrooms=3,
+                last_contact=timezone.now() - timedelta(hours=2),
+            )
+
+    def get(self, view, params=None):
+        request = APIRequestFactory().get('/', params)
+        request.user = self.agent
+        return json.loads(view(request).content)
+
+    def test_leads_are_projected_for_the_frontend_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.get(api_leads, {'status': 'hot', 'page_size': 5})
+        self.assertEqual(data['pagination'], {'page': 1, 'pageSize': 5, 'total': 6, 'totalPages': 2})
+        lead = data['leads'][0]
+        self.assertEqual(lead['budget'], '$450,000 - $550,000')
+        self.assertEqual(lead['lastContact'], '2 hours ago')
+        self.assertEqual((lead['source'], lead['preferences']), ('Zillow', '3+ BR'))
+
+    def test_anonymous_requests_are_rejected(self):
+        request = APIRequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(api_leads(request).status_code, 401)
+
+    def test_malformed_filters_are_rejected(self):
+        for view, params in ((api_leads, {'agent': 'me'}), (api_properties, {'min_price': 'cheap'}),
+                             (api_tasks, {'lead': '42'}), (api_leads, {'page': 'last'})):
+            request = APIRequestFactory().get('/', params)
+            request.user = self.agent
+            self.assertEqual(view(request).status_code, 400, params)
+
+    def test_update_lead(self):
+        lead = Lead.objects.first()
+        request = APIRequestFactory().put('/', {'status': 'lost', 'budget': 'Up to $300,000'}, format='json')
+        request.user = self.agent
+        self.assertEqual(api_update_lead(request, lead.pk).status_code, 200)
+        lead.refresh_from_db()
+        self.assertEqual((lead.status, lead.min_price, lead.max_price), ('lost', None, 300000))
+
+class BulkLeadActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leaving = User.objects.create_user('leaving')
+        cls.agent = User.objects.create_user('agent', first_name='Alex', last_name='Agent')
+        cls.tenant = create_tenant(cls.agent)
+        TenantUser.objects.create(tenant=cls.tenant, user=cls.agent, role='agent')
+        Lead.objects.bulk_create([
+            Lead(
+                first_name='Pat', last_name=str(n), email=f'pat{n}@example.com',
+                assigned_agent=cls.leaving, tenant=cls.tenant
+            )
+            for n in range(30)
+        ])
+
+    def bulk(self, data):
+        request = APIRequestFactory().post('/', data, format='json')
+        force_authenticate(request, user=self.agent)
+        return LeadViewSet.as_view({'post': 'bulk'})(request)
+
+    def test_reassign_by_filter_is_set_based(self):
+        # Agent and membership lookups, selection, one UPDATE, one INSERT and the
+        # tenant's load recount (plus the savepoints)
+        with self.assertNumQueries(14):
+            response = self.bulk({'action': 'assign_agent', 'agent_id': self.agent.pk, 'filter': {'assigned_agent': self.leaving.pk}})
+        self.assertEqual(response.data['updated'], 30)
+        self.assertEqual(Lead.objects.filter(assigned_agent=self.agent).count(), 30)
+        self.assertEqual(Activity.objects.filter(subject='Lead assigned to Alex Agent').count(), 30)
+
+    def test_reassign_requires_an_agent_of_the_tenant(self):
+        response = self.bulk({'action': 'assign_agent', 'agent_id': self.leaving.pk, 'filter': {'assigned_agent': self.leaving.pk}})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Lead.objects.filter(assigned_agent=self.leaving).count(), 30)
+
+    def test_status_and_tags_by_ids(self):
+        ids = [str(pk) for pk in Lead.objects.values_list('pk', flat=True)[:5]]
+        self.assertEqual(self.bulk({'action': 'update_status', 'status': 'hot', 'ids': ids}).data['updated'], 5)
+        self.assertEqual(self.bulk({'action': 'add_tags', 'tags': ['vip'], 'ids': ids}).data['tags_added'], 5)
+        self.assertEqual(self.bulk({'action': 'add_tags', 'tags': ['vip'], 'ids': ids}).data['tags_added'], 0)
+        self.assertEqual(Lead.objects.filter(status='hot', tags__name='vip').count(), 5)
+
+    def test_selection_is_required(self):
+        self.assertEqual(self.bulk({'action': 'delete'}).status_code, 400)
+        self.assertEqual(Lead.objects.count(), 30)
+
+    def test_delete_is_set_based(self):
+        leads = list(Lead.objects.all()[:20])
+        board = TaskBoard.objects.create(name='Tasks', created_by=self.agent)
+        task = Task.objects.create(
+            task_list=TaskList.objects.create(board=board, name='To Do'), title='Call back',
+            lead=leads[0], created_by=self.agent
+        )
+        for lead in leads:
+            LeadTag.objects.create(lead=lead, name='vip')
+            Activity.objects.create(activity_type='note', subject='Called', lead=lead, created_by=self.agent)
+        ids = [str(lead.pk) for lead in leads]
+        # A fixed set of statements per chunk and tenant, not several per lead
+        with self.assertNumQueries(20):
+            response = self.bulk({'action': 'delete', 'ids': ids})
+        self.assertEqual(response.data['deleted'], 20)
+        self.assertEqual(Lead.objects.count(), 10)
+        self.assertFalse(LeadTag.objects.exists())
+        self.assertFalse(Activity.objects.filter(lead__isnull=False).exists())
+        task.refresh_from_db()
+        self.assertIsNone(task.lead_id)
+
+# ============================================================================
+# PROPERTY COUNTER TESTS
+# ============================================================================
+
+class PropertyCounterTests(TestCase):
+    def setUp(self):
+        counter_buffer.flush()
+        self.user = User.objects.create_user('buyer')
+        self.property = Property.objects.create(
+            address='1 Main St', city='Austin', state='TX', zip_code='78701',
+            property_type='condo', bedrooms=2, bathrooms=2, list_price=350000,
+            list_date=date.today()
+        )
+
+    def post(self, action, user=None):
+        view = PropertyViewSet.as_view({'post': action}, **getattr(PropertyViewSet, action).kwargs)
+        request = APIRequestFactory().post('/')
+        if user:
+            force_authenticate(request, user)
+        return view(request, pk=str(self.property.pk))
+
+    def test_views_are_buffered_and_flushed_without_saving_the_row(self):
+        updated_at = self.property.updated_at
+        for expected in (1, 2, 3):
+            self.assertEqual(self.post('increment_views').data, {'views': expected})
+
+        counter_buffer.flush()
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.view_count, 3)
+        self.assertEqual(self.property.updated_at, updated_at)
+
+    def test_favorites_toggle_per_user(self):
+        self.assertEqual(self.post('toggle_favorite').status_code, 403)
+        self.assertEqual(self.post('toggle_favorite', self.user).data, {'favorited': True, 'favorites': 1})
+        self.assertEqual(self.post('toggle_favorite', self.user).data, {'favorited': False, 'favorites': 0})
+
+        counter_buffer.flush()
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.favorite_count, 0)
+        self.assertFalse(self.property.favorites.exists())
+
+# ============================================================================
+# LEAD INTAKE TESTS
+# ============================================================================
+
+class LeadIntakeTests(TestCase):
+    def setUp(self):
+        invalidate_website_source()
+        User.objects.create_user('system', id=SYSTEM_USER_ID)
+
+    def capture(self, **data):
+        return capture_lead(APIRequestFactory().post('/', data, format='json'))
+
+    @override_settings(LEAD_CAPTURE_QUEUE=True)
+    def test_queued_captures_are_written_in_batches(self):
+        lead_ids = [
+            self.capture(first_name='Ann', last_name='Lee', email=f'ann{i}@example.com').data['lead_id']
+            for i in range(3)
+        ]
+        self.assertEqual(LeadSubmission.objects.count(), 3)
+        self.assertFalse(Lead.objects.exists())
+
+        self.assertEqual(drain(batch_size=2), (3, 0))
+        self.assertFalse(LeadSubmission.objects.exists())
+        self.assertEqual(sorted(str(pk) for pk in Lead.objects.values_list('pk', flat=True)), sorted(lead_ids))
+        self.assertEqual(set(Lead.objects.values_list('source__name', flat=True)), {'Website'})
+        self.assertEqual(Activity.objects.count(), 3)
+
+    def test_bad_submission_is_isolated_from_its_batch(self):
+        LeadSubmission.objects.create(payload={'first_name': 'Bad', 'unknown_field': 1})
+        LeadSubmission.objects.create(payload={'first_name': 'Ann', 'last_name': 'Lee', 'email': 'ann@example.com'})
+
+        created, failed = drain()
+        self.assertEqual(created, 1)
+        self.assertTrue(failed)
+        self.assertEqual(Lead.objects.get().email, 'ann@example.com')
+        self.assertEqual(LeadSubmission.objects.get().payload['first_name'], 'Bad')
+
+    def test_inline_capture_without_queue(self):
+        response = self.capture(first_name='Ann', last_name='Lee', email='ann@example.com')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Lead.objects.get().source.name, 'Website')
+
+# ============================================================================
+# LEAD DEDUP TESTS
+# ============================================================================
+
+class LeadDedupTests(TestCase):
+    def setUp(self):
+        invalidate_website_source()
+        User.objects.create_user('system', id=SYSTEM_USER_ID)
+
+    def capture(self, **data):
+        return capture_lead(APIRequestFactory().post('/', dict(first_name='Ann', last_name='Lee', **data), format='json'))
+
+    def test_normalization(self):
+        self.assertEqual(normalize_email(' Ann.Lee+zillow@GoogleMail.com '), 'annlee@gmail.com')
+        self.assertEqual(normalize_email('Ann.Lee@Example.com'), 'ann.lee@example.com')
+        self.assertEqual(normalize_phone('+1 (512) 555-0100'), '5125550100')
+        self.assertEqual(normalize_phone('ext 12'), '')
+
+    def test_repeat_capture_is_added_to_the_existing_lead(self):
+        first = self.capture(email='ann.lee@gmail.com', phone='512-555-0100')
+        by_email = self.capture(email='AnnLee+homes@gmail.com')
+        by_phone = self.capture(email='ann@work.com', phone='(512) 555 0100')
+
+        lead_ids = {response.data['lead_id'] for response in (first, by_email, by_phone)}
+        self.assertEqual(lead_ids, {first.data['lead_id']})
+        self.assertEqual(Lead.objects.count(), 1)
+        self.assertEqual(Activity.objects.filter(subject='Repeat inquiry from website').count(), 2)
+
+    @override_settings(LEAD_CAPTURE_QUEUE=True)
+    def test_queued_repeats_within_a_batch(self):
+        self.capture(email='ann@example.com')
+        self.capture(email='ANN@example.com')
+
+        self.assertEqual(drain(), (2, 0))
+        self.assertEqual(Lead.objects.count(), 1)
+        self.assertEqual(Activity.objects.filter(lead=Lead.objects.get()).count(), 2)
+
+    def test_dedupe_merges_clusters_into_the_oldest_lead(self):
+        oldest = Lead.objects.create(first_name='Ann', last_name='Lee', email='ann@example.com', website_visits=2)
+        by_email = Lead.objects.create(
+            first_name='Ann', last_name='Lee', email='ANN@example.com', phone='5125550100', status='hot'
+        )
+        by_phone = Lead.objects.create(
+            first_name='A', last_name='Lee', email='a@work.com', phone='512.555.0100', website_visits=3
+        )
+        Lead.objects.create(first_name='Bob', last_name='Ray', email='bob@example.com')
+        LeadTag.objects.create(lead=by_email, name='vip')
+        Activity.objects.create(activity_type='call', subject='Call', lead=by_phone, created_by_id=SYSTEM_USER_ID)
+
+        self.assertEqual(dedupe_leads(Lead.objects.all(), SYSTEM_USER_ID), (1, 2))
+        oldest.refresh_from_db()
+        self.assertEqual(Lead.objects.count(), 2)
+        self.assertEqual((oldest.status, oldest.phone, oldest.website_visits), ('hot', '5125550100', 5))
+        self.assertEqual(list(oldest.tags.values_list('name', flat=True)), ['vip'])
+        self.assertTrue(Activity.objects.filter(lead=oldest, subject='Call').exists())
+        self.assertEqual(dedupe_leads(Lead.objects.all(), SYSTEM_USER_ID), (0, 0))
+
+# ============================================================================
+# QUOTA TESTS
+# ============================================================================
+
+class QuotaTests(TestCase):
+    def setUp(self):
+        invalidate_website_source()
+        self.tenant = create_tenant(User.objects.create_user('system', id=SYSTEM_USER_ID))
+        SubscriptionPlan.objects.filter(pk=self.tenant.subscription_plan_id).update(max_leads_per_month=3)
+        cache.clear()
+        set_current_tenant(None, self.tenant.pk)
+        self.addCleanup(set_current_tenant, None, None)
+
+    def set_leads(self, count, period=None):
+        Tenant.objects.filter(pk=self.tenant.pk).update(
+            current_leads_this_month=count, usage_period=period or current_period()
+        )
+
+    def capture(self, email):
+        request = APIRequestFactory().post('/', dict(first_name='Ann', last_name='Lee', email=email), format='json')
+        request.tenant_id = self.tenant.pk
+        return capture_lead(request)
+
+    def test_has_capacity_decides_close_calls_on_stored_usage(self):
+        self.assertTrue(has_capacity(self.tenant.pk, 'leads', 3))
+        self.assertFalse(has_capacity(self.tenant.pk, 'leads', 4))
+
+        # The cached snapshot still says 0, but a close call reads the row again
+        self.set_leads(3)
+        self.assertFalse(has_capacity(self.tenant.pk, 'leads'))
+        self.assertTrue(has_capacity(self.tenant.pk, 'properties'))
+        self.assertTrue(has_capacity(uuid.uuid4(), 'leads'))
+
+    def test_adjust_usage_restarts_the_count_in_a_new_period(self):
+        last_month = add_months(current_period(), -1)
+        self.set_leads(3, last_month)
+        self.assertEqual(get_snapshot(self.tenant.pk)['usage']['leads'], 0)
+
+        # A snapshot cached last month is dropped rather than moved
+        cache.set(cache_key(self.tenant.pk), dict(get_snapshot(self.tenant.pk), period=last_month, usage={
+            'agents': 0, 'leads': 3, 'properties': 0
+        }))
+        with self.captureOnCommitCallbacks(execute=True):
+            adjust_usage(self.tenant.pk, 'leads', 1)
+        self.tenant.refresh_from_db()
+        self.assertEqual((self.tenant.current_leads_this_month, self.tenant.usage_period), (1, current_period()))
+        self.assertEqual(get_snapshot(self.tenant.pk)['usage']['leads'], 1)
+
+        self.set_leads(3, last_month)
+        adjust_usage(self.tenant.pk, 'leads', -1)
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.current_leads_this_month, 0)
+
+    def test_repeat_inquiries_are_accepted_at_the_lead_limit(self):
+        self.assertEqual(self.capture('ann@example.com').status_code, 201)
+        self.set_leads(3)
+        self.assertEqual(self.capture('bob@example.com').status_code, 403)
+        self.assertEqual(self.capture('ann@example.com').status_code, 201)
+        self.assertEqual(Lead.objects.count(), 1)
+
+        with override_settings(LEAD_CAPTURE_QUEUE=True):
+            self.assertEqual(self.capture('cat@example.com').status_code, 403)
+        self.assertFalse(LeadSubmission.objects.exists())
+
+# ============================================================================
+# LEAD SCORING TESTS
+# ============================================================================
+
+class LeadScoringTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('agent')
+        self.tenant = create_tenant(self.user)
+        self.idle = self.lead(email='idle@example.com')
+        self.engaged = self.lead(email='engaged@example.com', website_visits=20, email_opens=5, email_clicks=3)
+        Activity.objects.create(
+            activity_type='showing', subject='Showing', lead=self.engaged, tenant=self.tenant, created_by=self.user
+        )
+
+    def lead(self, **fields):
+        return Lead.objects.create(first_name='Ann', last_name='Lee', tenant=self.tenant, **fields)
+
+    def scores(self, lead):
+        lead.refresh_from_db()
+        return lead.engagement_score, lead.lead_score
+
+    def test_scores_rank_engagement_and_recent_activity(self):
+        self.assertEqual(run_scoring(), (2, 1))
+        engagement, score = self.scores(self.engaged)
+        self.assertGreater(engagement, 8)
+        self.assertTrue(0 < score <= 100)
+        self.assertEqual(self.scores(self.idle), (0, 0))
+
+    def test_tenant_weights_and_incremental_runs(self):
+        run_scoring()
+        profile = LeadScoringProfile.objects.get(tenant=self.tenant)
+        engaged = self.scores(self.engaged)
+
+        # Only leads touched since the last run are read again
+        self.assertEqual(run_scoring(incremental=True), (0, 0))
+        Lead.objects.filter(pk=self.idle.pk).update(email_clicks=10, updated_at=timezone.now())
+        self.assertEqual(run_scoring(incremental=True), (1, 1))
+
+        # Changing the weights rescores the whole tenant
+        profile.activity_weights = {'showing': 0}
+        profile.save()
+        self.assertEqual(run_scoring(incremental=True)[0], 2)
+        self.assertLess(self.scores(self.engaged)[0], engaged[0])
+
+    def test_malformed_activity_weights_are_rejected_and_skipped(self):
+        profile = LeadScoringProfile.objects.create(
+            tenant=self.tenant, activity_weights={'open house': 2, 'call': 'high', 'showing': 4}
+        )
+        with self.assertRaises(ValidationError) as raised:
+            profile.full_clean()
+        self.assertEqual(len(raised.exception.message_dict['activity_weights']), 2)
+
+        # Saved without validation, the bad entries are ignored rather than failing every tenant's run
+        weights = ScoringWeights(profile)
+        self.assertNotIn('open house', {column[1] for column in weights.activity_columns})
+        self.assertIn(3.0 * 0.5 ** (3.5 / 30), weights.activity_weights)
+        self.assertEqual(run_scoring(), (2, 1))
+
+# ============================================================================
+# LEAD ROUTING TESTS
+# ============================================================================
+
+class LeadRoutingTests(TestCase):
+    def setUp(self):
+        invalidate_website_source()
+        self.tenant = create_tenant(User.objects.create_user('system', id=SYSTEM_USER_ID))
+        self.agents = [User.objects.create_user(f'agent{i}') for i in range(3)]
+        for agent in self.agents:
+            TenantUser.objects.create(tenant=self.tenant, user=agent, role='agent')
+        set_current_tenant(None, self.tenant.pk)
+        self.addCleanup(set_current_tenant, None, None)
+
+    def request(self, email, **data):
+        request = APIRequestFactory().post(
+            '/', dict(first_name='Ann', last_name='Lee', email=email, **data), format='json'
+        )
+        request.tenant_id = self.tenant.pk
+        return request
+
+    def capture(self, email, **data):
+        return Lead.objects.get(pk=capture_lead(self.request(email, **data)).data['lead_id'])
+
+    def load(self):
+        return dict(AgentRoutingState.objects.values_list('agent__username', 'open_leads'))
+
+    def test_round_robin_across_inline_and_queued_captures(self):
+        agents = [self.capture(f'ann{i}@example.com').assigned_agent for i in range(3)]
+        self.assertEqual(agents, self.agents)
+
+        with override_settings(LEAD_CAPTURE_QUEUE=True):
+            for i in range(3):
+                capture_lead(self.request(f'queued{i}@example.com'))
+        drain()
+        self.assertFalse(Lead.objects.filter(assigned_agent__isnull=True).exists())
+        self.assertEqual(self.load(), {'agent0': 2, 'agent1': 2, 'agent2': 2})
+
+    def test_territory_then_load(self):
+        LeadRoutingConfig.objects.create(tenant=self.tenant, strategy='territory')
+        AgentRoutingState.objects.filter(agent=self.agents[2]).update(territories='78701, Round Rock')
+
+        by_city = self.capture('a@example.com', preferred_locations='Round Rock; Cedar Park')
+        by_zip = self.capture('b@example.com', preferred_locations='Near 78701')
+        self.assertEqual([by_city.assigned_agent, by_zip.assigned_agent], [self.agents[2]] * 2)
+        # No territory match falls back to the least loaded agent
+        self.assertNotEqual(self.capture('c@example.com', preferred_locations='Dallas').assigned_agent, self.agents[2])
+
+    def test_counters_follow_lead_changes(self):
+        lead = self.capture('ann@example.com')
+        lead.status = 'lost'
+        lead.save()
+        self.assertEqual(self.load()['agent0'], 0)
+
+        lead.status = 'hot'
+        lead.assigned_agent = self.agents[1]
+        lead.save()
+        self.assertEqual(self.load(), {'agent0': 0, 'agent1': 1, 'agent2': 0})
+
+        lead.delete()
+        AgentRoutingState.objects.update(open_leads=5)
+        recount_agent_load([self.tenant.pk])
+        self.assertEqual(self.load(), {'agent0': 0, 'agent1': 0, 'agent2': 0})
+
+    def test_reactivated_agents_rejoin_routing(self):
+        membership = TenantUser.objects.get(user=self.agents[0])
+        membership.is_active = False
+        membership.save()
+        self.assertNotEqual(self.capture('a@example.com').assigned_agent, self.agents[0])
+
+        membership.is_active = True
+        membership.save()
+        self.assertTrue(AgentRoutingState.objects.get(agent=self.agents[0]).is_available)
+        agents = {self.capture(f'b{i}@example.com').assigned_agent for i in range(3)}
+        self.assertIn(self.agents[0], agents)
+
+
+# ============================================================================
+# LISTING MATCH TESTS
+# ============================================================================
+
+class LeadMatchingTests(TestCase):
+    def setUp(self):
+        self.tenant = create_tenant(User.objects.create_user('broker'))
+        self.agent = User.objects.create_user('agent')
+        set_current_tenant(None, self.tenant.pk)
+        self.addCleanup(set_current_tenant, None, None)
+
+    def lead(self, email, **preferences):
+        return Lead.objects.create(
+            first_name='Ann', last_name='Lee', email=email, assigned_agent=self.agent, **preferences
+        )
+
+    def listing(self, number, price, **fields):
+        fields = dict(dict(city='Austin', zip_code='78701', bedrooms=3, bathrooms=2), **fields)
+        return Property(
+            mls_number=f'MLS{number}', address=f'{number} Main St', state='TX', property_type='condo',
+            list_price=price, list_date=date.today(), listing_agent=self.agent, **fields
+        )
+
+    def matched(self, listing):
+        return set(PropertyMatch.objects.filter(property=listing).values_list('lead__email', flat=True))
+
+    def test_price_bands(self):
+        self.assertEqual(lead_price_bands(None, 500000), [ANY_PRICE_BAND])
+        self.assertEqual(lead_price_bands(100000, 10000000), [ANY_PRICE_BAND])
+        self.assertEqual(len(lead_price_bands(300000, 400000)), 2)
+        self.assertEqual(lead_price_bands(400000, 300000), [])
+
+    def test_new_and_repriced_listings_alert_matching_leads(self):
+        self.lead('range@example.com', min_price=300000, max_price=400000, preferred_locations='Austin, TX')
+        self.lead('zip@example.com', max_price=500000, preferred_bedrooms=3, preferred_locations='Near 78701')
+        self.lead('big@example.com', preferred_bedrooms=4, preferred_locations='Austin')
+        self.lead('dallas@example.com', preferred_locations='Dallas')
+        self.lead('lost@example.com', status='lost', preferred_locations='Austin')
+        self.assertFalse(LeadMatchKey.objects.filter(lead__email='lost@example.com').exists())
+
+        listing = self.listing(1, 350000)
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        self.assertEqual(self.matched(listing), {'range@example.com', 'zip@example.com'})
+        self.assertEqual(set(PropertyMatch.objects.values_list('agent', flat=True)), {self.agent.pk})
+
+        # A price change only adds leads that now match, once each
+        later = self.lead('later@example.com', min_price=420000, max_price=480000, preferred_locations='78701')
+        listing.list_price = 450000
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        self.assertEqual(self.matched(listing), {'range@example.com', 'zip@example.com', 'later@example.com'})
+
+        # Edited preferences are reindexed; unrelated edits do not rematch
+        later.preferred_locations = 'Dallas'
+        later.save()
+        listing.description = 'New photos'
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        self.assertFalse(LeadMatchKey.objects.filter(lead=later, location_key='78701').exists())
+        self.assertEqual(PropertyMatch.objects.count(), 3)
+
+    def test_batch_run_over_bulk_loaded_listings(self):
+        self.lead('austin@example.com', max_price=400000, preferred_locations='Austin')
+        self.lead('bath@example.com', preferred_bathrooms=3, preferred_locations='austin')
+        Lead.objects.filter(email='bath@example.com').update(preferred_locations='Round Rock')
+        Property.objects.bulk_create([
+            self.listing(1, 350000, tenant=self.tenant),
+            self.listing(2, 650000, tenant=self.tenant),
+            self.listing(3, 300000, tenant=self.tenant, city='Round Rock', zip_code='78664', bathrooms=3),
+            self.listing(4, 300000, tenant=self.tenant, status='sold'),
+        ])
+
+        call_command('match_listings', '--rebuild-index', stdout=StringIO())
+        pairs = set(PropertyMatch.objects.values_list('property__mls_number', 'lead__email'))
+        self.assertEqual(pairs, {('MLS1', 'austin@example.com'), ('MLS3', 'bath@example.com')})
+
+    def test_match_inserts_skip_pairs_a_concurrent_run_wrote(self):
+        lead = self.lead('austin@example.com', preferred_locations='Austin')
+        listing = self.listing(1, 350000, tenant=self.tenant)
+        Property.objects.bulk_create([listing])
+        PropertyMatch.objects.create(tenant=self.tenant, property=listing, lead=lead, list_price=350000)
+        rows = [(self.tenant.pk, listing.pk, lead.pk, self.agent.pk, 350000, 'new', timezone.now())]
+        insert_rows(PropertyMatch, MATCH_RECORD_FIELDS, rows, ignore_conflicts=True)
+        self.assertEqual(PropertyMatch.objects.count(), 1)
+
+# ============================================================================
+# TENANT CONTEXT TESTS
+# ============================================================================
+
+class TenantContextTests(TestCase):
+    def test_concurrent_tasks_keep_their_own_tenant(self):
+        async def handle(tenant_id):
+            set_current_tenant(None, tenant_id)
+            await asyncio.sleep(0)
+            return get_current_tenant_id()
+
+        async def serve():
+            return await asyncio.gather(handle('tenant-a'), handle('tenant-b'))
+
+        self.assertEqual(asyncio.run(serve()), ['tenant-a', 'tenant-b'])
+        self.assertIsNone(get_current_tenant_id())
+
+    def test_middleware_scopes_api_requests_to_the_host_tenant(self):
+        owner = User.objects.create_user('broker')
+        for slug in ('smith', 'jones'):
+            tenant = create_tenant(owner, slug, status='active')
+            Lead.all_objects.create(tenant=tenant, first_name='Pat', last_name=slug, email=f'pat@{slug}.test')
+
+        middleware = TenantMiddleware(lambda request: list(Lead.objects.values_list('last_name', flat=True)))
+        self.assertEqual(middleware(APIRequestFactory().get('/api/crm/leads/', HTTP_HOST='jones.test')), ['jones'])
+        self.assertIsNone(get_current_tenant_id())
+        with self.assertRaises(Http404):
+            middleware.process_request(APIRequestFactory().get('/api/crm/leads/', HTTP_HOST='unknown.test'))
+
+    def test_branding_css_is_not_served_for_unknown_tenants(self):
+        tenant_id = uuid.uuid4()
+        request = APIRequestFactory().get('/', {'tenant': str(tenant_id)})
+        with self.assertRaises(Http404):
+            branding_css(request)
+        self.assertIsNone(cache.get(version_key(tenant_id)))
+
+# ============================================================================
+# TENANT CACHE TESTS
+# ============================================================================
+
+class TenantCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _local_cache.clear()
+        self.addCleanup(_local_cache.clear)
+        self.owner = User.objects.create_user('broker')
+
+    def test_local_cache_evicts_least_recently_used_and_expires(self):
+        local = HostLRUCache(maxsize=2, ttl=60)
+        with mock.patch('core.tenant_cache.time.monotonic', return_value=1000):
+            local.set('a.test', 'a')
+            local.set('b.test', 'b')
+            self.assertEqual(local.get('a.test'), 'a')
+            local.set('c.test', 'c')
+            self.assertEqual((local.get('a.test'), local.get('b.test'), local.get('c.test')), ('a', None, 'c'))
+
+            local.clear()
+            local.set('a.test', 'a')
+            local.set('unknown.test', NO_TENANT, ttl=5)
+        with mock.patch('core.tenant_cache.time.monotonic', return_value=1030):
+            self.assertEqual((local.get('a.test'), local.get('unknown.test')), ('a', None))
+        with mock.patch('core.tenant_cache.time.monotonic', return_value=1061):
+            self.assertIsNone(local.get('a.test'))
+        self.assertFalse(local.entries)
+
+    def test_unknown_hosts_are_cached_negatively(self):
+        self.assertIsNone(get_tenant_id('smith.test'))
+        self.assertEqual(cache.get(tenant_cache_key('smith.test')), NO_TENANT)
+
+        # Remembered until the tenant's own save invalidates the host
+        tenant = create_tenant(self.owner, status='active')
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_tenant_id('smith.test'))
+        invalidate_hosts(tenant_hosts(tenant.domain, tenant.subdomain))
+        self.assertEqual(get_tenant_id('smith.test'), str(tenant.pk))
+
+    def test_domain_and_status_changes_invalidate_cached_hosts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tenant = create_tenant(self.owner, status='active')
+        self.assertEqual(get_tenant_id('smith.test'), str(tenant.pk))
+        self.assertEqual(get_tenant_id('smith.revolutionrealty.com'), str(tenant.pk))
+
+        tenant.domain = 'smithhomes.test'
+        with self.captureOnCommitCallbacks(execute=True):
+            tenant.save()
+        self.assertIsNone(get_tenant_id('smith.test'))
+        self.assertEqual(get_tenant_id('smithhomes.test'), str(tenant.pk))
+
+        tenant.status = 'suspended'
+        with self.captureOnCommitCallbacks(execute=True):
+            tenant.save()
+        self.assertIsNone(get_tenant_id('smithhomes.test'))
+        self.assertIsNone(get_tenant_id('smith.revolutionrealty.com'))
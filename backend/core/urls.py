@@ -41,8 +41,8 @@ urlpatterns = [
     path('api/crm/leads/create/', api_views.api_create_lead, name='api_create_lead'),
     path('api/crm/properties/create/', api_views.api_create_property, name='api_create_property'),
     path('api/crm/tasks/create/', api_views.api_create_task, name='api_create_task'),
-    path('api/crm/leads/<int:lead_id>/update/', api_views.api_update_lead, name='api_update_lead'),
-    path('api/crm/leads/<int:lead_id>/delete/', api_views.api_delete_lead, name='api_delete_lead'),
+    path('api/crm/leads/<uuid:lead_id>/update/', api_views.api_update_lead, name='api_update_lead'),
+    path('api/crm/leads/<uuid:lead_id>/delete/', api_views.api_delete_lead, name='api_delete_lead'),
     
     # Dashboard & Analytics
     path('api/dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
@@ -52,5 +52,6 @@ urlpatterns = [
     # Public API Endpoints
     path('api/public/capture-lead/', views.capture_lead, name='capture_lead'),
     path('api/public/property-search/', views.property_search, name='property_search'),
+    path('api/public/branding.css', views.branding_css, name='branding_css'),
 ]
 
@@ -0,0 +1,73 @@
+# Revolution Realty - Usage Metering
+# Write-behind usage counters flushed to UsageMetric with atomic increments
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .saas_models import UsageMetric
+from .write_behind import WriteBehindBuffer
+
+# Buffered increments are written at least this often (seconds) ...
+USAGE_FLUSH_INTERVAL = 10
+
+# ... or as soon as this many tenant/metric/period counters are pending
+USAGE_MAX_PENDING = 500
+
+# ============================================================================
+# BILLING PERIODS
+# ============================================================================
+
+def period_bounds(now=None):
+    """(start, end) of the monthly billing period containing now"""
+    now = now or timezone.now()
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+def apply_usage(tenant_id, metric_type, period_start, period_end, value):
+    """Add value to a tenant's metric row, creating it if needed"""
+    updated = UsageMetric.objects.filter(
+        tenant_id=tenant_id, metric_type=metric_type, period_start=period_start
+    ).update(value=F('value') + value)
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            UsageMetric.objects.create(
+                tenant_id=tenant_id, metric_type=metric_type,
+                period_start=period_start, period_end=period_end, value=value
+            )
+    except IntegrityError:
+        # Another worker created the row first
+        UsageMetric.objects.filter(
+            tenant_id=tenant_id, metric_type=metric_type, period_start=period_start
+        ).update(value=F('value') + value)
+
+# ============================================================================
+# WRITE-BEHIND BUFFER
+# ============================================================================
+
+def write_usage(items):
+    for (tenant_id, metric_type, period_start, period_end), value in items:
+        apply_usage(tenant_id, metric_type, period_start, period_end, Decimal(value))
+
+usage_buffer = WriteBehindBuffer('usage', write_usage, USAGE_FLUSH_INTERVAL, USAGE_MAX_PENDING)
+
+def usage_key(tenant_id, metric_type):
+    """Buffer key: usage is summed per tenant, metric and billing period"""
+    return (tenant_id, metric_type, *period_bounds())
+
+def record_usage(tenant_id, metric_type, value=1):
+    """Count usage for a tenant; written to UsageMetric shortly after"""
+    usage_buffer.add(usage_key(tenant_id, metric_type), value)
+
+async def arecord_usage(tenant_id, metric_type, value=1):
+    """Async record_usage"""
+    await usage_buffer.aadd(usage_key(tenant_id, metric_type), value)
@@ -2,13 +2,18 @@
 # Comprehensive REST API for frontend integration
 
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
 from django.contrib.auth.models import User
-from django.db.models import Count, Sum, Q, Avg
+from django.core.exceptions import ValidationError
+from django.db.models import Q, Avg
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from datetime import datetime
+import uuid
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
@@ -23,6 +28,19 @@ from .serializers import (
     ActivitySerializer, SiteSettingsSerializer, UserSerializer,
     DashboardStatsSerializer, LeadSourceStatsSerializer, MonthlyStatsSerializer
 )
+from .branding import get_branding
+from .bulk_leads import BulkActionError, run_bulk_action, select_leads
+from .counters import COUNTER_FIELDS, pending_count, record as record_counter, toggle_favorite as toggle_property_favorite
+from .geo import bounding_box_filter, parse_bbox, parse_radius, within_radius
+from .lead_dedup import find_duplicate, touch_lead
+from .lead_routing import route_lead
+from .lead_intake import enqueue_lead, queue_enabled as lead_capture_queued, website_source_id
+from .middleware import TenantQuerySetMixin
+from .pagination import KeysetPagination
+from .querysets import SerializerQueryPlanMixin, apply_query_plan
+from .quotas import enforce_quota
+from .search import search_properties
+from .stats import get_dashboard_stats, get_lead_source_performance, get_monthly_performance
 
 # ============================================================================
 # FRONTEND VIEWS (React Integration)
@@ -60,57 +78,7 @@ def api_welcome(request):
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
     """Comprehensive dashboard statistics"""
-    today = timezone.now().date()
-    this_month_start = today.replace(day=1)
-    
-    # Lead Statistics
-    total_leads = Lead.objects.count()
-    new_leads_today = Lead.objects.filter(created_at__date=today).count()
-    hot_leads = Lead.objects.filter(status='hot').count()
-    
-    # Transaction Statistics
-    total_transactions = Transaction.objects.count()
-    active_transactions = Transaction.objects.exclude(status__in=['closed', 'cancelled']).count()
-    closed_transactions_this_month = Transaction.objects.filter(
-        status='closed',
-        updated_at__date__gte=this_month_start
-    ).count()
-    
-    # Property Statistics
-    total_properties = Property.objects.count()
-    active_listings = Property.objects.filter(status='active').count()
-    
-    # Task Statistics
-    pending_tasks = Task.objects.filter(is_completed=False).count()
-    overdue_tasks = Task.objects.filter(
-        is_completed=False,
-        due_date__lt=timezone.now()
-    ).count()
-    
-    # Financial Statistics
-    total_commission_this_month = Transaction.objects.filter(
-        status='closed',
-        updated_at__date__gte=this_month_start
-    ).aggregate(total=Sum('estimated_commission'))['total'] or 0
-    
-    # Conversion Rate
-    qualified_leads = Lead.objects.filter(status__in=['qualified', 'hot', 'appointment']).count()
-    conversion_rate = (qualified_leads / total_leads * 100) if total_leads > 0 else 0
-    
-    stats = {
-        'total_leads': total_leads,
-        'new_leads_today': new_leads_today,
-        'hot_leads': hot_leads,
-        'total_transactions': total_transactions,
-        'active_transactions': active_transactions,
-        'closed_transactions_this_month': closed_transactions_this_month,
-        'total_properties': total_properties,
-        'active_listings': active_listings,
-        'pending_tasks': pending_tasks,
-        'overdue_tasks': overdue_tasks,
-        'total_commission_this_month': total_commission_this_month,
-        'conversion_rate': round(conversion_rate, 2)
-    }
+    stats = get_dashboard_stats()
     
     serializer = DashboardStatsSerializer(stats)
     return Response(serializer.data)
@@ -119,21 +87,18 @@ def dashboard_stats(request):
 @permission_classes([IsAuthenticated])
 def lead_source_performance(request):
     """Lead source performance analytics"""
-    sources = LeadSource.objects.annotate(
-        lead_count=Count('lead')
-    ).filter(lead_count__gt=0)
-    
-    stats = []
-    for source in sources:
-        qualified_leads = source.lead_set.filter(status__in=['qualified', 'hot', 'appointment']).count()
-        conversion_rate = (qualified_leads / source.lead_count * 100) if source.lead_count > 0 else 0
-        
-        stats.append({
-            'source_name': source.name,
-            'lead_count': source.lead_count,
-            'conversion_rate': round(conversion_rate, 2),
-            'cost_per_lead': source.cost_per_lead
-        })
+    start_date = request.query_params.get('start_date', None)
+    end_date = request.query_params.get('end_date', None)
+    
+    try:
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        return Response({'error': 'Dates must be formatted as YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    stats = get_lead_source_performance(start_date, end_date)
     
     serializer = LeadSourceStatsSerializer(stats, many=True)
     return Response(serializer.data)
@@ -142,40 +107,13 @@ def lead_source_performance(request):
 @permission_classes([IsAuthenticated])
 def monthly_performance(request):
     """Monthly performance trends"""
-    # Get last 12 months of data
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=365)
-    
-    monthly_stats = []
-    current_date = start_date.replace(day=1)
+    try:
+        months = max(1, min(int(request.query_params.get('months', 12)), 120))
+    except ValueError:
+        months = 12
     
-    while current_date <= end_date:
-        next_month = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1)
-        
-        leads_count = Lead.objects.filter(
-            created_at__date__gte=current_date,
-            created_at__date__lt=next_month
-        ).count()
-        
-        transactions_count = Transaction.objects.filter(
-            created_at__date__gte=current_date,
-            created_at__date__lt=next_month
-        ).count()
-        
-        commission = Transaction.objects.filter(
-            status='closed',
-            updated_at__date__gte=current_date,
-            updated_at__date__lt=next_month
-        ).aggregate(total=Sum('estimated_commission'))['total'] or 0
-        
-        monthly_stats.append({
-            'month': current_date.strftime('%Y-%m'),
-            'leads': leads_count,
-            'transactions': transactions_count,
-            'commission': commission
-        })
-        
-        current_date = next_month
+    # Read the trailing window from the precomputed rollup
+    monthly_stats = get_monthly_performance(months)
     
     serializer = MonthlyStatsSerializer(monthly_stats, many=True)
     return Response(serializer.data)
@@ -184,18 +122,24 @@ def monthly_performance(request):
 # LEAD MANAGEMENT VIEWSETS
 # ============================================================================
 
-class LeadViewSet(viewsets.ModelViewSet):
+class LeadViewSet(TenantQuerySetMixin, SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = Lead.objects.all()
     serializer_class = LeadSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_serializer_class(self):
         if self.action == 'create':
             return LeadCreateSerializer
         return LeadSerializer
     
+    def perform_create(self, serializer):
+        enforce_quota(getattr(self.request, 'tenant_id', None), 'leads')
+        serializer.save()
+    
     def get_queryset(self):
-        queryset = Lead.objects.all()
+        queryset = super().get_queryset()
         status = self.request.query_params.get('status', None)
         lead_type = self.request.query_params.get('lead_type', None)
         assigned_agent = self.request.query_params.get('assigned_agent', None)
@@ -206,6 +150,9 @@ class LeadViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(lead_type=lead_type)
         if assigned_agent:
             queryset = queryset.filter(assigned_agent_id=assigned_agent)
+        tag = self.request.query_params.get('tag', None)
+        if tag:
+            queryset = queryset.filter(tags__name=tag)
             
         return queryset.order_by('-created_at')
     
@@ -252,8 +199,26 @@ class LeadViewSet(viewsets.ModelViewSet):
             return Response({'status': 'success'})
         except User.DoesNotExist:
             return Response({'error': 'Agent not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Status change, reassignment, tagging or delete for many leads at once.
+        Body: {"action": ..., "ids": [...]} or {"action": ..., "filter": {...}},
+        plus "status", "agent_id" or "tags" for the action.
+        """
+        try:
+            queryset = select_leads(request.data.get('ids'), request.data.get('filter'))
+            result = run_bulk_action(request.data.get('action'), queryset, request.user, request.data)
+        except User.DoesNotExist:
+            return Response({'error': 'Agent not found'}, status=status.HTTP_404_NOT_FOUND)
+        except (BulkActionError, ValidationError) as e:
+            message = e.messages[0] if isinstance(e, ValidationError) else str(e)
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result)
 
-class LeadSourceViewSet(viewsets.ModelViewSet):
+class LeadSourceViewSet(SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = LeadSource.objects.all()
     serializer_class = LeadSourceSerializer
     permission_classes = [IsAuthenticated]
@@ -262,13 +227,13 @@ class LeadSourceViewSet(viewsets.ModelViewSet):
 # TRANSACTION MANAGEMENT VIEWSETS
 # ============================================================================
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(TenantQuerySetMixin, SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Transaction.objects.all()
+        queryset = super().get_queryset()
         status = self.request.query_params.get('status', None)
         agent = self.request.query_params.get('agent', None)
         
@@ -306,7 +271,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
 # TASK MANAGEMENT VIEWSETS
 # ============================================================================
 
-class TaskBoardViewSet(viewsets.ModelViewSet):
+class TaskBoardViewSet(SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = TaskBoard.objects.all()
     serializer_class = TaskBoardSerializer
     permission_classes = [IsAuthenticated]
@@ -314,18 +279,18 @@ class TaskBoardViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
-class TaskListViewSet(viewsets.ModelViewSet):
+class TaskListViewSet(SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = TaskList.objects.all()
     serializer_class = TaskListSerializer
     permission_classes = [IsAuthenticated]
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(TenantQuerySetMixin, SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Task.objects.all()
+        queryset = super().get_queryset()
         assigned_to = self.request.query_params.get('assigned_to', None)
         is_completed = self.request.query_params.get('is_completed', None)
         priority = self.request.query_params.get('priority', None)
@@ -373,7 +338,7 @@ class TaskViewSet(viewsets.ModelViewSet):
 # PROPERTY MANAGEMENT VIEWSETS
 # ============================================================================
 
-class PropertyViewSet(viewsets.ModelViewSet):
+class PropertyViewSet(TenantQuerySetMixin, SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = Property.objects.all()
     permission_classes = [AllowAny]  # Public access for property listings
     
@@ -382,8 +347,12 @@ class PropertyViewSet(viewsets.ModelViewSet):
             return PropertyListSerializer
         return PropertySerializer
     
+    def perform_create(self, serializer):
+        enforce_quota(getattr(self.request, 'tenant_id', None), 'properties')
+        serializer.save()
+    
     def get_queryset(self):
-        queryset = Property.objects.all()
+        queryset = super().get_queryset()
         
         # Filtering parameters
         status = self.request.query_params.get('status', None)
@@ -411,24 +380,29 @@ class PropertyViewSet(viewsets.ModelViewSet):
             
         return queryset.order_by('-created_at')
     
+    def counter_value(self, counter):
+        """Stored value of one of the property's counters, read without loading the row"""
+        queryset = self.get_queryset().values_list(COUNTER_FIELDS[counter], flat=True)
+        return get_object_or_404(queryset, pk=self.kwargs['pk'])
+    
     @action(detail=True, methods=['post'])
     def increment_views(self, request, pk=None):
-        """Increment property view count"""
-        property = self.get_object()
-        property.view_count += 1
-        property.save()
-        return Response({'views': property.view_count})
+        """Increment property view count (buffered, written behind)"""
+        views = self.counter_value('views')
+        record_counter(pk, 'views')
+        return Response({'views': views + pending_count(pk, 'views')})
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def toggle_favorite(self, request, pk=None):
-        """Toggle property favorite status"""
-        property = self.get_object()
-        # This would typically be user-specific, but for now just increment count
-        property.favorite_count += 1
-        property.save()
-        return Response({'favorites': property.favorite_count})
-
-class PropertyImageViewSet(viewsets.ModelViewSet):
+        """Save or unsave the property for the current user"""
+        favorites = self.counter_value('favorites')
+        favorited = toggle_property_favorite(pk, request.user)
+        return Response({
+            'favorited': favorited,
+            'favorites': max(favorites + pending_count(pk, 'favorites'), 0),
+        })
+
+class PropertyImageViewSet(SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = PropertyImage.objects.all()
     serializer_class = PropertyImageSerializer
     permission_classes = [IsAuthenticated]
@@ -437,13 +411,15 @@ class PropertyImageViewSet(viewsets.ModelViewSet):
 # ACTIVITY TRACKING VIEWSETS
 # ============================================================================
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(TenantQuerySetMixin, SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        queryset = Activity.objects.all()
+        queryset = super().get_queryset()
         lead_id = self.request.query_params.get('lead_id', None)
         transaction_id = self.request.query_params.get('transaction_id', None)
         activity_type = self.request.query_params.get('activity_type', None)
@@ -464,7 +440,14 @@ class ActivityViewSet(viewsets.ModelViewSet):
 # SITE SETTINGS VIEWSETS
 # ============================================================================
 
-class SiteSettingsViewSet(viewsets.ModelViewSet):
+# Site settings exposed to the frontend without authentication
+PUBLIC_SITE_SETTINGS_FIELDS = (
+    'site_name', 'tagline', 'phone', 'email', 'address',
+    'facebook_url', 'instagram_url', 'linkedin_url', 'twitter_url',
+    'primary_color', 'secondary_color', 'accent_color',
+)
+
+class SiteSettingsViewSet(SerializerQueryPlanMixin, viewsets.ModelViewSet):
     queryset = SiteSettings.objects.all()
     serializer_class = SiteSettingsSerializer
     permission_classes = [IsAuthenticated]
@@ -472,33 +455,13 @@ class SiteSettingsViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def public(self, request):
         """Get public site settings for frontend"""
-        try:
-            settings = SiteSettings.objects.first()
-            if settings:
-                public_data = {
-                    'site_name': settings.site_name,
-                    'tagline': settings.tagline,
-                    'phone': settings.phone,
-                    'email': settings.email,
-                    'address': settings.address,
-                    'facebook_url': settings.facebook_url,
-                    'instagram_url': settings.instagram_url,
-                    'linkedin_url': settings.linkedin_url,
-                    'twitter_url': settings.twitter_url,
-                    'primary_color': settings.primary_color,
-                    'secondary_color': settings.secondary_color,
-                    'accent_color': settings.accent_color,
-                }
-                return Response(public_data)
-            return Response({})
-        except SiteSettings.DoesNotExist:
-            return Response({})
+        return Response(SiteSettings.objects.values(*PUBLIC_SITE_SETTINGS_FIELDS).first() or {})
 
 # ============================================================================
 # USER MANAGEMENT VIEWSETS
 # ============================================================================
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(SerializerQueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.filter(is_active=True)
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
@@ -520,54 +483,101 @@ def capture_lead(request):
     """Public endpoint for lead capture from website forms"""
     serializer = LeadCreateSerializer(data=request.data)
     if serializer.is_valid():
-        # Set default source if not provided
-        if not serializer.validated_data.get('source'):
-            website_source, created = LeadSource.objects.get_or_create(
-                name='Website',
-                defaults={'description': 'Leads from website forms'}
+        # Queued mode: one outbox insert, written as a lead by process_lead_submissions
+        if lead_capture_queued():
+            enforce_quota(getattr(request, 'tenant_id', None), 'leads')
+            lead_id = enqueue_lead(
+                serializer, getattr(request, 'tenant_id', None), parse_uuid(request.data.get('property_id'))
             )
-            serializer.validated_data['source'] = website_source
+            return Response({
+                'status': 'success',
+                'message': 'Thank you for your interest! We will contact you soon.',
+                'lead_id': str(lead_id)
+            }, status=status.HTTP_202_ACCEPTED)
         
-        lead = serializer.save()
+        # The same person submitting again is added to their existing lead
+        lead_id = find_duplicate(
+            getattr(request, 'tenant_id', None),
+            serializer.validated_data.get('email'), serializer.validated_data.get('phone')
+        )
+        if lead_id:
+            touch_lead(lead_id)
+        else:
+            # Only new leads count toward the monthly quota; repeat inquiries are always accepted
+            enforce_quota(getattr(request, 'tenant_id', None), 'leads')
+            # Set default source if not provided (cached Website source)
+            if not serializer.validated_data.get('source'):
+                serializer.validated_data.pop('source', None)
+                lead = serializer.save(source_id=website_source_id())
+            else:
+                lead = serializer.save()
+            lead_id = lead.id
+            route_lead(lead)
+        
+        # Inquiries sent from a listing page count toward its leads
+        property_id = inquiry_property_id(request.data.get('property_id'))
+        if property_id:
+            record_counter(property_id, 'leads')
         
         # Create initial activity
         Activity.objects.create(
             activity_type='note',
-            subject='New lead captured from website',
+            subject='Repeat inquiry from website' if serializer.instance is None else 'New lead captured from website',
             description=f'Lead submitted through website form',
-            lead=lead,
+            lead_id=lead_id,
+            property_id=property_id,
             created_by_id=1  # System user
         )
         
+        # Repeat submissions get the same response, so the form does not reveal who is on file
         return Response({
             'status': 'success',
             'message': 'Thank you for your interest! We will contact you soon.',
-            'lead_id': str(lead.id)
+            'lead_id': str(lead_id)
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def property_search(request):
-    """Public property search endpoint"""
+def parse_uuid(value):
+    try:
+        return uuid.UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+def inquiry_property_id(value):
+    """ID of the current tenant's property a lead form was sent from, if any"""
+    property_id = parse_uuid(value)
+    if property_id is None:
+        return None
+    return Property.objects.filter(pk=property_id).values_list('pk', flat=True).first()
+
+# Sort options for property_search, each ending in a unique column
+PROPERTY_SEARCH_ORDERINGS = {
+    'relevance': ('-search_rank', '-id'),
+    'distance': ('distance', 'id'),
+    'newest': ('-created_at', '-id'),
+    'price_asc': ('list_price', 'id'),
+    'price_desc': ('-list_price', '-id'),
+}
+
+def build_property_search(params):
+    """
+    Filtered, ordered property search queryset and its ordering;
+    raises ValueError for malformed map parameters
+    """
     queryset = Property.objects.filter(status='active')
     
     # Search parameters
-    query = request.query_params.get('q', None)
+    query = params.get('q', None)
     if query:
-        queryset = queryset.filter(
-            Q(address__icontains=query) |
-            Q(city__icontains=query) |
-            Q(description__icontains=query)
-        )
+        queryset = search_properties(queryset, query)
     
     # Apply other filters
-    property_type = request.query_params.get('property_type', None)
-    min_price = request.query_params.get('min_price', None)
-    max_price = request.query_params.get('max_price', None)
-    bedrooms = request.query_params.get('bedrooms', None)
-    bathrooms = request.query_params.get('bathrooms', None)
+    property_type = params.get('property_type', None)
+    min_price = params.get('min_price', None)
+    max_price = params.get('max_price', None)
+    bedrooms = params.get('bedrooms', None)
+    bathrooms = params.get('bathrooms', None)
     
     if property_type:
         queryset = queryset.filter(property_type=property_type)
@@ -580,6 +590,40 @@ def property_search(request):
     if bathrooms:
         queryset = queryset.filter(bathrooms__gte=bathrooms)
     
+    # Map searches: bbox=west,south,east,north or lat/lng/radius (miles)
+    bbox = params.get('bbox', None)
+    latitude = params.get('lat', None)
+    longitude = params.get('lng', None)
+    radius = params.get('radius', None)
+    
+    # Coordinates are range-checked: unbounded values would stall the geohash cover
+    if bbox:
+        queryset = queryset.filter(bounding_box_filter(*parse_bbox(bbox)))
+    if latitude and longitude and radius:
+        queryset = within_radius(queryset, *parse_radius(latitude, longitude, radius))
+    
+    # Sort order; keyset pages seek on these columns
+    radius_search = bool(latitude and longitude and radius)
+    default_sort = 'relevance' if query else 'distance' if radius_search else 'newest'
+    sort = params.get('sort', default_sort)
+    if (sort == 'relevance' and not query) or (sort == 'distance' and not radius_search):
+        sort = 'newest'
+    ordering = PROPERTY_SEARCH_ORDERINGS.get(sort, PROPERTY_SEARCH_ORDERINGS['newest'])
+    return apply_query_plan(queryset.order_by(*ordering), PropertyListSerializer), ordering
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def property_search(request):
+    """Public property search endpoint"""
+    try:
+        queryset, ordering = build_property_search(request.query_params)
+    except ValueError:
+        return Response({'error': 'Invalid bbox or radius parameters'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Keyset pagination for clients that send a cursor
+    if 'cursor' in request.query_params:
+        return keyset_property_page(queryset, ordering, request)
+    
     # Pagination
     page_size = int(request.query_params.get('page_size', 12))
     page = int(request.query_params.get('page', 1))
@@ -599,4 +643,30 @@ def property_search(request):
         'total_pages': (total_count + page_size - 1) // page_size
     })
 
-
+def keyset_property_page(queryset, ordering, request):
+    paginator = KeysetPagination(ordering=ordering)
+    paginator.page_size = 12
+    properties = paginator.paginate_queryset(queryset, request)
+    serializer = PropertyListSerializer(properties, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+def branding_css(request):
+    """Compiled CSS variables and custom CSS for the current tenant's branding"""
+    tenant_id = getattr(request, 'tenant_id', None) or request.GET.get('tenant')
+    try:
+        tenant_id = uuid.UUID(str(tenant_id))
+    except ValueError:
+        raise Http404('Tenant not found')
+    
+    branding = get_branding(tenant_id)
+    if branding is None:
+        raise Http404('Tenant not found')
+    if branding['etag'] in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(branding['css'], content_type='text/css; charset=utf-8')
+    
+    # Clients revalidate every time; unchanged branding costs a 304
+    response['ETag'] = branding['etag']
+    patch_cache_control(response, no_cache=True)
+    return response
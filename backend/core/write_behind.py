@@ -0,0 +1,94 @@
+# Revolution Realty - Write-Behind Buffers
+# Per-process counters summed in memory and flushed to the database in batches
+
+import atexit
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# WRITE-BEHIND BUFFER
+# ============================================================================
+
+class WriteBehindBuffer:
+    """
+    Per-process counters aggregated in memory.
+
+    Deltas are summed per key and handed to `write` every `interval` seconds
+    or once `max_pending` keys are pending, and again at interpreter exit,
+    so a hard kill loses at most one interval of deltas per process.
+
+    `write(items)` receives a list of (key, delta) pairs to store as one unit,
+    typically an UPDATE ... SET column = column + delta. Each key is its own
+    unit unless `batch_key(key, delta)` groups several keys into one write.
+    Units that raise stay buffered for the next flush.
+    """
+
+    def __init__(self, name, write, interval, max_pending, batch_key=None):
+        self.name = name
+        self.write = write
+        self.batch_key = batch_key
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush_on_exit)
+
+    def buffer(self, key, delta):
+        """Add to the in-memory counter; returns whether a flush is due"""
+        with self.lock:
+            self.pending[key] = self.pending.get(key, 0) + delta
+            return (
+                len(self.pending) >= self.max_pending
+                or time.monotonic() - self.last_flush >= self.interval
+            )
+
+    def add(self, key, delta=1):
+        if self.buffer(key, delta):
+            self.flush()
+
+    async def aadd(self, key, delta=1):
+        # Flushes write to the database, so they run off the event loop
+        if self.buffer(key, delta):
+            await sync_to_async(self.flush)()
+
+    def pending_delta(self, key):
+        """Delta for a key not yet written"""
+        with self.lock:
+            return self.pending.get(key, 0)
+
+    def flush(self):
+        """Write every pending delta; failed units stay buffered"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+
+        batches = {}
+        for key, delta in pending.items():
+            if delta:
+                batch = self.batch_key(key, delta) if self.batch_key else key
+                batches.setdefault(batch, []).append((key, delta))
+
+        failed = []
+        for items in batches.values():
+            try:
+                self.write(items)
+            except Exception:
+                logger.exception('Failed to flush %s for %d keys', self.name, len(items))
+                failed.extend(items)
+
+        if failed:
+            with self.lock:
+                for key, delta in failed:
+                    self.pending[key] = self.pending.get(key, 0) + delta
+
+    def flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush %s at shutdown', self.name)